@@ -0,0 +1,85 @@
+"""
+Measure add-on import, register() and time to first panel draw.
+
+Run from the repository root:
+    blender --factory-startup --python scripts/bench_startup.py
+    blender -b --factory-startup --python scripts/bench_startup.py
+
+In background mode (-b) nothing is drawn, so only import and register times are reported.
+"""
+
+import sys
+import time
+import importlib.util
+from pathlib import Path
+
+import bpy
+
+MODULE_NAME = "export_me"
+SOURCE_DIR = Path(__file__).resolve().parent.parent / "source"
+FIRST_DRAW_TIMEOUT = 30.0
+
+
+def load_addon():
+    spec = importlib.util.spec_from_file_location(
+        MODULE_NAME, SOURCE_DIR / "__init__.py", submodule_search_locations=[str(SOURCE_DIR)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[MODULE_NAME] = module
+
+    started = time.perf_counter()
+    spec.loader.exec_module(module)
+    import_time = time.perf_counter() - started
+
+    # Register the preferences entry the add-on reads through context.preferences.addons
+    if MODULE_NAME not in bpy.context.preferences.addons:
+        bpy.context.preferences.addons.new().module = MODULE_NAME
+
+    return module, import_time
+
+
+def print_report(import_time, timings):
+    print("Export ME startup benchmark")
+    print(f"  import:            {import_time * 1000:8.2f} ms")
+    for name in ("register", "registered", "first_draw"):
+        if name in timings:
+            print(f"  {name + ':':<18} {timings[name] * 1000:8.2f} ms")
+    heavy = [name for name in sys.modules if name.startswith(f"{MODULE_NAME}.operators.")]
+    print(f"  operator modules loaded: {', '.join(sorted(heavy)) or 'none'}")
+
+
+def show_panel(module):
+    # The sidebar only draws the active tab, so show the panel in the default "Item" tab
+    module.N_PT_Panel.bl_category = "Item"
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == "VIEW_3D":
+                area.spaces.active.show_region_ui = True
+                area.tag_redraw()
+
+
+def main():
+    module, import_time = load_addon()
+
+    if not bpy.app.background:
+        show_panel(module)
+    module.register()
+
+    if bpy.app.background:
+        print_report(import_time, module.startup.get_timings())
+        return
+
+    deadline = time.perf_counter() + FIRST_DRAW_TIMEOUT
+
+    def wait_for_draw():
+        timings = module.startup.get_timings()
+        if "first_draw" not in timings and time.perf_counter() < deadline:
+            return 0.01
+        print_report(import_time, timings)
+        bpy.ops.wm.quit_blender()
+        return None
+
+    bpy.app.timers.register(wait_for_draw, first_interval=0.01)
+
+
+main()
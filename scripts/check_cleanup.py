@@ -0,0 +1,76 @@
+"""
+Check the mesh cleanup stage on meshes with loose geometry.
+
+Run from the repository root:
+    blender -b --factory-startup --python scripts/check_cleanup.py
+
+Exits with status 1 when a check fails.
+"""
+
+import sys
+import importlib.util
+from pathlib import Path
+
+import bpy
+
+MODULE_NAME = "export_me"
+SOURCE_DIR = Path(__file__).resolve().parent.parent / "source"
+
+
+def load_addon():
+    spec = importlib.util.spec_from_file_location(
+        MODULE_NAME, SOURCE_DIR / "__init__.py", submodule_search_locations=[str(SOURCE_DIR)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[MODULE_NAME] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_mesh(name, vertices, edges, faces):
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(vertices, edges, faces)
+    mesh.update()
+    return mesh
+
+
+def check_weld(stage, name, vertices, edges, faces, expected):
+    mesh = make_mesh(name, vertices, edges, faces)
+    try:
+        removed = stage._weld(mesh, 0.001)
+        counts = (len(mesh.vertices), len(mesh.edges), len(mesh.polygons))
+    except Exception as error:
+        print(f"FAIL {name}: {type(error).__name__}: {error}")
+        return False
+    finally:
+        bpy.data.meshes.remove(mesh)
+
+    if (removed, counts) != expected:
+        print(f"FAIL {name}: removed {removed}, left {counts}, expected {expected}")
+        return False
+    print(f"ok   {name}")
+    return True
+
+
+def main() -> int:
+    cleanup = importlib.import_module(f"{MODULE_NAME}.operators.cleanup")
+    stage = cleanup.CleanupStage()
+    quad = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)]
+
+    checks = [
+        # A wire edge between two vertices no face uses
+        ("wire edge", [*quad, (3, 0, 0), (4, 0, 0)], [(4, 5)], [(0, 1, 2, 3)], ((2, 1), (4, 4, 1))),
+        # A wire edge from a face corner to a vertex no face uses
+        ("dangling edge", [*quad, (3, 0, 0)], [(2, 4)], [(0, 1, 2, 3)], ((1, 1), (4, 4, 1))),
+        # A wire edge between two face corners, its vertices stay
+        ("diagonal edge", quad, [(0, 2)], [(0, 1, 2, 3)], ((0, 1), (4, 4, 1))),
+        # A vertex without edges
+        ("loose vertex", [*quad, (3, 0, 0)], [], [(0, 1, 2, 3)], ((1, 0), (4, 4, 1))),
+    ]
+    results = [check_weld(stage, *check) for check in checks]
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    load_addon()
+    sys.exit(main())
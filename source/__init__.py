@@ -1,10 +1,14 @@
 from typing import Dict, Tuple, Any
+import time
+
+from .core import startup, warmup
 import bpy
-from bpy.props import StringProperty, BoolProperty, EnumProperty
+from bpy.props import StringProperty, BoolProperty, EnumProperty, FloatProperty, IntProperty
 
-from .ui import N_PT_Panel
+from .ui import N_PT_Panel, N_UL_Projects, N_UL_ProjectSubpaths, draw_cost
 from .operators import (
     N_OT_BatchExport,
+    N_OT_PlanExport,
     N_OT_SelectFolder,
     N_OT_ParentFolder,
     N_OT_NewFolder,
@@ -16,37 +20,39 @@ from .operators import (
     N_OT_IconShow,
 )
 from .core.preferences import PREFERENCE_CLASSES
+from .core.profiles import search_profile_names
 
 
 def get_project_enum_items(self, context):
     """Generate enum items for project dropdown"""
-    from .core.preferences import get_preferences
-
-    prefs = get_preferences(context)
+    from .core.preferences import get_project_index
 
-    items = []
-    for index, project in enumerate(prefs.custom_project_paths):
-        name = project.project_name or f"Project {index + 1}"
-        items.append((str(index), name, f"Select {name}", index))
-
-    return items if items else [("0", "No Projects", "No projects available", 0)]
+    return get_project_index(context).enum_items
 
 
 def update_smoothing_on_project_change(self, context):
     """Update smoothing setting when project selection changes"""
-    from .core.preferences import get_preferences, get_recommended_smoothing
-    
+    from .core.preferences import get_project_index, get_recommended_smoothing
+
     try:
         selected_index = int(context.scene.selected_project_enum)
-        prefs = get_preferences(context)
-        
-        if selected_index < len(prefs.custom_project_paths):
-            project = prefs.custom_project_paths[selected_index]
-            context.scene.export_smoothing = get_recommended_smoothing(project.game_engine)
+        engines = get_project_index(context).engines
+
+        if selected_index < len(engines):
+            context.scene.export_smoothing = get_recommended_smoothing(engines[selected_index])
     except (ValueError, AttributeError, IndexError):
         pass
 
 
+def update_project_on_list_change(self, context):
+    """Select the project picked in the project browser"""
+    from .core.preferences import get_project_index
+
+    selected = context.scene.project_list_index
+    if 0 <= selected < get_project_index(context).count and context.scene.selected_project_enum != str(selected):
+        context.scene.selected_project_enum = str(selected)
+
+
 SCENE_PROPERTIES: Dict[str, Any] = {
     "selected_project_enum": EnumProperty(
         name="Selected Project",
@@ -54,6 +60,12 @@ SCENE_PROPERTIES: Dict[str, Any] = {
         items=get_project_enum_items,
         update=update_smoothing_on_project_change,
     ),
+    "project_list_index": IntProperty(
+        name="Project",
+        description="Project selected in the project browser",
+        default=0,
+        update=update_project_on_list_change,
+    ),
     "export_folder": StringProperty(
         name="Export folder",
         subtype="DIR_PATH",
@@ -89,6 +101,83 @@ SCENE_PROPERTIES: Dict[str, Any] = {
         default=False,
         description="Export rig and animations",
     ),
+    "export_instances": BoolProperty(
+        name="Instance Linked Duplicates",
+        default=False,
+        description=(
+            "Write roots that share mesh data with an already exported root to an instance manifest "
+            "instead of exporting their geometry again"
+        ),
+    ),
+    "animation_export_mode": EnumProperty(
+        name="Animations",
+        description="How rig animations are written",
+        items=(
+            ("ALL", "All in One File", "Bake every action into the exported FBX", 0),
+            ("ACTIONS", "One File per Action", "Write each action to its own FBX next to the mesh", 1),
+            ("NLA_TRACKS", "One File per NLA Track", "Write each NLA track to its own FBX next to the mesh", 2),
+        ),
+        default="ALL",
+    ),
+    "action_filter": StringProperty(
+        name="Action Filter",
+        description="Only export actions or tracks matching these patterns, separated by commas (e.g. Run*, Idle)",
+    ),
+    "anim_bake_step": FloatProperty(
+        name="Bake Step",
+        default=1.0,
+        min=0.01,
+        max=100.0,
+        description="How often to evaluate animated values, in frames",
+    ),
+    "anim_simplify": FloatProperty(
+        name="Simplify",
+        default=1.0,
+        min=0.0,
+        max=100.0,
+        description="How much to simplify baked values (0.0 to disable)",
+    ),
+    "skip_unchanged_clips": BoolProperty(
+        name="Skip Unchanged Clips",
+        default=True,
+        description="Do not rewrite clips whose F-curves and bake settings match the last export",
+    ),
+    "publish_textures": BoolProperty(
+        name="Publish Textures",
+        default=False,
+        description="Copy the textures used by exported materials next to the FBX and reference them relatively",
+    ),
+    "texture_folder": StringProperty(
+        name="Texture Folder",
+        default="Textures",
+        description="Folder, relative to the export folder, the textures are copied into",
+    ),
+    "patch_renames": BoolProperty(
+        name="Patch Renamed Exports",
+        default=True,
+        description=(
+            "When only object, mesh or material names changed since the last export, "
+            "rename them in the existing FBX instead of exporting again"
+        ),
+    ),
+    "optimize_vertex_cache": BoolProperty(
+        name="Optimize Vertex Cache",
+        default=False,
+        description="Reorder triangles and vertices of exported meshes for GPU vertex cache and fetch locality",
+    ),
+    "generate_lightmap_uvs": BoolProperty(
+        name="Generate Lightmap UVs",
+        default=False,
+        description=(
+            "Add a packed lightmap UV layer to exported meshes that have none, "
+            "reused for meshes that did not change since it was last packed"
+        ),
+    ),
+    "verify_exports": BoolProperty(
+        name="Verify Exports",
+        default=False,
+        description="Read every written FBX back and check its objects, colliders, triangles, materials and axes",
+    ),
     "one_material_id": BoolProperty(
         name="One material ID",
         default=False,
@@ -132,10 +221,46 @@ SCENE_PROPERTIES: Dict[str, Any] = {
 }
 
 
+OBJECT_PROPERTIES: Dict[str, Any] = {
+    "export_me_root": BoolProperty(
+        name="Batch Export Root",
+        default=False,
+        description="Export this object when the file is processed by the command-line batch exporter",
+    ),
+    "export_me_profile": StringProperty(
+        name="Export Profile",
+        description="Export profile used when this object is exported as a root (scene settings if empty)",
+        search=search_profile_names,
+    ),
+}
+
+
+COLLECTION_PROPERTIES: Dict[str, Any] = {
+    "export_me_profile": StringProperty(
+        name="Export Profile",
+        description="Export profile used by objects in this collection and its children (scene settings if empty)",
+        search=search_profile_names,
+    ),
+    "export_me_collection": EnumProperty(
+        name="Collection Export",
+        description="Export this collection and its nested collections with Export Collections and the batch exporter",
+        items=(
+            ("NONE", "Not Exported", "Only export objects of this collection when they are selected"),
+            ("COLLECTION", "One FBX", "Export the collection as one FBX named after it, objects keep their placement"),
+            ("OBJECTS", "FBX per Object", "Export every top-level object of the collection with its children"),
+        ),
+        default="NONE",
+    ),
+}
+
+
 CLASSES: Tuple[type, ...] = (
     *PREFERENCE_CLASSES,
+    N_UL_Projects,
+    N_UL_ProjectSubpaths,
     N_PT_Panel,
     N_OT_BatchExport,
+    N_OT_PlanExport,
     N_OT_SelectFolder,
     N_OT_ParentFolder,
     N_OT_NewFolder,
@@ -149,14 +274,38 @@ CLASSES: Tuple[type, ...] = (
 
 
 def register() -> None:
+    startup.mark("imported")
+    register_started = time.perf_counter()
+
     for cls in CLASSES:
         bpy.utils.register_class(cls)
 
     for name, prop in SCENE_PROPERTIES.items():
         setattr(bpy.types.Scene, name, prop)
 
+    for name, prop in OBJECT_PROPERTIES.items():
+        setattr(bpy.types.Object, name, prop)
+
+    for name, prop in COLLECTION_PROPERTIES.items():
+        setattr(bpy.types.Collection, name, prop)
+
+    warmup.register()
+    draw_cost.register()
+
+    startup.mark("registered")
+    startup.record("register", time.perf_counter() - register_started)
+
 
 def unregister() -> None:
+    draw_cost.unregister()
+    warmup.unregister()
+
+    for name in COLLECTION_PROPERTIES:
+        delattr(bpy.types.Collection, name)
+
+    for name in OBJECT_PROPERTIES:
+        delattr(bpy.types.Object, name)
+
     for name in SCENE_PROPERTIES:
         delattr(bpy.types.Scene, name)
 
@@ -0,0 +1,368 @@
+"""
+Headless batch export over many .blend files.
+
+Run with Blender's Python, passing the add-on arguments after "--":
+    blender -b --python-expr "import bl_ext.user_default.export_me.batch_cli as m; m.main()"
+        -- "assets/**/*.blend" --project Game
+
+or with the bpy module installed:
+    python -m bl_ext.user_default.export_me.batch_cli "assets/**/*.blend" --project Game --blender path/to/blender
+
+Every .blend is exported in its own background Blender process, running up to --jobs of them at once.
+Objects with "Batch Export Root" enabled and collections marked for export are exported. Files whose
+content did not change since the last successful run with the same options, project and profile
+preferences and add-on version, and whose outputs still exist, are skipped. A JSON summary is
+written to stdout or --summary.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import bpy
+
+from .core.cache import JsonIndex, file_digest
+from .core.types import AssetResult
+
+# Importable name of this module, also when started with python -m
+MODULE_NAME = __spec__.name if __spec__ else __name__
+RESULT_PREFIX = "EXPORT_ME_RESULT "
+DEFAULT_INDEX_NAME = ".export_me_blend_index.json"
+# Preferences that only change how the add-on is shown, not what it exports
+_UI_ONLY_PROPERTIES = {"rna_type", "favorite", "active_subpath_index", "show_root_button", "icon"}
+
+
+@dataclass
+class FileResult:
+    file: str
+    status: str
+    outputs: List[str] = field(default_factory=list)
+    duration: float = 0.0
+    peak_memory: int = 0
+    warnings: List[str] = field(default_factory=list)
+    error: str = ""
+
+
+def _script_args(argv: Optional[List[str]]) -> List[str]:
+    if argv is not None:
+        return argv
+    if "--" in sys.argv:
+        return sys.argv[sys.argv.index("--") + 1 :]
+    return sys.argv[1:]
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="export_me.batch_cli", description="Batch export .blend files to FBX")
+    parser.add_argument("files", nargs="+", help=".blend files or glob patterns (** is recursive)")
+    parser.add_argument("--project", default="", help="Project name from the add-on preferences")
+    parser.add_argument("--subpath", default="", help="Subpath name of the project to export into")
+    parser.add_argument("--output", default="", help="Export folder, overrides the project path")
+    parser.add_argument("--profile", default="", help="Export profile applied to roots without their own profile")
+    parser.add_argument("--jobs", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Parallel Blender runs")
+    parser.add_argument("--index", default="", help=f"Change index file (default: {DEFAULT_INDEX_NAME} in the cwd)")
+    parser.add_argument("--summary", default="", help="Write the JSON summary to this file instead of stdout")
+    parser.add_argument("--memory-budget", type=int, default=0, help="Per-process memory budget in MB (0: none)")
+    parser.add_argument("--force", action="store_true", help="Export every file even if unchanged")
+    parser.add_argument("--blender", default="", help="Blender executable (defaults to the running Blender)")
+    return parser.parse_args(argv)
+
+
+def _expand_files(patterns: List[str]) -> List[Path]:
+    files: Dict[str, Path] = {}
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            path = Path(match).resolve()
+            if path.suffix.lower() == ".blend" and path.is_file():
+                files.setdefault(str(path), path)
+    return sorted(files.values())
+
+
+def _addon_version() -> str:
+    try:
+        with open(Path(__file__).with_name("blender_manifest.toml"), "rb") as f:
+            return str(tomllib.load(f).get("version", ""))
+    except (OSError, tomllib.TOMLDecodeError):
+        return ""
+
+
+def _rna_values(data) -> Dict[str, Any]:
+    """Values of a preferences property group, collections included, without UI-only state"""
+    values: Dict[str, Any] = {}
+    for prop in data.bl_rna.properties:
+        name = prop.identifier
+        if name in _UI_ONLY_PROPERTIES or prop.type == "POINTER":
+            continue
+        value = getattr(data, name)
+        if prop.type == "COLLECTION":
+            values[name] = [_rna_values(item) for item in value]
+        elif getattr(prop, "is_array", False):
+            values[name] = list(value)
+        else:
+            values[name] = value
+    return values
+
+
+def _preferences_values(context) -> Dict[str, Any]:
+    """The add-on preferences exports resolve their settings from: projects and export profiles"""
+    from .core.preferences import get_preferences
+
+    try:
+        prefs = get_preferences(context)
+    except KeyError:
+        return {}
+    return {
+        "projects": [_rna_values(project) for project in prefs.custom_project_paths],
+        "profiles": [_rna_values(profile) for profile in prefs.export_profiles],
+    }
+
+
+def _options_key(args: argparse.Namespace, context) -> str:
+    """
+    Hash of everything besides the .blend that decides what a file exports to: the arguments, the
+    projects and profiles of the add-on preferences, and the add-on version
+    """
+    options = [args.project, args.subpath, args.output, args.profile, _addon_version(), _preferences_values(context)]
+    return hashlib.sha256(json.dumps(options, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _is_unchanged(index: JsonIndex, path: Path, options_key: str) -> bool:
+    entry = index.get(str(path))
+    if not entry or entry.get("options") != options_key:
+        return False
+    # Outputs deleted since, or moved away, are exported again
+    if not all(Path(output).exists() for output in entry.get("outputs", ())):
+        return False
+
+    stat = path.stat()
+    if entry.get("mtime") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+        return True
+
+    # Touched but maybe not modified: compare content and refresh the stored mtime
+    if entry.get("size") == stat.st_size and entry.get("sha256") == file_digest(path):
+        entry["mtime"] = stat.st_mtime_ns
+        index.set(str(path), entry)
+        return True
+    return False
+
+
+def _record(index: JsonIndex, path: Path, options_key: str, outputs: List[str]) -> None:
+    stat = path.stat()
+    index.set(
+        str(path),
+        {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": file_digest(path),
+            "options": options_key,
+            "outputs": outputs,
+        },
+    )
+
+
+def _run_blender(blender: str, path: Path, worker_options: Dict[str, Any]) -> Dict[str, Any]:
+    command = [
+        blender,
+        "-b",
+        str(path),
+        "--python-expr",
+        f"import {MODULE_NAME} as m; m.worker_main()",
+        "--",
+        json.dumps(worker_options),
+    ]
+
+    try:
+        process = subprocess.run(command, capture_output=True, text=True)
+    except OSError as e:
+        return {"status": "failed", "outputs": [], "error": str(e)}
+
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX) :])
+
+    error = process.stderr.strip().splitlines()[-1:] or [f"Blender exited with code {process.returncode}"]
+    return {"status": "failed", "outputs": [], "error": error[0]}
+
+
+def _run_worker(blender: str, path: Path, worker_options: Dict[str, Any]) -> FileResult:
+    started = time.perf_counter()
+    outputs: List[str] = []
+    warnings: List[str] = []
+    peak_memory = 0
+    options = dict(worker_options, roots=None)
+
+    # A worker over the memory budget stops early, the remaining roots continue in a fresh Blender
+    while True:
+        result = _run_blender(blender, path, options)
+        outputs.extend(result["outputs"])
+        warnings.extend(result.get("warnings", []))
+        peak_memory = max(peak_memory, result.get("peak_memory", 0))
+        if result["status"] != "partial":
+            break
+        options["roots"] = result["remaining"]
+
+    duration = time.perf_counter() - started
+    return FileResult(str(path), result["status"], outputs, duration, peak_memory, warnings, result.get("error", ""))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(_script_args(argv))
+    blender = args.blender or bpy.app.binary_path
+    if not blender:
+        print("No Blender executable found, pass --blender", file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+    files = _expand_files(args.files)
+    index = JsonIndex(Path(args.index) if args.index else Path.cwd() / DEFAULT_INDEX_NAME)
+    options_key = _options_key(args, bpy.context)
+    worker_options = {
+        "project": args.project,
+        "subpath": args.subpath,
+        "output": args.output,
+        "profile": args.profile,
+        "memory_budget": args.memory_budget,
+    }
+
+    results: List[FileResult] = []
+    pending: List[Path] = []
+    for path in files:
+        if not args.force and _is_unchanged(index, path, options_key):
+            results.append(FileResult(str(path), "skipped"))
+        else:
+            pending.append(path)
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        for path, result in zip(pending, pool.map(lambda p: _run_worker(blender, p, worker_options), pending)):
+            results.append(result)
+            if result.status in {"exported", "empty"}:
+                _record(index, path, options_key, result.outputs)
+
+    index.save()
+
+    summary = {
+        "files": [asdict(result) for result in results],
+        "exported": sum(result.status == "exported" for result in results),
+        "skipped": sum(result.status == "skipped" for result in results),
+        "empty": sum(result.status == "empty" for result in results),
+        "failed": sum(result.status == "failed" for result in results),
+        "peak_memory": max((result.peak_memory for result in results), default=0),
+        "duration": time.perf_counter() - started,
+    }
+
+    text = json.dumps(summary, indent=2)
+    if args.summary:
+        Path(args.summary).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+    return 1 if summary["failed"] else 0
+
+
+def resolve_export_folder(context, options: Dict[str, Any]) -> Path:
+    from .core.preferences import get_preferences, get_project_index
+
+    if options["output"]:
+        return Path(options["output"])
+
+    prefs = get_preferences(context)
+    for project_index, project in enumerate(prefs.custom_project_paths):
+        if project.project_name != options["project"]:
+            continue
+        if not options["subpath"]:
+            return Path(project.filepath)
+        for subpath_index, subpath in enumerate(project.subpaths):
+            if subpath.name == options["subpath"]:
+                return get_project_index(context).subpaths[(project_index, subpath_index)]
+        raise ValueError(f"Subpath '{options['subpath']}' not found in project '{options['project']}'")
+
+    raise ValueError(f"Project '{options['project']}' not found, pass --project or --output")
+
+
+def apply_profile_to_scene(context, profile_name: str) -> None:
+    from .core.preferences import get_preferences, PROFILE_SETTINGS
+
+    for profile in get_preferences(context).export_profiles:
+        if profile.name == profile_name:
+            for name in PROFILE_SETTINGS:
+                setattr(context.scene, name, getattr(profile, name))
+            return
+    raise ValueError(f"Export profile '{profile_name}' not found")
+
+
+def export_open_file(
+    context,
+    options: Dict[str, Any],
+    on_asset: Optional[Callable[[AssetResult], None]] = None,
+    stop_over_budget: bool = True,
+) -> Dict[str, Any]:
+    """Export the roots of the currently open .blend, returning the result reported to the caller"""
+    from .core.collection_export import resolve_collection_exports
+    from .core.preferences import get_game_engine_for_path
+    from .operators.export import FBXExporter
+
+    try:
+        export_folder = resolve_export_folder(context, options)
+        if options["profile"]:
+            apply_profile_to_scene(context, options["profile"])
+
+        collections = resolve_collection_exports(context.view_layer)
+        collection_exports = collections.exports
+        roots = [ob for ob in context.scene.objects if ob.export_me_root]
+        roots += [ob for ob in collections.object_roots if not ob.export_me_root]
+        if options["roots"] is not None:
+            roots = [ob for ob in roots if ob.name in options["roots"]]
+            collection_exports = [export for export in collection_exports if export.name in options["roots"]]
+        if not roots and not collection_exports:
+            result = {"status": "empty", "outputs": []}
+        else:
+            export_folder.mkdir(parents=True, exist_ok=True)
+            context.scene.export_folder = export_folder.as_posix()
+            context.scene.custom_name = ""
+            context.view_layer.objects.active = roots[0] if roots else collection_exports[0].roots[0]
+
+            exporter = FBXExporter(
+                context,
+                get_game_engine_for_path(context, export_folder),
+                objects=roots,
+                memory_budget_mb=options["memory_budget"],
+                stop_over_budget=stop_over_budget,
+                on_asset=on_asset,
+                collections=collection_exports,
+            )
+            batch = exporter.export()
+            result = {
+                "status": "partial" if batch.remaining else "exported",
+                "outputs": [path.as_posix() for path in (*batch.paths, *batch.clips)],
+                "remaining": batch.remaining,
+                "instances": batch.instances,
+                "peak_memory": batch.peak_memory,
+                "warnings": batch.warnings + [f"{name}: hidden, not exported" for name in collections.skipped],
+            }
+    except Exception as e:
+        result = {"status": "failed", "outputs": [], "error": f"{type(e).__name__}: {e}"}
+
+    return result
+
+
+def worker_main() -> None:
+    """Export the roots of the currently open .blend, run inside a background Blender"""
+    options = json.loads(_script_args(None)[0])
+    result = export_open_file(bpy.context, options)
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,16 @@
-from .types import ExportSettings, ProjectPath
-from .preferences import get_preferences, get_custom_paths, get_game_engine_for_path
+from . import startup
+from .types import ExportSettings, ProjectPath, ProjectIndex
+from .preferences import get_preferences, get_custom_paths, get_game_engine_for_path, get_project_index
 from .paths import resolve_export_path, get_children
 
 __all__ = [
     "ExportSettings",
     "ProjectPath",
+    "ProjectIndex",
     "get_preferences",
     "get_custom_paths",
     "get_game_engine_for_path",
+    "get_project_index",
     "resolve_export_path",
     "get_children",
 ]
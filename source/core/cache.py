@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+import os
+import hashlib
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterator, Optional
+
+
+class JsonIndex:
+    """Small key/value index persisted as a JSON file, written atomically on save"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._entries: Dict[str, Any] = {}
+        self._dirty = False
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._entries = data
+        except (OSError, ValueError):
+            pass
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._entries.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._dirty = True
+
+    def pop(self, key: str) -> Optional[Any]:
+        if key not in self._entries:
+            return None
+        self._dirty = True
+        return self._entries.pop(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's content, read in chunks"""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _value_bytes(value: Any) -> int:
+    return getattr(value, "nbytes", 0)
+
+
+class LRUCache:
+    """
+    In-memory cache keeping the most recently used max_entries values.
+
+    With max_bytes, values are also dropped until the nbytes of the numpy arrays kept add up to at
+    most that. A single value larger than max_bytes is not kept.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 0) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self._entries:
+            return default
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if key in self._entries:
+            self.nbytes -= _value_bytes(self._entries[key])
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self.nbytes += _value_bytes(value)
+        while len(self._entries) > self.max_entries or (self.max_bytes and self.nbytes > self.max_bytes):
+            _, dropped = self._entries.popitem(last=False)
+            self.nbytes -= _value_bytes(dropped)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.nbytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
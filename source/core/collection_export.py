@@ -0,0 +1,104 @@
+"""
+Collections marked for export and the export roots they stand for.
+
+A marked collection exports its objects and those of its nested collections, either as one FBX
+named after the collection or as one FBX per top-level object. A nested collection marked itself
+is exported on its own instead of as part of its parent. Objects hidden or excluded from the view
+layer are left out, the FBX exporter only writes objects it can select.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Set
+import bpy
+from bpy.types import Collection, Object, ViewLayer
+
+
+@dataclass
+class CollectionExport:
+    name: str
+    # Objects of the collection without a parent in it, exported with their children
+    roots: List[Object] = field(default_factory=list)
+    # Tells the collection apart from a linked one with the same name
+    session_uid: int = 0
+
+
+@dataclass
+class ResolvedCollections:
+    exports: List[CollectionExport] = field(default_factory=list)
+    # Roots of collections exported per object
+    object_roots: List[Object] = field(default_factory=list)
+    # Members the FBX exporter cannot select: hidden, or in a collection excluded from the view layer
+    skipped: List[str] = field(default_factory=list)
+
+
+def _collection_members(
+    collection: Collection, children: Dict[int, List[Collection]], visible: Set[int], skipped: Dict[int, str]
+) -> List[Object]:
+    """Visible objects of a collection and of its nested collections that are not marked themselves"""
+    members: List[Object] = []
+    seen: Set[int] = set()
+    visited: Set[int] = set()
+    pending = [collection]
+
+    while pending:
+        current = pending.pop()
+        if current.session_uid in visited:
+            continue
+        visited.add(current.session_uid)
+
+        for obj in current.objects:
+            if obj.session_uid in seen:
+                continue
+            seen.add(obj.session_uid)
+            if obj.session_uid in visible:
+                members.append(obj)
+            else:
+                skipped[obj.session_uid] = obj.name
+        nested = [child for child in children[current.session_uid] if child.export_me_collection == "NONE"]
+        pending.extend(reversed(nested))
+
+    return members
+
+
+def resolve_collection_exports(view_layer: ViewLayer) -> ResolvedCollections:
+    """
+    Collections exported as one FBX each, and the roots of collections exported per object.
+
+    Nesting is read in one pass over bpy.data.collections. Collections are told apart by their
+    session_uid, as linked libraries can bring several with the same name.
+    """
+    children: Dict[int, List[Collection]] = {}
+    marked: List[Collection] = []
+
+    for collection in bpy.data.collections:
+        children[collection.session_uid] = list(collection.children)
+        if collection.export_me_collection != "NONE":
+            marked.append(collection)
+
+    resolved = ResolvedCollections()
+    if not marked:
+        return resolved
+
+    visible = {obj.session_uid for obj in view_layer.objects if obj.visible_get(view_layer=view_layer)}
+    skipped: Dict[int, str] = {}
+    added: Set[int] = set()
+
+    for collection in marked:
+        members = _collection_members(collection, children, visible, skipped)
+        uids = {obj.session_uid for obj in members}
+        roots = [obj for obj in members if obj.parent is None or obj.parent.session_uid not in uids]
+        if not roots:
+            continue
+
+        if collection.export_me_collection == "COLLECTION":
+            resolved.exports.append(CollectionExport(collection.name, roots, collection.session_uid))
+            continue
+        for root in roots:
+            if root.session_uid not in added:
+                added.add(root.session_uid)
+                resolved.object_roots.append(root)
+
+    resolved.skipped = sorted(skipped.values())
+    return resolved
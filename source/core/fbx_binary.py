@@ -0,0 +1,375 @@
+"""
+Streaming access to binary FBX files, without loading them into Blender.
+
+Files are memory-mapped and only the node headers and properties that are asked for are decoded,
+so large geometry arrays are never read unless needed. Layout reference: the binary encoder of
+Blender's FBX add-on (io_scene_fbx/encode_bin.py).
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+HEAD_MAGIC = b"Kaydara FBX Binary  \x00\x1a\x00"
+FOOT_MAGIC = b"\xf8\x5a\x8c\x6a\xde\xf5\xd9\x7e\xec\xe9\x0c\xe3\x75\x8f\x29\x0b"
+NAME_SEPARATOR = b"\x00\x01"
+HEADER_SIZE = len(HEAD_MAGIC) + 4
+# Version, 120 zero bytes and the magic closing every footer
+FOOT_TAIL_SIZE = 4 + 120 + len(FOOT_MAGIC)
+
+_SCALAR_FORMATS = {b"Y": "<h", b"C": "<?", b"I": "<i", b"F": "<f", b"D": "<d", b"L": "<q"}
+_SCALAR_SIZES = {code: struct.calcsize(fmt) for code, fmt in _SCALAR_FORMATS.items()}
+_ARRAY_TYPES = {b"f": "<f4", b"d": "<f8", b"l": "<i8", b"i": "<i4", b"b": "u1"}
+_ARRAY_HEADER = struct.Struct("<III")
+_LENGTH = struct.Struct("<I")
+
+
+class FBXFormatError(ValueError):
+    pass
+
+
+# What decoding a truncated or corrupt file raises, reported as FBXFormatError
+_DECODE_ERRORS = (struct.error, UnicodeDecodeError, zlib.error, ValueError, IndexError)
+
+
+@contextmanager
+def _format_errors(path: Path) -> Iterator[None]:
+    try:
+        yield
+    except FBXFormatError:
+        raise
+    except _DECODE_ERRORS as e:
+        raise FBXFormatError(f"{path.name} is damaged: {e}") from e
+
+
+@dataclass
+class FBXNode:
+    name: str
+    offset: int
+    end: int
+    property_count: int
+    properties_length: int
+    properties_offset: int
+
+    @property
+    def children_offset(self) -> int:
+        return self.properties_offset + self.properties_length
+
+
+def split_name(value: bytes) -> Tuple[str, str]:
+    """Split an FBX object name ("Name\\x00\\x01Class") into its name and class"""
+    name, _, fbx_class = value.partition(NAME_SEPARATOR)
+    return name.decode("utf-8", "replace"), fbx_class.decode("utf-8", "replace")
+
+
+class FBXFile:
+    """Read-only, memory-mapped binary FBX file"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            self._file.close()
+            raise FBXFormatError(f"{path.name} is empty") from e
+
+        if len(self.data) < HEADER_SIZE or self.data[: len(HEAD_MAGIC)] != HEAD_MAGIC:
+            self.close()
+            raise FBXFormatError(f"{path.name} is not a binary FBX file")
+
+        self.version = struct.unpack_from("<I", self.data, len(HEAD_MAGIC))[0]
+        # Files from 7.5 on use 64 bit offsets in the node headers
+        self._node_header = struct.Struct("<QQQB" if self.version >= 7500 else "<IIIB")
+        self.sentinel_size = self._node_header.size
+        self._top_level_end: Optional[int] = None
+
+    def __enter__(self) -> FBXFile:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if not self.data.closed:
+            self.data.close()
+        self._file.close()
+
+    def _read_node(self, offset: int) -> Optional[FBXNode]:
+        end, property_count, properties_length, name_length = self._node_header.unpack_from(self.data, offset)
+        if end == 0:
+            return None
+        if end > len(self.data):
+            raise FBXFormatError(f"{self.path.name} is truncated")
+        name_offset = offset + self._node_header.size
+        name = self.data[name_offset : name_offset + name_length].decode("ascii")
+        return FBXNode(name, offset, end, property_count, properties_length, name_offset + name_length)
+
+    def children(self, node: Optional[FBXNode] = None) -> Iterator[FBXNode]:
+        """Nested nodes of node, or the top level nodes when node is None"""
+        offset = HEADER_SIZE if node is None else node.children_offset
+        end = len(self.data) if node is None else node.end
+
+        while offset + self._node_header.size <= end:
+            child = self._read_node(offset)
+            if child is None:
+                break
+            yield child
+            offset = child.end
+
+        if node is None:
+            self._top_level_end = offset
+
+    def find(self, *names: str, node: Optional[FBXNode] = None) -> Optional[FBXNode]:
+        """First node found by following names down from node, e.g. find("Objects", "Model")"""
+        for name in names:
+            node = next((child for child in self.children(node) if child.name == name), None)
+            if node is None:
+                return None
+        return node
+
+    @property
+    def top_level_end(self) -> int:
+        """Offset of the null record closing the top level nodes, where the footer starts"""
+        if self._top_level_end is None:
+            for _ in self.children():
+                pass
+        return self._top_level_end
+
+    def property_spans(self, node: FBXNode) -> Iterator[Tuple[bytes, int, int]]:
+        """(type code, start, end) of each property of node, without decoding the values"""
+        data = self.data
+        offset = node.properties_offset
+        for _ in range(node.property_count):
+            code = data[offset : offset + 1]
+            if code in _SCALAR_SIZES:
+                end = offset + 1 + _SCALAR_SIZES[code]
+            elif code in _ARRAY_TYPES:
+                end = offset + 1 + _ARRAY_HEADER.size + _ARRAY_HEADER.unpack_from(data, offset + 1)[2]
+            elif code in (b"S", b"R"):
+                end = offset + 1 + _LENGTH.size + _LENGTH.unpack_from(data, offset + 1)[0]
+            else:
+                raise FBXFormatError(f"Unknown property type {code!r} in {node.name}")
+            yield code, offset, end
+            offset = end
+
+    def read_property(self, code: bytes, offset: int) -> Any:
+        data = self.data
+        if code in _SCALAR_FORMATS:
+            return struct.unpack_from(_SCALAR_FORMATS[code], data, offset + 1)[0]
+        if code in (b"S", b"R"):
+            length = _LENGTH.unpack_from(data, offset + 1)[0]
+            start = offset + 1 + _LENGTH.size
+            return bytes(data[start : start + length])
+
+        length, encoding, stored_length = _ARRAY_HEADER.unpack_from(data, offset + 1)
+        start = offset + 1 + _ARRAY_HEADER.size
+        raw = data[start : start + stored_length]
+        if encoding == 1:
+            raw = zlib.decompress(raw)
+        return np.frombuffer(raw, dtype=_ARRAY_TYPES[code], count=length)
+
+    def properties(self, node: FBXNode) -> List[Any]:
+        return [self.read_property(code, start) for code, start, _ in self.property_spans(node)]
+
+    def first_property(self, node: FBXNode) -> Any:
+        for code, start, _ in self.property_spans(node):
+            return self.read_property(code, start)
+        return None
+
+
+@dataclass
+class FBXSummary:
+    """What an exported FBX contains, as far as export verification is concerned"""
+
+    version: int
+    models: List[str] = field(default_factory=list)
+    materials: List[str] = field(default_factory=list)
+    model_materials: Dict[str, List[str]] = field(default_factory=dict)
+    # Largest polygon of the geometry of each mesh model
+    model_polygon_sizes: Dict[str, int] = field(default_factory=dict)
+    polygons: int = 0
+    triangles: int = 0
+    max_polygon_size: int = 0
+    up_axis: Optional[Tuple[int, int]] = None
+
+
+def _read_axes(fbx: FBXFile, summary: FBXSummary) -> None:
+    properties = fbx.find("GlobalSettings", "Properties70")
+    if properties is None:
+        return
+
+    axes: Dict[bytes, int] = {}
+    for node in fbx.children(properties):
+        values = fbx.properties(node)
+        if values and values[0] in (b"UpAxis", b"UpAxisSign"):
+            axes[values[0]] = values[-1]
+    if len(axes) == 2:
+        summary.up_axis = (axes[b"UpAxis"], axes[b"UpAxisSign"])
+
+
+def _read_geometry(fbx: FBXFile, geometry: FBXNode, summary: FBXSummary) -> int:
+    """Add a geometry's polygons to the summary, returning the size of its largest polygon"""
+    node = fbx.find("PolygonVertexIndex", node=geometry)
+    if node is None:
+        return 0
+
+    # The last index of every polygon is stored as ~index
+    indices = fbx.first_property(node)
+    polygon_ends = np.flatnonzero(indices < 0)
+    summary.polygons += len(polygon_ends)
+    summary.triangles += len(indices) - 2 * len(polygon_ends)
+    if not len(polygon_ends):
+        return 0
+    largest = int(np.diff(polygon_ends, prepend=-1).max())
+    summary.max_polygon_size = max(summary.max_polygon_size, largest)
+    return largest
+
+
+def summarize(path: Path) -> FBXSummary:
+    """Read mesh models, materials, polygon counts and the up axis of a binary FBX"""
+    with _format_errors(path), FBXFile(path) as fbx:
+        summary = FBXSummary(fbx.version)
+        _read_axes(fbx, summary)
+
+        model_names: Dict[int, str] = {}
+        material_names: Dict[int, str] = {}
+        polygon_sizes: Dict[int, int] = {}
+        objects = fbx.find("Objects")
+        for node in fbx.children(objects) if objects else ():
+            if node.name == "Geometry":
+                polygon_sizes[fbx.properties(node)[0]] = _read_geometry(fbx, node, summary)
+            elif node.name in ("Model", "Material"):
+                uid, name, sub_type = fbx.properties(node)[:3]
+                if node.name == "Material":
+                    material_names[uid] = split_name(name)[0]
+                elif sub_type == b"Mesh":
+                    model_names[uid] = split_name(name)[0]
+
+        summary.models = list(model_names.values())
+        summary.materials = list(material_names.values())
+        summary.model_materials = {name: [] for name in summary.models}
+
+        connections = fbx.find("Connections")
+        for node in fbx.children(connections) if connections else ():
+            values = fbx.properties(node)
+            if len(values) < 3 or values[2] not in model_names:
+                continue
+            if values[1] in material_names:
+                summary.model_materials[model_names[values[2]]].append(material_names[values[1]])
+            elif values[1] in polygon_sizes:
+                summary.model_polygon_sizes[model_names[values[2]]] = polygon_sizes[values[1]]
+
+    return summary
+
+
+class _RenameWriter:
+    """Copies an FBX node by node, rewriting names and the node end offsets they shift"""
+
+    def __init__(self, fbx: FBXFile, out: BinaryIO, renames: Dict[bytes, Dict[bytes, bytes]]) -> None:
+        self.fbx = fbx
+        self.out = out
+        self.renames = renames
+        self.view = memoryview(fbx.data)
+        self.renamed = 0
+
+    def write_node(self, node: FBXNode, is_object: bool) -> None:
+        out = self.out
+        header = self.fbx._node_header
+        start = out.tell()
+        out.write(bytes(header.size))
+        out.write(node.name.encode("ascii"))
+
+        properties = self._renamed_properties(node) if is_object else None
+        if properties is None:
+            out.write(self.view[node.properties_offset : node.children_offset])
+            properties_length = node.properties_length
+        else:
+            out.write(properties)
+            properties_length = len(properties)
+
+        offset = node.children_offset
+        for child in self.fbx.children(node):
+            self.write_node(child, node.name == "Objects")
+            offset = child.end
+        # The null record closing the nested nodes, when there is one
+        out.write(self.view[offset : node.end])
+
+        end = out.tell()
+        out.seek(start)
+        out.write(header.pack(end, node.property_count, properties_length, len(node.name)))
+        out.seek(end)
+
+    def _renamed_properties(self, node: FBXNode) -> Optional[bytes]:
+        chunks: List[bytes] = []
+        changed = False
+        for code, start, end in self.fbx.property_spans(node):
+            if code == b"S":
+                value = self.fbx.read_property(code, start)
+                name, separator, fbx_class = value.partition(NAME_SEPARATOR)
+                new_name = self.renames.get(fbx_class, {}).get(name) if separator else None
+                if new_name is not None:
+                    value = new_name + NAME_SEPARATOR + fbx_class
+                    chunks.append(b"S" + _LENGTH.pack(len(value)) + value)
+                    changed = True
+                    self.renamed += 1
+                    continue
+            chunks.append(bytes(self.view[start:end]))
+        return b"".join(chunks) if changed else None
+
+    def write_footer(self) -> None:
+        fbx = self.fbx
+        top_level_end = fbx.top_level_end
+        footer_offset = top_level_end + fbx.sentinel_size
+        self.out.write(self.view[top_level_end:footer_offset])
+
+        if fbx.data[-len(FOOT_MAGIC) :] != FOOT_MAGIC:
+            self.out.write(self.view[footer_offset:])
+            return
+
+        # Footer id and four zero bytes, then padding aligning the footer tail to 16 bytes
+        self.out.write(self.view[footer_offset : footer_offset + 20])
+        padding = ((self.out.tell() + 15) & ~15) - self.out.tell()
+        self.out.write(bytes(padding or 16))
+        self.out.write(self.view[len(fbx.data) - FOOT_TAIL_SIZE :])
+
+
+def rename_objects(source: Path, destination: Path, renames: Dict[str, Dict[str, str]]) -> int:
+    """
+    Write a copy of a binary FBX with objects renamed, in one streaming pass.
+
+    renames maps an FBX class (Model, Geometry, Material, NodeAttribute) to {old name: new name}.
+    source and destination may be the same file. Returns the number of names replaced.
+    """
+    encoded = {
+        fbx_class.encode(): {old.encode(): new.encode() for old, new in names.items()}
+        for fbx_class, names in renames.items()
+    }
+    tmp_path = destination.with_name(f"{destination.name}.tmp")
+
+    try:
+        with _format_errors(source), FBXFile(source) as fbx, open(tmp_path, "wb") as out:
+            writer = _RenameWriter(fbx, out, encoded)
+            try:
+                out.write(writer.view[:HEADER_SIZE])
+                for node in fbx.children():
+                    writer.write_node(node, False)
+                writer.write_footer()
+            finally:
+                # The map cannot be closed while a view on it is alive
+                writer.view.release()
+            renamed = writer.renamed
+        os.replace(tmp_path, destination)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return renamed
@@ -0,0 +1,128 @@
+"""
+Content-addressed store of exported FBX files.
+
+An FBX is stored under a key describing everything it is written from: the source fingerprints,
+the names written into it and the effective settings. Exporting the same content to another
+folder places the stored file there, as a hardlink when the folders share a volume, instead of
+exporting again. The store is bounded in size, least recently used files are evicted first.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from .cache import JsonIndex
+
+STORE_FOLDER = "fbx_store"
+USAGE_INDEX_NAME = "usage.json"
+
+
+def detach(path: Path) -> bool:
+    """
+    Remove a destination sharing its data with other links, so writing it in place does not change them.
+
+    Returns False when the path is still linked, on Windows when another program has the file open.
+    """
+    try:
+        if path.stat().st_nlink <= 1:
+            return True
+    except OSError:
+        # Missing, nothing to share
+        return True
+    try:
+        path.unlink()
+    except OSError:
+        return False
+    return True
+
+
+def place(source: Path, destination: Path) -> None:
+    """Put a file at destination as a hardlink of source, or as a copy across volumes"""
+    tmp_path = destination.with_name(f"{destination.name}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+
+class FBXStore:
+    """
+    Exported FBX files by content key, shared by every folder they are exported to.
+
+    Files are the source of truth, so several Blender processes can share a store: last use times
+    are kept in a small index, rather than on the files, as touching a file would also touch every
+    destination hardlinked to it.
+    """
+
+    def __init__(self, folder: Path, max_bytes: int) -> None:
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._usage = JsonIndex(folder / USAGE_INDEX_NAME)
+
+    def _path(self, key: str) -> Path:
+        return self.folder / f"{key}.fbx"
+
+    def fetch(self, key: str, destination: Path) -> bool:
+        """Place the stored FBX for key at destination, False when there is none"""
+        stored = self._path(key)
+        try:
+            place(stored, destination)
+        except OSError:
+            return False
+        self._usage.set(key, time.time())
+        return True
+
+    def add(self, key: str, source: Path) -> None:
+        """Store a freshly written FBX, linked to it when possible"""
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            place(source, self._path(key))
+        except OSError:
+            # The store only saves time, an export never fails because of it
+            return
+        self._usage.set(key, time.time())
+
+    def evict(self) -> int:
+        """Remove least recently used files until the store fits its size, returning the bytes freed"""
+        entries: List[Tuple[float, int, Path]] = []
+        try:
+            with os.scandir(self.folder) as scan:
+                for entry in scan:
+                    if entry.name.endswith(".fbx") and entry.is_file():
+                        stat = entry.stat()
+                        used = self._usage.get(entry.name[: -len(".fbx")], stat.st_mtime)
+                        entries.append((used, stat.st_size, Path(entry.path)))
+        except OSError:
+            return 0
+
+        # Files evicted by another process leave their usage behind
+        stored = {path.stem for _, _, path in entries}
+        for key in self._usage:
+            if key not in stored:
+                self._usage.pop(key)
+
+        excess = sum(size for _, size, _ in entries) - self.max_bytes
+        freed = 0
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if freed >= excess:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            self._usage.pop(path.stem)
+            freed += size
+        return freed
+
+    def close(self) -> None:
+        self.evict()
+        try:
+            self._usage.save()
+        except OSError:
+            pass
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Optional
+
+import numpy as np
+from bpy.types import Material, Mesh, Object
+
+from .warmup import material_value, mesh_value
+
+
+def _hash_values(digest, collection, attribute: str, dtype, width: int = 1) -> None:
+    values = np.empty(len(collection) * width, dtype=dtype)
+    collection.foreach_get(attribute, values)
+    digest.update(values.tobytes())
+
+
+def mesh_fingerprint(mesh: Mesh) -> str:
+    """Hash of the geometry and attributes a mesh is exported with, independent of its name"""
+    digest = hashlib.sha1()
+    _hash_values(digest, mesh.vertices, "co", np.float32, 3)
+    _hash_values(digest, mesh.edges, "vertices", np.int32, 2)
+    _hash_values(digest, mesh.edges, "use_edge_sharp", bool)
+    _hash_values(digest, mesh.loops, "vertex_index", np.int32)
+    _hash_values(digest, mesh.polygons, "loop_total", np.int32)
+    _hash_values(digest, mesh.polygons, "material_index", np.int32)
+    _hash_values(digest, mesh.polygons, "use_smooth", bool)
+
+    for uv_layer in mesh.uv_layers:
+        digest.update(uv_layer.name.encode())
+        _hash_values(digest, uv_layer.data, "uv", np.float32, 2)
+
+    for attribute in mesh.color_attributes:
+        digest.update(f"{attribute.name}:{attribute.domain}:{attribute.data_type}".encode())
+        _hash_values(digest, attribute.data, "color", np.float32, 4)
+
+    if mesh.has_custom_normals:
+        _hash_values(digest, mesh.corner_normals, "vector", np.float32, 3)
+
+    return digest.hexdigest()
+
+
+def topology_fingerprint(mesh: Mesh) -> str:
+    """Hash of the vertex count and polygon connectivity only, for results that do not depend on positions"""
+    digest = hashlib.sha1(str(len(mesh.vertices)).encode())
+    _hash_values(digest, mesh.loops, "vertex_index", np.int32)
+    _hash_values(digest, mesh.polygons, "loop_total", np.int32)
+    return digest.hexdigest()
+
+
+def geometry_fingerprint(mesh: Mesh) -> str:
+    """Hash of the vertex positions, edges and polygon connectivity, for results that do not depend on attributes"""
+    digest = hashlib.sha1()
+    _hash_values(digest, mesh.vertices, "co", np.float32, 3)
+    _hash_values(digest, mesh.edges, "vertices", np.int32, 2)
+    _hash_values(digest, mesh.edges, "use_seam", bool)
+    _hash_values(digest, mesh.loops, "vertex_index", np.int32)
+    _hash_values(digest, mesh.polygons, "loop_total", np.int32)
+    return digest.hexdigest()
+
+
+def max_polygon_size(mesh: Mesh) -> int:
+    if not mesh.polygons:
+        return 0
+    sizes = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", sizes)
+    return int(sizes.max())
+
+
+def material_indices(mesh: Mesh) -> np.ndarray:
+    indices = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", indices)
+    return indices
+
+
+def material_fingerprint(material: Optional[Material]) -> str:
+    """Hash of the node setup the FBX exporter reads a material from, independent of its name"""
+    digest = hashlib.sha1()
+    if material is None:
+        return digest.hexdigest()
+
+    digest.update(repr(tuple(material.diffuse_color)).encode())
+    if material.use_nodes and material.node_tree:
+        for node in sorted(material.node_tree.nodes, key=lambda node: node.name):
+            digest.update(node.bl_idname.encode())
+            image = getattr(node, "image", None)
+            if image is not None:
+                digest.update(image.filepath_raw.encode())
+            for socket in node.inputs:
+                if not socket.is_linked and hasattr(socket, "default_value"):
+                    value = socket.default_value
+                    digest.update(repr(tuple(value) if hasattr(value, "__len__") else value).encode())
+        for link in material.node_tree.links:
+            source = f"{link.from_node.bl_idname}.{link.from_socket.identifier}"
+            digest.update(f"{source}>{link.to_node.bl_idname}.{link.to_socket.identifier}".encode())
+
+    return digest.hexdigest()
+
+
+def object_fingerprint(obj: Object, parent: str = "") -> str:
+    """Hash of an object's type, data, materials and world transform, chained to its parent's fingerprint"""
+    digest = hashlib.sha1(parent.encode())
+    digest.update(obj.type.encode())
+    digest.update(repr(tuple(round(value, 5) for row in obj.matrix_world for value in row)).encode())
+
+    if obj.type == "MESH" and obj.data:
+        digest.update(mesh_value(obj.data, "fingerprint", mesh_fingerprint).encode())
+    for slot in obj.material_slots:
+        material = slot.material
+        digest.update((material_value(material, material_fingerprint) if material else "").encode())
+
+    return digest.hexdigest()
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import gc
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+MB = 1024 * 1024
+
+
+def _windows_memory() -> Tuple[int, int]:
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return 0, 0
+    return counters.WorkingSetSize, counters.PeakWorkingSetSize
+
+
+def _posix_memory() -> Tuple[int, int]:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    peak = peak if sys.platform == "darwin" else peak * 1024
+
+    current = peak
+    try:
+        with open("/proc/self/statm", "r") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    return current, peak
+
+
+def process_memory() -> Tuple[int, int]:
+    """Return (current, peak) resident memory of this process in bytes, (0, 0) if unavailable"""
+    try:
+        return _windows_memory() if sys.platform == "win32" else _posix_memory()
+    except (OSError, AttributeError, ImportError):
+        return 0, 0
+
+
+@dataclass
+class MemorySample:
+    name: str
+    current: int
+    peak: int
+
+
+@dataclass
+class MemoryTracker:
+    budget: int = 0
+    samples: List[MemorySample] = field(default_factory=list)
+    peak: int = 0
+    collections: int = 0
+
+    def sample(self, name: str) -> MemorySample:
+        current, peak = process_memory()
+        self.peak = max(self.peak, peak, current)
+        sample = MemorySample(name, current, peak)
+        self.samples.append(sample)
+        return sample
+
+    def over_budget(self, sample: Optional[MemorySample] = None) -> bool:
+        if not self.budget:
+            return False
+        current = sample.current if sample else process_memory()[0]
+        return current > self.budget
+
+    def collect(self, release: Optional[Callable[[], None]] = None) -> bool:
+        """
+        Free what the caller can release, then run the garbage collector. Return True if memory is
+        back under budget.
+
+        The garbage collector only frees Python objects, Blender data blocks are freed by release.
+        """
+        if release is not None:
+            release()
+        gc.collect()
+        self.collections += 1
+        return not self.over_budget()
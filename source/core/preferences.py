@@ -3,13 +3,40 @@ from __future__ import annotations
 from typing import Tuple
 import bpy
 from pathlib import Path
-from bpy.props import StringProperty, BoolProperty, CollectionProperty, IntProperty, EnumProperty
-from bpy.types import PropertyGroup, AddonPreferences, Context
+from bpy.props import StringProperty, BoolProperty, CollectionProperty, IntProperty, EnumProperty, FloatProperty
+from bpy.types import PropertyGroup, AddonPreferences, Context, UILayout
 
+from .types import ProjectIndex, normalize_folder
 from .. import __package__ as base_package
 
 assert base_package is not None
 
+_project_index: ProjectIndex | None = None
+
+# Scene toggles an export profile can override
+PROFILE_SETTINGS: Tuple[str, ...] = (
+    "center_transform",
+    "apply_transform",
+    "one_material_id",
+    "no_decal_uv",
+    "rename_dot",
+    "triangulate",
+    "black_vertex",
+    "fix_collider",
+    "export_animations",
+    "export_smoothing",
+)
+
+# Rows the project and subpath lists show before scrolling
+LIST_ROWS = 6
+
+# Project options applied to every export into the project's folders
+PROJECT_SETTINGS: Tuple[str, ...] = (
+    "cleanup_mesh",
+    "weld_distance",
+    "export_tangents",
+)
+
 
 def get_preferences(context: Context) -> ExportMEPreferences:
     return context.preferences.addons[base_package].preferences
@@ -21,20 +48,63 @@ def get_custom_paths(context: Context) -> bpy.types.bpy_prop_collection:
 
 def get_game_engine_for_path(context: Context, export_path: Path) -> str:
     """Get the game engine setting for the project containing the export path"""
+    return get_project_index(context).engine_for(export_path)
+
+
+def get_project_for_path(context: Context, export_path: Path) -> CustomProjectPath | None:
+    """Get the project containing the export path, None outside every project"""
+    project_index = get_project_index(context).project_for(export_path)
+    return None if project_index is None else get_preferences(context).custom_project_paths[project_index]
+
+
+def get_project_index(context: Context) -> ProjectIndex:
+    """Get the cached project snapshot, rebuilding it if the preferences changed"""
+    global _project_index
+
     prefs = get_preferences(context)
-    export_path_resolved = export_path.resolve()
+    if _project_index is None or _project_index.count != len(prefs.custom_project_paths):
+        _project_index = _build_project_index(prefs)
+    return _project_index
+
+
+def invalidate_project_index(self=None, context: Context | None = None) -> None:
+    """Drop the cached project snapshot (usable as a property update callback)"""
+    global _project_index
+    _project_index = None
+
+
+def _build_project_index(prefs: ExportMEPreferences) -> ProjectIndex:
+    index = ProjectIndex(count=len(prefs.custom_project_paths))
+
+    for project_index, project in enumerate(prefs.custom_project_paths):
+        name = project.project_name or f"Project {project_index + 1}"
+        index.enum_items.append((str(project_index), name, f"Select {name}", project_index))
+        index.engines.append(project.game_engine)
+
+        project_root = Path(project.filepath)
+        search_text = [name, project.filepath]
+        for subpath_index, subpath in enumerate(project.subpaths):
+            full_path = project_root / subpath.relative_path if subpath.relative_path else project_root
+            key = (project_index, subpath_index)
+            index.subpaths[key] = full_path
+            index.subpath_search_text[key] = f"{subpath.name}\n{subpath.relative_path}".lower()
+            index.subpath_folders.setdefault(normalize_folder(str(full_path)), key)
+            search_text.append(subpath.name)
+        index.search_text.append("\n".join(search_text).lower())
 
-    for project in prefs.custom_project_paths:
         if not project.filepath:
+            index.resolved_roots.append(None)
             continue
-        project_path = Path(project.filepath).resolve()
-        try:
-            export_path_resolved.relative_to(project_path)
-            return project.game_engine
-        except ValueError:
-            continue
 
-    return "UNREAL"
+        resolved = project_root.resolve()
+        index.resolved_roots.append(resolved)
+        # First project wins when several share the same root
+        index.roots.setdefault(resolved, project_index)
+
+    if not index.enum_items:
+        index.enum_items.append(("0", "No Projects", "No projects available", 0))
+
+    return index
 
 
 def get_recommended_smoothing(game_engine: str) -> str:
@@ -84,17 +154,24 @@ class ProjectSubpath(PropertyGroup):
         name="Subpath Name",
         description="Display name for this subpath",
         default="",
+        update=invalidate_project_index,
     )
     relative_path: StringProperty(
         name="Relative Path",
         description="Path relative to project root (e.g., Content/Assets)",
         default="",
+        update=invalidate_project_index,
     )
     icon: StringProperty(
         name="Icon",
         description="Icon identifier for this subpath",
         default="BOOKMARKS",
     )
+    favorite: BoolProperty(
+        name="Favorite",
+        description="List this subpath first in the project browser",
+        default=False,
+    )
 
 
 class CustomProjectPath(PropertyGroup):
@@ -102,10 +179,12 @@ class CustomProjectPath(PropertyGroup):
         name="Custom Project Path",
         subtype="FILE_PATH",
         description="Project root path",
+        update=invalidate_project_index,
     )
     project_name: StringProperty(
         name="Project Name",
         description="Display name for this project",
+        update=invalidate_project_index,
     )
     game_engine: EnumProperty(
         name="Target Game Engine",
@@ -116,6 +195,7 @@ class CustomProjectPath(PropertyGroup):
             ("GODOT", "Godot", "Godot - Forward: -Z, Up: Y, Scale: 1.0"),
         ],
         default="UNREAL",
+        update=invalidate_project_index,
     )
     show_root_button: BoolProperty(
         name="Show Root Folder Button",
@@ -127,13 +207,72 @@ class CustomProjectPath(PropertyGroup):
         name="Subpaths",
         description="List of subpaths for this project",
     )
+    active_subpath_index: IntProperty(name="Active Subpath", default=0)
+    favorite: BoolProperty(
+        name="Favorite",
+        description="List this project first in the project browser",
+        default=False,
+    )
+    cleanup_mesh: BoolProperty(
+        name="Clean Up Meshes",
+        description=(
+            "Weld duplicate vertices, remove loose geometry and strip unused UV layers and material slots "
+            "from the exported copy of each mesh"
+        ),
+        default=False,
+    )
+    weld_distance: FloatProperty(
+        name="Weld Distance",
+        description="Vertices closer than this with the same normal are merged",
+        default=0.0001,
+        min=0.0,
+        precision=5,
+        subtype="DISTANCE",
+    )
+    export_tangents: BoolProperty(
+        name="Export Tangents",
+        description=(
+            "Write tangents and binormals into the FBX so the engine can import them instead of computing "
+            "them again. Quads are triangulated too, so the tangents match the triangles the engine reads"
+        ),
+        default=False,
+    )
+
+
+class ExportProfile(PropertyGroup):
+    name: StringProperty(
+        name="Profile Name",
+        description="Name used to attach this profile to collections and objects",
+        default="Profile",
+    )
+    center_transform: BoolProperty(name="Center transform", default=True)
+    apply_transform: BoolProperty(name="Apply transform", default=True)
+    one_material_id: BoolProperty(name="One material ID", default=False)
+    no_decal_uv: BoolProperty(name="Remove Decal UV", default=True)
+    rename_dot: BoolProperty(name="Replace Dot", default=True)
+    triangulate: BoolProperty(name="Triangulate", default=True)
+    black_vertex: BoolProperty(name="Set Vertex Color", default=True)
+    fix_collider: BoolProperty(name="Fix Collider", default=True)
+    export_animations: BoolProperty(name="Export Rig & Animations", default=False)
+    export_smoothing: EnumProperty(
+        name="Smoothing",
+        description="Export smoothing information mode",
+        items=(
+            ("EDGE", "Edge", "Write edge smoothing", 0),
+            ("FACE", "Face", "Write face smoothing", 1),
+            ("OFF", "Normals Only", "Write normals only", 2),
+        ),
+        default="OFF",
+    )
 
 
 class ExportMEPreferences(AddonPreferences):
     bl_idname = base_package
 
     custom_project_paths: CollectionProperty(type=CustomProjectPath)
+    active_project_index: IntProperty(name="Active Project", default=0)
     recent_export_paths: CollectionProperty(type=RecentExportPath)
+    export_profiles: CollectionProperty(type=ExportProfile)
     max_recent_paths: IntProperty(
         name="Max Recent Paths",
         description="Maximum number of recent export paths to remember",
@@ -151,6 +290,57 @@ class ExportMEPreferences(AddonPreferences):
         description="Hide the folder navigation section in the N panel",
         default=True,
     )
+    enable_telemetry: BoolProperty(
+        name="Export Log",
+        description="Append one JSON line per exported asset to a rotating export log",
+        default=True,
+    )
+    telemetry_directory: StringProperty(
+        name="Export Log Folder",
+        subtype="DIR_PATH",
+        description="Folder for the export log (the add-on's user folder if empty)",
+    )
+    memory_budget_mb: IntProperty(
+        name="Memory Budget (MB)",
+        description=(
+            "Free the data blocks the export created and run garbage collection between assets when "
+            "Blender uses more memory than this (0 disables)"
+        ),
+        default=0,
+        min=0,
+    )
+    idle_warmup: BoolProperty(
+        name="Idle Warmup",
+        description="Precompute export preprocessing for the selected objects and export roots while Blender is idle",
+        default=True,
+    )
+    fbx_store_size_mb: IntProperty(
+        name="FBX Store Size (MB)",
+        description=(
+            "Keep exported FBX files in a local store and link them into other folders the same content is "
+            "exported to, instead of exporting again (0 disables)"
+        ),
+        default=0,
+        min=0,
+    )
+    fbx_store_directory: StringProperty(
+        name="FBX Store Folder",
+        subtype="DIR_PATH",
+        description=(
+            "Folder for the FBX store, on the same drive as the projects so files can be hardlinked "
+            "(the add-on's user folder if empty)"
+        ),
+    )
+    show_draw_cost: BoolProperty(
+        name="Show Draw Time",
+        description="Show how long each section of the N panel takes to draw, for debugging a slow sidebar",
+        default=False,
+    )
+    profile_operators: BoolProperty(
+        name="Profile Operators",
+        description="Profile Batch Export and Combine Decal runs and save a .prof file in the export log folder",
+        default=False,
+    )
 
     def draw(self, context: Context) -> None:
         layout = self.layout
@@ -159,59 +349,57 @@ class ExportMEPreferences(AddonPreferences):
         col = layout.column(align=True)
         col.label(text="Projects:")
 
-        layout.operator("preferences.add_custom_path", text="Create Project", icon="ADD")
+        row = layout.row()
+        row.template_list(
+            "N_UL_Projects", "preferences", self, "custom_project_paths", self, "active_project_index", rows=LIST_ROWS
+        )
+        col = row.column(align=True)
+        col.operator("preferences.add_custom_path", text="", icon="ADD")
+        col.operator("preferences.remove_custom_path", text="", icon="REMOVE").index = self.active_project_index
+
+        if 0 <= self.active_project_index < len(self.custom_project_paths):
+            self._draw_project(layout, self.active_project_index)
 
-        for project_index, project in enumerate(self.custom_project_paths):
+        # Export Profiles Section
+        layout.separator()
+        col = layout.column(align=True)
+        col.label(text="Export Profiles:")
+
+        layout.operator("preferences.add_export_profile", text="Create Profile", icon="ADD")
+
+        for profile_index, profile in enumerate(self.export_profiles):
             box = layout.box()
 
-            # Project header
             row = box.row()
-            row.prop(project, "project_name", text="Project Name")
-            row.operator("preferences.remove_custom_path", text="", icon="X").index = project_index
-
-            box.prop(project, "filepath", text="Path")
-            box.prop(project, "game_engine", text="Game Engine")
-            box.prop(project, "show_root_button", text="Show Root Folder Button")
-
-            # Subpaths section
-            box.label(text="Subpaths:")
-
-            for subpath_index, subpath in enumerate(project.subpaths):
-                subbox = box.box()
-                row = subbox.row()
-                row.prop(subpath, "name", text="Name")
-
-                op = row.operator("preferences.remove_project_subpath", text="", icon="X")
-                op.project_index = project_index
-                op.subpath_index = subpath_index
-
-                row = subbox.row(align=True)
-                row.prop(subpath, "relative_path", text="Path")
-                op = row.operator("preferences.browse_project_subpath", text="", icon="FILEBROWSER")
-                op.project_index = project_index
-                op.subpath_index = subpath_index
-
-                row = subbox.row()
-                row.label(text="Icon:")
-                if subpath.icon:
-                    print(subpath.icon)
-                icon_to_display = subpath.icon
-                op = row.operator("export_me.icons_show", text="", icon=icon_to_display)
-                op.project_index = project_index
-                op.subpath_index = subpath_index
-                op = row.operator("export_me.icons_show", text="Select Icon")
-                op.project_index = project_index
-                op.subpath_index = subpath_index
-
-            # Add subpath button
-            op = box.operator("preferences.add_project_subpath", text="Add Subpath", icon="ADD")
-            op.project_index = project_index
+            row.prop(profile, "name", text="Profile Name")
+            row.operator("preferences.remove_export_profile", text="", icon="X").index = profile_index
+
+            grid = box.grid_flow(columns=2, even_columns=True)
+            for prop_name in PROFILE_SETTINGS:
+                grid.prop(profile, prop_name)
 
         # UI Options Section
         layout.separator()
         col = layout.column(align=True)
         col.label(text="UI Options:")
         col.prop(self, "hide_folder_navigation")
+        col.prop(self, "show_draw_cost")
+
+        # Batch Export Section
+        layout.separator()
+        col = layout.column(align=True)
+        col.label(text="Batch Export:")
+        col.prop(self, "memory_budget_mb")
+        col.prop(self, "idle_warmup")
+        col.prop(self, "fbx_store_size_mb")
+        row = col.row()
+        row.enabled = self.fbx_store_size_mb > 0
+        row.prop(self, "fbx_store_directory")
+        col.prop(self, "profile_operators")
+        col.prop(self, "enable_telemetry")
+        row = col.row()
+        row.enabled = self.enable_telemetry
+        row.prop(self, "telemetry_directory")
 
         # Recent Export Paths Section
         layout.separator()
@@ -235,12 +423,66 @@ class ExportMEPreferences(AddonPreferences):
                 layout.label(text="No recent export paths", icon="INFO")
 
 
+    def _draw_project(self, layout: UILayout, project_index: int) -> None:
+        project = self.custom_project_paths[project_index]
+        box = layout.box()
+
+        box.prop(project, "project_name", text="Project Name")
+        box.prop(project, "filepath", text="Path")
+        box.prop(project, "game_engine", text="Game Engine")
+        box.prop(project, "show_root_button", text="Show Root Folder Button")
+        row = box.row(align=True)
+        row.prop(project, "cleanup_mesh")
+        sub = row.row(align=True)
+        sub.enabled = project.cleanup_mesh
+        sub.prop(project, "weld_distance")
+        box.prop(project, "export_tangents")
+
+        # Subpaths section
+        box.label(text="Subpaths:")
+        row = box.row()
+        row.template_list(
+            "N_UL_ProjectSubpaths", "preferences", project, "subpaths", project, "active_subpath_index", rows=LIST_ROWS
+        )
+        col = row.column(align=True)
+        col.operator("preferences.add_project_subpath", text="", icon="ADD").project_index = project_index
+        op = col.operator("preferences.remove_project_subpath", text="", icon="REMOVE")
+        op.project_index = project_index
+        op.subpath_index = project.active_subpath_index
+
+        subpath_index = project.active_subpath_index
+        if not 0 <= subpath_index < len(project.subpaths):
+            return
+        subpath = project.subpaths[subpath_index]
+
+        subbox = box.box()
+        subbox.prop(subpath, "name", text="Name")
+
+        row = subbox.row(align=True)
+        row.prop(subpath, "relative_path", text="Path")
+        op = row.operator("preferences.browse_project_subpath", text="", icon="FILEBROWSER")
+        op.project_index = project_index
+        op.subpath_index = subpath_index
+
+        row = subbox.row()
+        row.label(text="Icon:")
+        op = row.operator("export_me.icons_show", text="", icon=subpath.icon)
+        op.project_index = project_index
+        op.subpath_index = subpath_index
+        op = row.operator("export_me.icons_show", text="Select Icon")
+        op.project_index = project_index
+        op.subpath_index = subpath_index
+
+
 class N_OT_AddCustomPath(bpy.types.Operator):
     bl_idname = "preferences.add_custom_path"
     bl_label = "Add Custom Path"
 
     def execute(self, context: Context) -> set[str]:
-        context.preferences.addons[base_package].preferences.custom_project_paths.add()
+        prefs = get_preferences(context)
+        prefs.custom_project_paths.add()
+        prefs.active_project_index = len(prefs.custom_project_paths) - 1
+        invalidate_project_index()
         return {"FINISHED"}
 
 
@@ -252,7 +494,43 @@ class N_OT_RemoveCustomPath(bpy.types.Operator):
 
     def execute(self, context: Context) -> set[str]:
         prefs: ExportMEPreferences = context.preferences.addons[base_package].preferences
+
+        if not 0 <= self.index < len(prefs.custom_project_paths):
+            self.report({"ERROR"}, "Invalid project index")
+            return {"CANCELLED"}
+
         prefs.custom_project_paths.remove(self.index)
+        prefs.active_project_index = max(0, min(prefs.active_project_index, len(prefs.custom_project_paths) - 1))
+        invalidate_project_index()
+        return {"FINISHED"}
+
+
+class N_OT_AddExportProfile(bpy.types.Operator):
+    bl_idname = "preferences.add_export_profile"
+    bl_label = "Add Export Profile"
+    bl_description = "Add a named export profile that collections and objects can use"
+
+    def execute(self, context: Context) -> set[str]:
+        prefs = get_preferences(context)
+        profile = prefs.export_profiles.add()
+        profile.name = f"Profile {len(prefs.export_profiles)}"
+        return {"FINISHED"}
+
+
+class N_OT_RemoveExportProfile(bpy.types.Operator):
+    bl_idname = "preferences.remove_export_profile"
+    bl_label = "Remove Export Profile"
+
+    index: IntProperty()
+
+    def execute(self, context: Context) -> set[str]:
+        prefs = get_preferences(context)
+
+        if not 0 <= self.index < len(prefs.export_profiles):
+            self.report({"ERROR"}, "Invalid profile index")
+            return {"CANCELLED"}
+
+        prefs.export_profiles.remove(self.index)
         return {"FINISHED"}
 
 
@@ -266,12 +544,14 @@ class N_OT_AddProjectSubpath(bpy.types.Operator):
     def execute(self, context: Context) -> set[str]:
         prefs = get_preferences(context)
 
-        if self.project_index >= len(prefs.custom_project_paths):
+        if not 0 <= self.project_index < len(prefs.custom_project_paths):
             self.report({"ERROR"}, "Invalid project index")
             return {"CANCELLED"}
 
         project = prefs.custom_project_paths[self.project_index]
         project.subpaths.add()
+        project.active_subpath_index = len(project.subpaths) - 1
+        invalidate_project_index()
 
         return {"FINISHED"}
 
@@ -287,17 +567,19 @@ class N_OT_RemoveProjectSubpath(bpy.types.Operator):
     def execute(self, context: Context) -> set[str]:
         prefs = get_preferences(context)
 
-        if self.project_index >= len(prefs.custom_project_paths):
+        if not 0 <= self.project_index < len(prefs.custom_project_paths):
             self.report({"ERROR"}, "Invalid project index")
             return {"CANCELLED"}
 
         project = prefs.custom_project_paths[self.project_index]
 
-        if self.subpath_index >= len(project.subpaths):
+        if not 0 <= self.subpath_index < len(project.subpaths):
             self.report({"ERROR"}, "Invalid subpath index")
             return {"CANCELLED"}
 
         project.subpaths.remove(self.subpath_index)
+        project.active_subpath_index = max(0, min(project.active_subpath_index, len(project.subpaths) - 1))
+        invalidate_project_index()
 
         return {"FINISHED"}
 
@@ -314,17 +596,17 @@ class N_OT_BrowseProjectSubpath(bpy.types.Operator):
     def execute(self, context: Context) -> set[str]:
         prefs = get_preferences(context)
 
-        if self.project_index >= len(prefs.custom_project_paths):
+        if not 0 <= self.project_index < len(prefs.custom_project_paths):
             self.report({"ERROR"}, "Invalid project index")
             return {"CANCELLED"}
 
         project = prefs.custom_project_paths[self.project_index]
 
-        if self.subpath_index >= len(project.subpaths):
+        if not 0 <= self.subpath_index < len(project.subpaths):
             self.report({"ERROR"}, "Invalid subpath index")
             return {"CANCELLED"}
 
-        project_root = Path(project.filepath).resolve()
+        project_root = get_project_index(context).resolved_roots[self.project_index] or Path(project.filepath).resolve()
         selected_path = Path(self.directory).resolve()
 
         # Calculate relative path
@@ -341,7 +623,7 @@ class N_OT_BrowseProjectSubpath(bpy.types.Operator):
     def invoke(self, context: Context, event) -> set[str]:
         prefs = get_preferences(context)
 
-        if self.project_index >= len(prefs.custom_project_paths):
+        if not 0 <= self.project_index < len(prefs.custom_project_paths):
             self.report({"ERROR"}, "Invalid project index")
             return {"CANCELLED"}
 
@@ -382,7 +664,7 @@ class N_OT_SetRecentPath(bpy.types.Operator):
     def execute(self, context: Context) -> set[str]:
         prefs = get_preferences(context)
 
-        if self.index >= len(prefs.recent_export_paths):
+        if not 0 <= self.index < len(prefs.recent_export_paths):
             self.report({"ERROR"}, "Invalid recent path index")
             return {"CANCELLED"}
 
@@ -408,9 +690,12 @@ PREFERENCE_CLASSES: Tuple[type, ...] = (
     RecentExportPath,
     ProjectSubpath,
     CustomProjectPath,
+    ExportProfile,
     ExportMEPreferences,
     N_OT_AddCustomPath,
     N_OT_RemoveCustomPath,
+    N_OT_AddExportProfile,
+    N_OT_RemoveExportProfile,
     N_OT_AddProjectSubpath,
     N_OT_RemoveProjectSubpath,
     N_OT_BrowseProjectSubpath,
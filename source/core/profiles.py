@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import bpy
+from bpy.types import Context, Object
+
+from .preferences import get_preferences, PROFILE_SETTINGS, PROJECT_SETTINGS
+from .types import ExportSettings
+
+if TYPE_CHECKING:
+    from .collection_export import CollectionExport
+
+# Profile property names that differ from the ExportSettings field names
+_SETTINGS_FIELDS: Dict[str, str] = {"export_smoothing": "smoothing"}
+
+
+def search_profile_names(self, context: Context, edit_text: str) -> List[str]:
+    """Search callback listing the profiles defined in the add-on preferences"""
+    names = [profile.name for profile in get_preferences(context).export_profiles]
+    return [name for name in names if edit_text.lower() in name.lower()]
+
+
+def build_collection_profiles() -> Dict[int, str]:
+    """
+    Map collections to their profile by session_uid, inheriting from parent collections, in one pass.
+
+    Linked libraries can bring collections with the name of a local one, names would mix them up.
+    """
+    own: Dict[int, str] = {}
+    parents: Dict[int, int] = {}
+
+    for collection in bpy.data.collections:
+        if collection.export_me_profile:
+            own[collection.session_uid] = collection.export_me_profile
+        for child in collection.children:
+            parents.setdefault(child.session_uid, collection.session_uid)
+
+    resolved: Dict[int, str] = {}
+    for uid in own.keys() | parents.keys():
+        chain: List[int] = []
+        current: Optional[int] = uid
+        while current is not None and current not in resolved:
+            if current in own:
+                resolved[current] = own[current]
+                break
+            chain.append(current)
+            current = parents.get(current)
+
+        profile = resolved.get(current, "") if current is not None else ""
+        for visited in chain:
+            resolved[visited] = profile
+
+    return {uid: profile for uid, profile in resolved.items() if profile}
+
+
+def resolve_profile_name(obj: Object, collection_profiles: Dict[int, str]) -> str:
+    """An object's own profile wins over the profile of the collections it belongs to"""
+    if obj.export_me_profile:
+        return obj.export_me_profile
+
+    for collection in obj.users_collection:
+        profile = collection_profiles.get(collection.session_uid)
+        if profile:
+            return profile
+
+    return ""
+
+
+def apply_profile(settings: ExportSettings, profile) -> ExportSettings:
+    overrides = {_SETTINGS_FIELDS.get(name, name): getattr(profile, name) for name in PROFILE_SETTINGS}
+    return replace(settings, **overrides)
+
+
+def apply_project(settings: ExportSettings, project) -> ExportSettings:
+    return replace(settings, **{name: getattr(project, name) for name in PROJECT_SETTINGS})
+
+
+def group_by_profile(
+    context: Context, objects: List[Object], base: ExportSettings, missing: Optional[Dict[int, str]] = None
+) -> List[Tuple[ExportSettings, List[Object]]]:
+    """
+    Group export roots that resolve to identical settings, keeping the original object order.
+
+    Roots naming a profile the preferences do not have keep the base settings, and are added to
+    missing by session_uid with that name.
+    """
+    profiles = {profile.name: profile for profile in get_preferences(context).export_profiles}
+    collection_profiles = build_collection_profiles()
+
+    settings_by_name: Dict[str, ExportSettings] = {"": base}
+    groups: Dict[tuple, Tuple[ExportSettings, List[Object]]] = {}
+
+    for obj in objects:
+        profile_name = resolve_profile_name(obj, collection_profiles)
+        if profile_name not in settings_by_name:
+            profile = profiles.get(profile_name)
+            settings_by_name[profile_name] = apply_profile(base, profile) if profile else base
+
+        if profile_name not in profiles and profile_name and missing is not None:
+            missing[obj.session_uid] = profile_name
+        settings = settings_by_name[profile_name]
+        groups.setdefault(settings.key(), (settings, []))[1].append(obj)
+
+    return list(groups.values())
+
+
+def collection_export_settings(
+    context: Context, exports: List[CollectionExport], base: ExportSettings, missing: Optional[Dict[int, str]] = None
+) -> List[Tuple[ExportSettings, CollectionExport]]:
+    """Settings of each collection exported as one FBX, from its own or inherited profile, see group_by_profile"""
+    profiles = {profile.name: profile for profile in get_preferences(context).export_profiles}
+    collection_profiles = build_collection_profiles()
+
+    settings: List[Tuple[ExportSettings, CollectionExport]] = []
+    for export in exports:
+        profile_name = collection_profiles.get(export.session_uid, "")
+        profile = profiles.get(profile_name)
+        if profile_name and profile is None and missing is not None:
+            missing[export.session_uid] = profile_name
+        export_settings = apply_profile(base, profile) if profile else base
+        # Objects keep their placement within the collection, centering would stack them at the origin
+        settings.append((replace(export_settings, center_transform=False), export))
+    return settings
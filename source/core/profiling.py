@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import functools
+import time
+from pathlib import Path
+from typing import Callable, List, Set
+
+from bpy.types import Context, Operator
+
+from .preferences import get_preferences
+
+PROFILE_FOLDER = "profiles"
+TOP_FUNCTIONS = 3
+
+
+def _hot_functions(stats, count: int) -> List[str]:
+    """Functions with the most time spent in their own body, formatted for a report"""
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:count]
+    return [f"{name} ({Path(filename).name}:{line}) {values[2]:.2f}s" for (filename, line, name), values in entries]
+
+
+def save_profile(context: Context, profiler, label: str) -> Path:
+    from .telemetry import get_log_directory
+
+    folder = get_log_directory(context) / PROFILE_FOLDER
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / f"{label.replace('.', '_')}_{time.strftime('%Y%m%d_%H%M%S')}.prof"
+    profiler.dump_stats(path)
+    return path
+
+
+def profiled(execute: Callable[[Operator, Context], Set[str]]) -> Callable[[Operator, Context], Set[str]]:
+    """Wrap an operator's execute in cProfile when the Profile Operators preference is enabled"""
+
+    @functools.wraps(execute)
+    def wrapper(self: Operator, context: Context) -> Set[str]:
+        if not get_preferences(context).profile_operators:
+            return execute(self, context)
+
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(execute, self, context)
+        finally:
+            try:
+                path = save_profile(context, profiler, self.bl_idname)
+            except OSError as e:
+                self.report({"WARNING"}, f"Could not save profile: {e}")
+            else:
+                hot = ", ".join(_hot_functions(pstats.Stats(profiler), TOP_FUNCTIONS))
+                self.report({"INFO"}, f"Profile saved to {path.as_posix()}, hottest: {hot}")
+
+    return wrapper
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import time
+from typing import Dict
+
+IMPORT_STARTED: float = time.perf_counter()
+
+_timings: Dict[str, float] = {}
+
+
+def mark(name: str) -> None:
+    """Record the time elapsed since the add-on started importing"""
+    _timings[name] = time.perf_counter() - IMPORT_STARTED
+
+
+def mark_once(name: str) -> None:
+    if name not in _timings:
+        mark(name)
+
+
+def record(name: str, seconds: float) -> None:
+    _timings[name] = seconds
+
+
+def get_timings() -> Dict[str, float]:
+    return dict(_timings)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import bpy
+from bpy.types import Context
+
+from .preferences import get_preferences
+from .types import AssetResult
+from .. import __package__ as base_package
+
+LOG_NAME = "export_log.jsonl"
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+# Past exports a cost estimate is fitted to
+HISTORY_RECORDS = 500
+# Used until there is enough export history, from typical binary FBX exports of static meshes
+DEFAULT_SECONDS = (0.05, 5e-6)
+DEFAULT_BYTES = (20_000.0, 100.0)
+
+_loggers: Dict[Path, logging.Logger] = {}
+
+
+def get_log_directory(context: Context) -> Path:
+    """Folder holding the export log, the preference if set, else the add-on's user folder"""
+    prefs = get_preferences(context)
+    if prefs.telemetry_directory:
+        return Path(bpy.path.abspath(prefs.telemetry_directory))
+    return get_user_directory()
+
+
+def get_user_directory() -> Path:
+    """The add-on's folder for data kept between sessions"""
+    try:
+        return Path(bpy.utils.extension_path_user(base_package, create=True))
+    except (ValueError, AttributeError):
+        # Legacy add-on installs have no extension user folder
+        return Path(bpy.utils.user_resource("CONFIG", path="export_me", create=True))
+
+
+def _get_logger(path: Path) -> logging.Logger:
+    logger = _loggers.get(path)
+    if logger is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        logger = logging.getLogger(f"{base_package}.telemetry.{len(_loggers)}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        _loggers[path] = logger
+    return logger
+
+
+def get_log_path(context: Context) -> Optional[Path]:
+    if not get_preferences(context).enable_telemetry:
+        return None
+    return get_log_directory(context) / LOG_NAME
+
+
+def log_asset(context: Context, asset: AssetResult) -> None:
+    """Append one JSON line describing an exported asset to the rotating export log"""
+    path = get_log_path(context)
+    if path is None:
+        return
+
+    try:
+        record = dict(asset.to_record(), timestamp=time.time())
+        _get_logger(path).info(json.dumps(record, sort_keys=True))
+    except OSError:
+        # Telemetry must never fail an export
+        pass
+
+
+def read_history(context: Context, limit: int = HISTORY_RECORDS) -> List[Dict[str, Any]]:
+    """The most recent records of the export log, oldest first"""
+    path = get_log_directory(context) / LOG_NAME
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = deque(f, maxlen=limit)
+    except OSError:
+        return []
+
+    records: List[Dict[str, Any]] = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def _fit_line(points: List[Tuple[float, float]], default: Tuple[float, float]) -> Tuple[float, float]:
+    """Least squares intercept and slope, neither negative, the default without enough spread"""
+    if not points:
+        return default
+    count = len(points)
+    mean_x = sum(x for x, _ in points) / count
+    mean_y = sum(y for _, y in points) / count
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        # One asset size only: attribute everything to the triangles, or to the export itself
+        return (0.0, mean_y / mean_x) if mean_x else (mean_y, default[1])
+
+    slope = max(0.0, sum((x - mean_x) * (y - mean_y) for x, y in points) / variance)
+    return max(0.0, mean_y - slope * mean_x), slope
+
+
+@dataclass
+class CostModel:
+    """Export time and FBX size as a fixed cost per asset plus a cost per triangle"""
+
+    seconds: Tuple[float, float] = DEFAULT_SECONDS
+    bytes: Tuple[float, float] = DEFAULT_BYTES
+    samples: int = 0
+
+    @classmethod
+    def fit(cls, records: List[Dict[str, Any]], engine: str = "") -> CostModel:
+        """Fit to logged exports, of the given engine when there are any, skipping patched and linked files"""
+        exported = [
+            record
+            for record in records
+            if not record.get("patched") and not record.get("stored") and record.get("output_bytes")
+        ]
+        same_engine = [record for record in exported if record.get("engine") == engine]
+        exported = same_engine or exported
+        if not exported:
+            return cls()
+
+        triangles = [float(record.get("triangles", 0)) for record in exported]
+        seconds = _fit_line(list(zip(triangles, (record["duration"] for record in exported))), DEFAULT_SECONDS)
+        sizes = _fit_line(list(zip(triangles, (record["output_bytes"] for record in exported))), DEFAULT_BYTES)
+        return cls(seconds, sizes, len(exported))
+
+    def estimate(self, triangles: int) -> Tuple[float, int]:
+        """Seconds and bytes an asset with this many triangles is expected to take"""
+        seconds = self.seconds[0] + self.seconds[1] * triangles
+        size = self.bytes[0] + self.bytes[1] * triangles
+        return seconds, int(size)
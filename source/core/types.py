@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import hashlib
+import os
+from dataclasses import dataclass, field, astuple, asdict, replace
 from pathlib import Path
-from typing import TYPE_CHECKING, Literal
+from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Tuple
 
 if TYPE_CHECKING:
     from bpy.types import Scene
@@ -24,6 +26,21 @@ class ExportSettings:
     export_animations: bool
     smoothing: str
     game_engine: Literal["UNREAL", "UNITY", "GODOT"]
+    export_instances: bool = False
+    animation_mode: Literal["ALL", "ACTIONS", "NLA_TRACKS"] = "ALL"
+    action_filter: str = ""
+    bake_step: float = 1.0
+    bake_simplify: float = 1.0
+    skip_unchanged_clips: bool = True
+    publish_textures: bool = False
+    texture_folder: str = "Textures"
+    patch_renames: bool = True
+    verify_exports: bool = False
+    optimize_vertex_cache: bool = False
+    generate_lightmap_uvs: bool = False
+    cleanup_mesh: bool = False
+    weld_distance: float = 0.0001
+    export_tangents: bool = False
 
     @classmethod
     def from_scene(cls, scene: Scene, game_engine: Literal["UNREAL", "UNITY", "GODOT"] = "UNREAL") -> ExportSettings:
@@ -50,8 +67,44 @@ class ExportSettings:
             export_animations=scene.export_animations,
             smoothing=scene.export_smoothing,
             game_engine=game_engine,
+            export_instances=scene.export_instances,
+            animation_mode=scene.animation_export_mode,
+            action_filter=scene.action_filter,
+            bake_step=scene.anim_bake_step,
+            bake_simplify=scene.anim_simplify,
+            skip_unchanged_clips=scene.skip_unchanged_clips,
+            publish_textures=scene.publish_textures,
+            texture_folder=scene.texture_folder,
+            patch_renames=scene.patch_renames,
+            verify_exports=scene.verify_exports,
+            optimize_vertex_cache=scene.optimize_vertex_cache,
+            generate_lightmap_uvs=scene.generate_lightmap_uvs,
         )
 
+    def key(self) -> tuple:
+        """Hashable value identifying these settings, used to group exports that share them"""
+        return astuple(self)
+
+    def digest(self) -> str:
+        """Short stable hash of the settings, recorded with every exported asset"""
+        return hashlib.sha1(repr(self.key()).encode()).hexdigest()[:12]
+
+    def content_digest(self) -> str:
+        """
+        Hash of the settings that change an FBX beyond its file and object names.
+
+        fix_collider stays in: besides renaming colliders it turns their geometry into convex hulls.
+        """
+        content = replace(
+            self,
+            export_folder=Path(),
+            custom_name="",
+            rename_dot=False,
+            patch_renames=False,
+            verify_exports=False,
+        )
+        return content.digest()
+
 
 from typing import TYPE_CHECKING
 
@@ -72,3 +125,123 @@ class ProjectPath:
             project_name=prop.project_name,
             icon=prop.icon,
         )
+
+
+# Recent export positions by project index and by (project, subpath) index
+RecentRanks = Tuple[Dict[int, int], Dict[Tuple[int, int], int]]
+
+
+def normalize_folder(folder: str) -> str:
+    """Folder path in one spelling, for comparing paths typed and stored in different ways"""
+    return os.path.normcase(os.path.normpath(folder))
+
+
+@dataclass
+class ProjectIndex:
+    count: int
+    roots: Dict[Path, int] = field(default_factory=dict)
+    resolved_roots: List[Optional[Path]] = field(default_factory=list)
+    engines: List[str] = field(default_factory=list)
+    enum_items: List[Tuple[str, str, str, int]] = field(default_factory=list)
+    subpaths: Dict[Tuple[int, int], Path] = field(default_factory=dict)
+    # Lowercase text the project browser searches, a project's includes the names of its subpaths
+    search_text: List[str] = field(default_factory=list)
+    subpath_search_text: Dict[Tuple[int, int], str] = field(default_factory=dict)
+    # Subpath of each normalized subpath folder
+    subpath_folders: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    _lookups: Dict[str, Optional[int]] = field(default_factory=dict, repr=False)
+    _recent: Optional[Tuple[Tuple[str, ...], RecentRanks]] = field(default=None, repr=False)
+
+    def project_for(self, export_path: Path) -> Optional[int]:
+        """Return the index of the project with the longest root containing export_path"""
+        key = str(export_path)
+        if key in self._lookups:
+            return self._lookups[key]
+
+        found = None
+        if self.roots:
+            resolved = export_path.resolve()
+            for candidate in (resolved, *resolved.parents):
+                found = self.roots.get(candidate)
+                if found is not None:
+                    break
+
+        self._lookups[key] = found
+        return found
+
+    def engine_for(self, export_path: Path, default: str = "UNREAL") -> str:
+        """Return the engine of the project with the longest root containing export_path"""
+        project_index = self.project_for(export_path)
+        return default if project_index is None else self.engines[project_index]
+
+    def recent_ranks(self, recent_paths: Tuple[str, ...]) -> RecentRanks:
+        """Return the position of the most recent export into each project and subpath, 0 being the latest"""
+        if self._recent is not None and self._recent[0] == recent_paths:
+            return self._recent[1]
+
+        projects: Dict[int, int] = {}
+        subpaths: Dict[Tuple[int, int], int] = {}
+        for rank, recent_path in enumerate(recent_paths):
+            project_index = self.project_for(Path(recent_path))
+            if project_index is not None:
+                projects.setdefault(project_index, rank)
+            subpath = self.subpath_folders.get(normalize_folder(recent_path))
+            if subpath is not None:
+                subpaths.setdefault(subpath, rank)
+
+        self._recent = (recent_paths, (projects, subpaths))
+        return projects, subpaths
+
+
+@dataclass
+class AssetResult:
+    source_blend: str
+    object_name: str
+    destination: Path
+    engine: str
+    settings_hash: str
+    vertices: int = 0
+    triangles: int = 0
+    materials: int = 0
+    output_bytes: int = 0
+    duration: float = 0.0
+    patched: bool = False
+    stored: bool = False
+    verified: Optional[bool] = None
+    warnings: List[str] = field(default_factory=list)
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+    def to_record(self) -> Dict[str, object]:
+        record = asdict(self)
+        record["destination"] = self.destination.as_posix()
+        return record
+
+
+@dataclass
+class BatchResult:
+    assets: List[AssetResult] = field(default_factory=list)
+    remaining: List[str] = field(default_factory=list)
+    instances: List[str] = field(default_factory=list)
+    clips: List[Path] = field(default_factory=list)
+    skipped_clips: List[str] = field(default_factory=list)
+    # Profile names roots or collections ask for that the preferences do not have
+    missing_profiles: List[str] = field(default_factory=list)
+    group_count: int = 0
+    peak_memory: int = 0
+    duration: float = 0.0
+
+    @property
+    def paths(self) -> List[Path]:
+        return [asset.destination for asset in self.assets]
+
+    @property
+    def last_path(self) -> Optional[Path]:
+        return self.assets[-1].destination if self.assets else None
+
+    def metric(self, name: str) -> float:
+        """A stage metric summed over the exported assets"""
+        return sum(asset.metrics.get(name, 0) for asset in self.assets)
+
+    @property
+    def warnings(self) -> List[str]:
+        return [f"{asset.object_name}: {warning}" for asset in self.assets for warning in asset.warnings]
@@ -0,0 +1,173 @@
+"""
+Idle-time precomputation of export preprocessing.
+
+While the user is idle, a timer computes in small slices what the export would otherwise compute when
+Export is clicked: mesh and material fingerprints and the polygon scan of the triangulate stage, for
+the selected objects and the batch export roots. Results are cached per datablock and dropped by a
+depsgraph handler as soon as that data changes. The objects to warm are looked up again after every
+depsgraph update, undo and file load.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import bpy
+from bpy.app.handlers import persistent
+from bpy.types import Material, Mesh, Object
+
+# Seconds without scene changes before the user counts as idle
+IDLE_SECONDS = 2.0
+# Time one timer call may spend before handing control back to the UI
+SLICE_SECONDS = 0.02
+IDLE_INTERVAL = 1.0
+BUSY_INTERVAL = 0.05
+
+_mesh_cache: Dict[int, Dict[str, Any]] = {}
+_material_cache: Dict[int, str] = {}
+_last_change = 0.0
+# Selected objects, export roots and their children, until the scene changes
+_targets: Optional[List[Object]] = None
+
+
+def _mesh_shape(mesh: Mesh) -> Tuple[int, int, int, int]:
+    return len(mesh.vertices), len(mesh.edges), len(mesh.loops), len(mesh.polygons)
+
+
+def mesh_value(mesh: Mesh, key: str, compute: Callable[[Mesh], Any]) -> Any:
+    """Value computed from a mesh, reused until the mesh changes"""
+    shape = _mesh_shape(mesh)
+    entry = _mesh_cache.get(mesh.session_uid)
+    # Element counts catch edits made without a depsgraph update in between
+    if entry is None or entry["shape"] != shape:
+        entry = _mesh_cache[mesh.session_uid] = {"shape": shape}
+    if key not in entry:
+        entry[key] = compute(mesh)
+    return entry[key]
+
+
+def material_value(material: Material, compute: Callable[[Material], str]) -> str:
+    fingerprint = _material_cache.get(material.session_uid)
+    if fingerprint is None:
+        fingerprint = _material_cache[material.session_uid] = compute(material)
+    return fingerprint
+
+
+def clear() -> None:
+    global _targets
+    _mesh_cache.clear()
+    _material_cache.clear()
+    _targets = None
+
+
+def _warmup_targets() -> List[Object]:
+    global _targets
+    if _targets is not None:
+        return _targets
+
+    view_layer = bpy.context.view_layer
+    roots: List[Object] = list(view_layer.objects.selected)
+    roots += [obj for obj in view_layer.objects if obj.export_me_root and not obj.select_get()]
+
+    _targets = []
+    seen: Set[int] = set()
+    for root in roots:
+        for obj in (root, *root.children_recursive):
+            if obj.session_uid not in seen:
+                seen.add(obj.session_uid)
+                _targets.append(obj)
+    return _targets
+
+
+def _warm_object(obj: Object) -> None:
+    from .fingerprint import material_fingerprint, max_polygon_size, mesh_fingerprint
+
+    if obj.type == "MESH" and obj.data:
+        mesh: Mesh = obj.data
+        mesh_value(mesh, "fingerprint", mesh_fingerprint)
+        mesh_value(mesh, "max_polygon_size", max_polygon_size)
+
+    for slot in obj.material_slots:
+        if slot.material:
+            material_value(slot.material, material_fingerprint)
+
+
+def _is_warm(obj: Object) -> bool:
+    if obj.type == "MESH" and obj.data:
+        entry = _mesh_cache.get(obj.data.session_uid)
+        if entry is None or "fingerprint" not in entry or entry["shape"] != _mesh_shape(obj.data):
+            return False
+    return all(slot.material.session_uid in _material_cache for slot in obj.material_slots if slot.material)
+
+
+def _warmup_tick() -> float:
+    from .preferences import get_preferences
+
+    context = bpy.context
+    if not get_preferences(context).idle_warmup or context.mode != "OBJECT":
+        return IDLE_INTERVAL
+    if time.monotonic() - _last_change < IDLE_SECONDS:
+        return IDLE_INTERVAL
+
+    started = time.perf_counter()
+    for obj in _warmup_targets():
+        if _is_warm(obj):
+            continue
+        _warm_object(obj)
+        if time.perf_counter() - started > SLICE_SECONDS:
+            return BUSY_INTERVAL
+    return IDLE_INTERVAL
+
+
+@persistent
+def _on_depsgraph_update(scene, depsgraph) -> None:
+    global _last_change, _targets
+    _last_change = time.monotonic()
+    # Selection, export root flags and parenting all come with a depsgraph update
+    _targets = None
+
+    for update in depsgraph.updates:
+        data = update.id.original
+        if isinstance(data, Mesh):
+            _mesh_cache.pop(data.session_uid, None)
+        elif isinstance(data, Material):
+            _material_cache.pop(data.session_uid, None)
+        elif isinstance(data, Object) and update.is_updated_geometry and data.type == "MESH" and data.data:
+            _mesh_cache.pop(data.data.session_uid, None)
+
+
+@persistent
+def _on_load_post(*args) -> None:
+    clear()
+
+
+@persistent
+def _on_undo(*args) -> None:
+    global _targets
+    # Undo frees the objects the cached list points at
+    _targets = None
+
+
+def register() -> None:
+    # Headless exports have no idle time to use
+    if bpy.app.background:
+        return
+    bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update)
+    bpy.app.handlers.load_post.append(_on_load_post)
+    bpy.app.handlers.undo_post.append(_on_undo)
+    bpy.app.handlers.redo_post.append(_on_undo)
+    bpy.app.timers.register(_warmup_tick, first_interval=IDLE_INTERVAL, persistent=True)
+
+
+def unregister() -> None:
+    if bpy.app.timers.is_registered(_warmup_tick):
+        bpy.app.timers.unregister(_warmup_tick)
+    for handlers, handler in (
+        (bpy.app.handlers.depsgraph_update_post, _on_depsgraph_update),
+        (bpy.app.handlers.load_post, _on_load_post),
+        (bpy.app.handlers.undo_post, _on_undo),
+        (bpy.app.handlers.redo_post, _on_undo),
+    ):
+        if handler in handlers:
+            handlers.remove(handler)
+    clear()
@@ -0,0 +1,387 @@
+"""
+Warm export daemon for pipeline tools and CI jobs.
+
+Start it once with Blender's Python, passing the add-on arguments after "--":
+    blender -b --python-expr "import bl_ext.user_default.export_me.export_daemon as m; m.main()"
+        -- --max-files 4
+
+and send it JSON export requests, one per line, over its local socket:
+    {"file": "assets/crate.blend", "roots": ["Crate"], "destination": "out/props", "settings": {"triangulate": true}}
+
+Every request carries the daemon's secret as "token", see below.
+"project", "subpath" and "profile" are accepted as with the batch CLI, "destination" overrides the project
+path and "roots" (all batch export roots if omitted) selects what to export. The daemon answers with one
+JSON line per exported asset, {"event": "asset", ...}, followed by {"event": "done", "status": ...}.
+{"command": "status"} lists the loaded files and {"command": "shutdown"} stops the daemon.
+
+Every .blend is kept loaded in its own background Blender, up to --max-files of them, the least recently
+used one closing first. A file changed on disk is loaded again. The daemon listens on a Unix socket only
+its user can connect to; where Unix sockets are not available it falls back to TCP on localhost, which
+any local process can reach. On start it writes a new random token to export_daemon.token in the add-on's
+user folder, readable by its user only, and answers no request without it. --send reads it from there.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import bpy
+
+from .batch_cli import RESULT_PREFIX, _script_args, export_open_file
+from .core import warmup
+
+MODULE_NAME = __spec__.name if __spec__ else __name__
+DEFAULT_PORT = 47810
+DEFAULT_MAX_FILES = 4
+TOKEN_FILE_NAME = "export_daemon.token"
+
+Address = Union[str, Tuple[str, int]]
+
+UNIX_SOCKETS = os.name == "posix" and hasattr(socketserver, "ThreadingUnixStreamServer")
+
+
+def default_address() -> Address:
+    if UNIX_SOCKETS:
+        return str(Path(tempfile.gettempdir()) / f"export_me_{os.getuid()}.sock")
+    return ("127.0.0.1", DEFAULT_PORT)
+
+
+def default_token_path() -> Path:
+    from .core.telemetry import get_user_directory
+
+    return get_user_directory() / TOKEN_FILE_NAME
+
+
+def write_token(path: Path) -> str:
+    """
+    Store a new secret every request has to carry, readable by the current user only.
+
+    On Windows the file mode only sets read-only, the user folder's ACL keeps other users out.
+    """
+    token = secrets.token_hex(32)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    # O_EXCL refuses a file someone else created in between, the mode applies from creation
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+        file.write(token)
+    return token
+
+
+def read_token(path: Path) -> str:
+    return path.read_text(encoding="utf-8").strip()
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="export_me.export_daemon", description="Warm FBX export daemon")
+    parser.add_argument("--socket", default="", help="Unix socket path (default: export_me_<uid>.sock in the temp dir)")
+    parser.add_argument("--port", type=int, default=0, help=f"Listen on localhost TCP instead, e.g. {DEFAULT_PORT}")
+    parser.add_argument("--max-files", type=int, default=DEFAULT_MAX_FILES, help=".blend files kept loaded")
+    parser.add_argument("--blender", default="", help="Blender executable (defaults to the running Blender)")
+    parser.add_argument("--send", default="", help="Send this JSON request to a running daemon and print the replies")
+    parser.add_argument("--token-file", default="", help=f"Token file (default: {TOKEN_FILE_NAME} in the user folder)")
+    return parser.parse_args(argv)
+
+
+class BlendWorker:
+    """Background Blender holding one .blend loaded, exporting from it on request"""
+
+    def __init__(self, blender: str, path: Path) -> None:
+        self.path = path
+        self.mtime = path.stat().st_mtime_ns
+        self.lock = threading.Lock()
+        self.process = subprocess.Popen(
+            [blender, "-b", str(path), "--python-expr", f"import {MODULE_NAME} as m; m.worker_loop()"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+
+    def is_current(self) -> bool:
+        try:
+            return self.process.poll() is None and self.path.stat().st_mtime_ns == self.mtime
+        except OSError:
+            return False
+
+    def run(self, request: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Send one request and yield the events the worker prints, ending with its "done" event"""
+        assert self.process.stdin is not None and self.process.stdout is not None
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            yield {"event": "done", "status": "failed", "outputs": [], "error": f"Blender is gone: {e}"}
+            return
+
+        # Blender prints its own messages to stdout as well, only prefixed lines are ours
+        for line in self.process.stdout:
+            if not line.startswith(RESULT_PREFIX):
+                continue
+            event = json.loads(line[len(RESULT_PREFIX) :])
+            yield event
+            if event["event"] == "done":
+                return
+        yield {"event": "done", "status": "failed", "outputs": [], "error": "Blender exited during the export"}
+
+    def close(self) -> None:
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+
+
+class WorkerPool:
+    """Loaded .blend files by path, closing the least recently used one beyond max_files"""
+
+    def __init__(self, blender: str, max_files: int) -> None:
+        self.blender = blender
+        self.max_files = max(1, max_files)
+        self._workers: OrderedDict[Path, BlendWorker] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, path: Path) -> Tuple[BlendWorker, bool]:
+        """Worker for a file, and whether it was loaded already"""
+        evicted: List[BlendWorker] = []
+        with self._lock:
+            worker = self._workers.get(path)
+            warm = worker is not None and worker.is_current()
+            if worker is not None and not warm:
+                evicted.append(self._workers.pop(path))
+            if not warm:
+                worker = self._workers[path] = BlendWorker(self.blender, path)
+            self._workers.move_to_end(path)
+            while len(self._workers) > self.max_files:
+                evicted.append(self._workers.popitem(last=False)[1])
+
+        for old in evicted:
+            # Waits for an export still running in it
+            with old.lock:
+                old.close()
+        return worker, warm
+
+    def status(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"file": str(path), "busy": worker.lock.locked()} for path, worker in self._workers.items()]
+
+    def close(self) -> None:
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.close()
+
+
+def _worker_options(request: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "project": request.get("project", ""),
+        "subpath": request.get("subpath", ""),
+        "output": request.get("destination", ""),
+        "profile": request.get("profile", ""),
+        "roots": request.get("roots"),
+        "settings": request.get("settings", {}),
+        "memory_budget": 0,
+    }
+
+
+def handle_request(pool: WorkerPool, request: Dict[str, Any], send: Callable[[Dict[str, Any]], None]) -> None:
+    if not request.get("file"):
+        send({"event": "done", "status": "failed", "outputs": [], "error": "No .blend file in the request"})
+        return
+
+    path = Path(request["file"]).resolve()
+    if path.suffix.lower() != ".blend" or not path.is_file():
+        send({"event": "done", "status": "failed", "outputs": [], "error": f"Not a .blend file: {path}"})
+        return
+
+    started = time.perf_counter()
+    worker, warm = pool.acquire(path)
+    with worker.lock:
+        events = worker.run(_worker_options(request))
+        for event in events:
+            if event["event"] == "done":
+                event.update(warm=warm, duration=time.perf_counter() - started)
+            try:
+                send(event)
+            except OSError:
+                # The client is gone. The worker's remaining events up to its "done" are read anyway,
+                # the next request on it would get them otherwise
+                for _ in events:
+                    pass
+                return
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        def send(event: Dict[str, Any]) -> None:
+            self.wfile.write((json.dumps(event) + "\n").encode())
+            self.wfile.flush()
+
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                send({"event": "done", "status": "failed", "outputs": [], "error": f"Invalid JSON: {e}"})
+                continue
+
+            token = request.pop("token", "") if isinstance(request, dict) else ""
+            if not isinstance(token, str) or not hmac.compare_digest(token.encode(), self.server.token.encode()):
+                send({"event": "done", "status": "failed", "outputs": [], "error": "Missing or invalid token"})
+                return
+
+            command = request.get("command", "export")
+            if command == "status":
+                send({"event": "status", "files": self.server.pool.status()})
+            elif command == "shutdown":
+                send({"event": "shutdown"})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+            else:
+                handle_request(self.server.pool, request, send)
+
+
+if UNIX_SOCKETS:
+
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(address: Address, pool: WorkerPool, token_path: Path) -> None:
+    if isinstance(address, str):
+        path = Path(address)
+        if path.exists():
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                    probe.connect(address)
+                raise RuntimeError(f"A daemon is already listening on {address}")
+            except ConnectionRefusedError:
+                # Left behind by a daemon that did not shut down cleanly
+                path.unlink()
+
+        old_umask = os.umask(0o177)
+        try:
+            server = _UnixServer(address, _Handler)
+        finally:
+            os.umask(old_umask)
+    else:
+        server = _TCPServer(address, _Handler)
+
+    server.pool = pool
+    server.token = write_token(token_path)
+    print(f"Export daemon listening on {address}, token in {token_path}", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        pool.close()
+        token_path.unlink(missing_ok=True)
+        if isinstance(address, str):
+            Path(address).unlink(missing_ok=True)
+
+
+def send_request(address: Address, request: Dict[str, Any], token: str) -> Iterator[Dict[str, Any]]:
+    """Send a request to a running daemon and yield its replies, up to the final one"""
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    with socket.socket(family, socket.SOCK_STREAM) as connection:
+        connection.connect(address)
+        connection.sendall((json.dumps(dict(request, token=token)) + "\n").encode())
+        with connection.makefile("r", encoding="utf-8") as replies:
+            for line in replies:
+                event = json.loads(line)
+                yield event
+                if event["event"] in {"done", "status", "shutdown"}:
+                    return
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(_script_args(argv))
+    address: Address = args.socket or default_address()
+    if args.port:
+        address = ("127.0.0.1", args.port)
+    token_path = Path(args.token_file) if args.token_file else default_token_path()
+
+    if args.send:
+        failed = False
+        for event in send_request(address, json.loads(args.send), read_token(token_path)):
+            print(json.dumps(event), flush=True)
+            failed = event.get("status") == "failed"
+        return 1 if failed else 0
+
+    blender = args.blender or bpy.app.binary_path
+    if not blender:
+        print("No Blender executable found, pass --blender", file=sys.stderr)
+        return 2
+
+    try:
+        serve(address, WorkerPool(blender, args.max_files), token_path)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _apply_settings(context, settings: Dict[str, Any]) -> None:
+    """Set scene export options for one request, the file is reverted after it"""
+    scene = context.scene
+    unknown = [name for name in settings if name not in scene.bl_rna.properties]
+    if unknown:
+        raise ValueError(f"Unknown export settings: {', '.join(unknown)}")
+
+    for name, value in settings.items():
+        setattr(scene, name, value)
+
+
+def worker_loop() -> None:
+    """Serve export requests from stdin with the .blend open in this background Blender"""
+    context = bpy.context
+
+    def emit(event: Dict[str, Any]) -> None:
+        print(RESULT_PREFIX + json.dumps(event), flush=True)
+
+    def on_asset(asset) -> None:
+        emit(dict(asset.to_record(), event="asset"))
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        options = json.loads(line)
+        try:
+            _apply_settings(context, options.pop("settings"))
+        except (TypeError, ValueError) as e:
+            # A value failing halfway leaves the ones before it set
+            bpy.ops.wm.revert_mainfile()
+            emit({"event": "done", "status": "failed", "outputs": [], "error": str(e)})
+            continue
+
+        try:
+            # Without a memory budget stop, one request always exports every root it asked for
+            result = export_open_file(context, options, on_asset=on_asset, stop_over_budget=False)
+        finally:
+            # Some stages rename objects or change their data without undo, and the settings were set
+            # above: the next request starts from the file as saved, with no cached fingerprints
+            bpy.ops.wm.revert_mainfile()
+            warmup.clear()
+        emit(dict(result, event="done"))
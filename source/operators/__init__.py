@@ -1,5 +1,5 @@
-from .export import FBXExporter
 from .batch_export import N_OT_BatchExport
+from .plan import N_OT_PlanExport
 from .folder import N_OT_SelectFolder, N_OT_ParentFolder, N_OT_NewFolder
 from .project_path import N_OT_SetProjectPath, N_OT_SetCustomProjectPath, N_OT_SetProjectSubpath
 from .tools import N_OT_FixColliderName, fix_colliders
@@ -8,7 +8,11 @@ from .icon_selector import N_OT_IconShow
 
 __all__ = [
     "FBXExporter",
+    "ExportStage",
+    "register_stage",
+    "unregister_stage",
     "N_OT_BatchExport",
+    "N_OT_PlanExport",
     "N_OT_SelectFolder",
     "N_OT_ParentFolder",
     "N_OT_NewFolder",
@@ -20,3 +24,21 @@ __all__ = [
     "N_OT_SmartDecal",
     "N_OT_IconShow",
 ]
+
+
+_LAZY_ATTRIBUTES = {
+    "FBXExporter": ".export",
+    "ExportStage": ".stages",
+    "register_stage": ".stages",
+    "unregister_stage": ".stages",
+}
+
+
+def __getattr__(name: str):
+    # The exporter and its stages pull in numpy and the processing code, so they are only imported on first use
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is not None:
+        from importlib import import_module
+
+        return getattr(import_module(module_name, __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+import bpy
+import numpy as np
+from bpy.types import Action, NlaTrack, Object, Scene
+
+from ..core.types import ExportSettings
+
+CLIP_INDEX_NAME = ".export_me_clips.json"
+
+
+@dataclass
+class AnimationClip:
+    name: str
+    digest: str
+    action: Optional[Action] = None
+    track: Optional[NlaTrack] = None
+
+
+def _matches(name: str, patterns: str) -> bool:
+    filters = [pattern.strip() for pattern in re.split(r"[,;]", patterns) if pattern.strip()]
+    return not filters or any(fnmatch.fnmatchcase(name, pattern) for pattern in filters)
+
+
+def _action_targets(action: Action, armature: Object) -> bool:
+    """True if the action animates this armature, checked on the F-curve paths"""
+    if action.id_root not in {"OBJECT", ""}:
+        return False
+
+    bone_names = set(armature.pose.bones.keys())
+    for fcurve in action.fcurves:
+        match = re.match(r'pose\.bones\["(.+?)"\]', fcurve.data_path)
+        if match and match.group(1) in bone_names:
+            return True
+    return False
+
+
+def _hash_action(digest, action: Action) -> None:
+    for fcurve in action.fcurves:
+        digest.update(f"{fcurve.data_path}[{fcurve.array_index}]".encode())
+        count = len(fcurve.keyframe_points) * 2
+        for attribute in ("co", "handle_left", "handle_right"):
+            values = np.empty(count, dtype=np.float32)
+            fcurve.keyframe_points.foreach_get(attribute, values)
+            digest.update(values.tobytes())
+
+
+def get_clip_digest(
+    settings: ExportSettings, action: Optional[Action] = None, track: Optional[NlaTrack] = None
+) -> str:
+    """Hash of the F-curves and bake settings a clip is exported from"""
+    digest = hashlib.sha1(repr((settings.bake_step, settings.bake_simplify, settings.game_engine)).encode())
+    if action is not None:
+        _hash_action(digest, action)
+    if track is not None:
+        for strip in track.strips:
+            digest.update(repr((strip.frame_start, strip.frame_end, strip.scale, strip.repeat)).encode())
+            if strip.action:
+                _hash_action(digest, strip.action)
+    return digest.hexdigest()
+
+
+def get_animation_clips(armature: Object, settings: ExportSettings) -> List[AnimationClip]:
+    clips: List[AnimationClip] = []
+
+    if settings.animation_mode == "NLA_TRACKS":
+        animation_data = armature.animation_data
+        for track in animation_data.nla_tracks if animation_data else ():
+            if _matches(track.name, settings.action_filter):
+                clips.append(AnimationClip(track.name, get_clip_digest(settings, track=track), track=track))
+        return clips
+
+    for action in bpy.data.actions:
+        if _matches(action.name, settings.action_filter) and _action_targets(action, armature):
+            clips.append(AnimationClip(action.name, get_clip_digest(settings, action=action), action=action))
+    return clips
+
+
+def get_clip_filename(object_name: str, clip: AnimationClip) -> str:
+    clip_name = re.sub(r'[<>:"/\\|?*.]', "_", clip.name)
+    return f"{object_name}_{clip_name}.fbx"
+
+
+@contextmanager
+def clip_applied(scene: Scene, armature: Object, clip: AnimationClip) -> Iterator[None]:
+    """Make the clip the only animation the FBX exporter will bake, restoring everything afterwards"""
+    animation_data = armature.animation_data or armature.animation_data_create()
+    original_action = animation_data.action
+    original_frames = (scene.frame_start, scene.frame_end)
+    original_mute = [(track, track.mute) for track in animation_data.nla_tracks]
+
+    try:
+        if clip.action is not None:
+            animation_data.action = clip.action
+            frame_start, frame_end = clip.action.frame_range
+        else:
+            animation_data.action = None
+            # The exporter bakes the strips of every unmuted track and ignores solo
+            for track, _ in original_mute:
+                track.mute = track != clip.track
+            frame_start = min((strip.frame_start for strip in clip.track.strips), default=scene.frame_start)
+            frame_end = max((strip.frame_end for strip in clip.track.strips), default=scene.frame_end)
+
+        scene.frame_start, scene.frame_end = int(frame_start), int(max(frame_end, frame_start + 1))
+        yield
+    finally:
+        animation_data.action = original_action
+        for track, mute in original_mute:
+            track.mute = mute
+        scene.frame_start, scene.frame_end = original_frames
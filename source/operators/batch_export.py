@@ -1,13 +1,18 @@
-from typing import Set
+from typing import List, Set
+from bpy.props import BoolProperty
 from bpy.types import Operator, Context, Object, Mesh
 from pathlib import Path
 
-from .export import FBXExporter
+from ..core.collection_export import resolve_collection_exports
 from ..core.preferences import add_recent_export_path, get_game_engine_for_path
 from ..core.types import ExportSettings
+from ..core.memory import MB
+from ..core.profiling import profiled
 
 
-IGNORED_UV_NAMES: Set[str] = {"Decal UVs", "UVMap", "Atlas UVs"}
+IGNORED_UV_NAMES: Set[str] = {"Decal UVs", "UVMap", "Atlas UVs", "Lightmap"}
+# Skipped objects named in the report, the rest are counted
+SKIPPED_NAMES = 5
 
 
 def has_multiple_uv_sets(obj: Object) -> bool:
@@ -29,13 +34,45 @@ class N_OT_BatchExport(Operator):
     bl_description = "Export selected objects as FBX"
     bl_options = {"REGISTER"}
 
+    collections: BoolProperty(
+        name="Marked Collections",
+        description="Export the collections marked for export instead of the selected objects",
+        options={"SKIP_SAVE"},
+    )
+
+    @classmethod
+    def description(cls, context: Context, properties) -> str:
+        if properties.collections:
+            return "Export the collections marked for export, one FBX per collection or per top-level object"
+        return cls.bl_description
+
+    @profiled
     def execute(self, context: Context) -> set[str]:
-        for obj in context.selected_objects:
+        objects = None
+        collection_exports = None
+        if self.collections:
+            resolved = resolve_collection_exports(context.view_layer)
+            if resolved.skipped:
+                names = ", ".join(resolved.skipped[:SKIPPED_NAMES])
+                extra = len(resolved.skipped) - SKIPPED_NAMES
+                more = f" and {extra} more" if extra > 0 else ""
+                self.report({"WARNING"}, f"Skipped hidden or excluded objects: {names}{more}")
+            collection_exports, objects = resolved.exports, resolved.object_roots
+            if not collection_exports and not objects:
+                self.report({"WARNING"}, "No visible collections with objects are marked for export")
+                return {"CANCELLED"}
+            roots = objects + [root for export in collection_exports for root in export.roots]
+        else:
+            roots = context.selected_objects
+
+        for obj in roots:
             if obj.type == "MESH" and (has_multiple_uv_sets(obj) or any_child_has_multiple_uvs(obj)):
                 self.report({"WARNING"}, "Some objects have more than one UV set")
                 break
 
         import bpy
+        from .export import FBXExporter
+
         export_folder_str = context.scene.export_folder
         if export_folder_str.startswith("//"):
             export_folder = Path(bpy.path.abspath(export_folder_str)).resolve()
@@ -44,10 +81,50 @@ class N_OT_BatchExport(Operator):
         
         game_engine = get_game_engine_for_path(context, export_folder)
         
-        exporter = FBXExporter(context, game_engine)
-        path = exporter.export()
+        exporter = FBXExporter(context, game_engine, objects=objects, collections=collection_exports)
+        result = exporter.export()
+        path = result.last_path
+
+        if result.missing_profiles:
+            names = ", ".join(result.missing_profiles)
+            self.report({"WARNING"}, f"Export profiles not found, the scene settings were used: {names}")
 
         if path:
             add_recent_export_path(context, str(path.parent))
-            self.report({"INFO"}, f"Exported to {path.as_posix()}")
+
+            details: List[str] = []
+            if result.group_count > 1:
+                details.append(f"{result.group_count} profile groups")
+            patched = sum(asset.patched for asset in result.assets)
+            if patched:
+                details.append(f"{patched} renamed in place")
+            stored = sum(asset.stored for asset in result.assets)
+            if stored:
+                details.append(f"{stored} linked from the FBX store")
+            if result.instances:
+                details.append(f"{len(result.instances)} instances")
+            if result.clips or result.skipped_clips:
+                details.append(f"{len(result.clips)} clips ({len(result.skipped_clips)} unchanged)")
+            removed = result.metric("cleanup_vertices_removed")
+            if removed or result.metric("cleanup_bytes_saved"):
+                saved = result.metric("cleanup_bytes_saved") / 1024
+                details.append(f"cleanup removed {removed:.0f} vertices, about {saved:.0f} KB")
+            packed, cached = result.metric("lightmap_uvs_packed"), result.metric("lightmap_uvs_cached")
+            if packed or cached:
+                details.append(f"{packed + cached:.0f} lightmaps ({cached:.0f} cached)")
+            triangles = result.metric("vertex_cache_triangles")
+            if triangles:
+                before = result.metric("vertex_cache_misses_before") / triangles
+                after = result.metric("vertex_cache_misses_after") / triangles
+                details.append(f"ACMR {before:.2f} to {after:.2f}")
+            if result.peak_memory:
+                details.append(f"peak memory {result.peak_memory / MB:.0f} MB")
+
+            suffix = f" ({', '.join(details)})" if details else ""
+            self.report({"INFO"}, f"Exported to {path.as_posix()}{suffix}")
+
+            failed = [asset for asset in result.assets if asset.verified is False]
+            if failed:
+                names = ", ".join(asset.object_name for asset in failed)
+                self.report({"WARNING"}, f"{len(failed)} exports failed verification: {names}")
         return {"FINISHED"}
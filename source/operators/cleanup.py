@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, List, Optional, Set, Tuple
+import itertools
+import bmesh
+import numpy as np
+from bpy.types import Mesh, Object
+
+from ..core.fingerprint import material_indices
+from ..core.types import ExportSettings
+from .batch_export import IGNORED_UV_NAMES
+from .stages import ExportStage, Hierarchy, register_stage
+
+# Vertex normals are compared after rounding to this many steps per unit
+WELD_NORMAL_STEPS = 100
+# Offsets to a weld cell and the half of its 26 neighbours after it, and the multipliers cells and
+# normals are hashed with
+_NEIGHBOUR_CELLS = np.array(
+    [cell for cell in itertools.product((-1, 0, 1), repeat=3) if cell >= (0, 0, 0)], dtype=np.int64
+)
+_CELL_HASH = np.array([73856093, 19349663, 83492791], dtype=np.int64)
+_NORMAL_HASH = np.array([2654435761, 40503, 2246822519], dtype=np.int64)
+
+# Rough size of what the FBX stores per removed element: vertex positions are doubles, UV layers hold
+# a double pair and an index per face corner, edges one index each
+VERTEX_BYTES = 24
+UV_CORNER_BYTES = 20
+EDGE_BYTES = 4
+
+
+@dataclass
+class VertexGroupBackup:
+    # Name and lock of every group of the object, in order
+    groups: List[Tuple[str, bool]]
+    first: int
+    active_index: int
+    removed: int
+
+
+def weld_targets(mesh: Mesh, used: np.ndarray, distance: float) -> np.ndarray:
+    """
+    Vertex each vertex is welded into, itself when it is kept.
+
+    Only vertices used by faces are welded, and only with vertices at most distance away that have
+    the same vertex normal, so split normals along hard edges stay split. Each vertex is welded into
+    the lowest of those, followed to the vertex that one is welded into. UVs are stored per face
+    corner and survive the weld.
+    """
+    count = len(mesh.vertices)
+    targets = np.arange(count)
+    if distance <= 0 or not used.any():
+        return targets
+
+    positions = np.empty(count * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", positions)
+    normals = np.empty(count * 3, dtype=np.float32)
+    mesh.vertex_normals.foreach_get("vector", normals)
+
+    candidates = np.flatnonzero(used)
+    points = positions.reshape(-1, 3)[candidates].astype(np.float64)
+    normal_keys = np.round(normals.reshape(-1, 3)[candidates] * WELD_NORMAL_STEPS).astype(np.int64)
+    cells = np.floor(points / distance).astype(np.int64)
+
+    # Vertices within the distance are in the same or a neighbouring cell. Cells are looked up by a
+    # hash of the cell and normal, pairs sharing a hash by chance are dropped by the checks below.
+    # Every pair of neighbouring cells is found from one side, so half of the neighbours are searched
+    hashes = cells @ _CELL_HASH + normal_keys @ _NORMAL_HASH
+    order = np.argsort(hashes, kind="stable")
+    hashes = hashes[order]
+
+    nearest = np.arange(len(candidates))
+    for shift in (_NEIGHBOUR_CELLS @ _CELL_HASH).tolist():
+        # Hashes are linear in the cell, the hashes of neighbours stay sorted and are searched in order
+        query = hashes + shift
+        starts = np.searchsorted(hashes, query, side="left")
+        counts = np.searchsorted(hashes, query, side="right") - starts
+        runs = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        first, second = order[np.repeat(np.arange(len(counts)), counts)], order[np.repeat(starts, counts) + runs]
+        low, high = np.minimum(first, second), np.maximum(first, second)
+
+        close = low < high
+        close[close] = (normal_keys[low[close]] == normal_keys[high[close]]).all(axis=1)
+        close[close] = np.linalg.norm(points[low[close]] - points[high[close]], axis=1) <= distance
+        np.minimum.at(nearest, high[close], low[close])
+
+    # Every vertex points at a lower one or itself, so following the pointers ends
+    while True:
+        followed = nearest[nearest]
+        if np.array_equal(followed, nearest):
+            break
+        nearest = followed
+    targets[candidates] = candidates[nearest]
+    return targets
+
+
+def used_uv_names(obj: Object) -> Set[str]:
+    """UV layers worth exporting: the render layer, the known layer names and the ones materials sample"""
+    names = set(IGNORED_UV_NAMES)
+    names.update(uv.name for uv in obj.data.uv_layers if uv.active_render)
+
+    for slot in obj.material_slots:
+        if slot.material and slot.material.use_nodes and slot.material.node_tree:
+            for node in slot.material.node_tree.nodes:
+                uv_map = getattr(node, "uv_map", "")
+                if uv_map:
+                    names.add(uv_map)
+    return names
+
+
+@register_stage
+class CleanupStage(ExportStage):
+    name = "cleanup"
+    after = ("export_copy",)
+
+    def enabled(self, settings: ExportSettings) -> bool:
+        return settings.cleanup_mesh
+
+    def applies_to(self, obj: Object) -> bool:
+        return obj.type == "MESH" and obj.data is not None
+
+    def is_noop(self, obj: Object) -> bool:
+        return not obj.data.polygons
+
+    def apply(self, obj: Object, hierarchy: Hierarchy) -> Any:
+        if obj.session_uid not in hierarchy.copies:
+            return None
+
+        mesh: Mesh = obj.data
+        self._strip_material_slots(obj, mesh)
+        saved_bytes = self._strip_uv_layers(obj, mesh)
+        removed_vertices, removed_edges = self._weld(mesh, hierarchy.settings.weld_distance)
+        saved_bytes += removed_vertices * VERTEX_BYTES + removed_edges * EDGE_BYTES
+
+        hierarchy.add_metric("cleanup_vertices_removed", removed_vertices)
+        hierarchy.add_metric("cleanup_bytes_saved", saved_bytes)
+
+        backup = self._strip_vertex_groups(obj, mesh)
+        if backup is not None:
+            hierarchy.add_metric("cleanup_vertex_groups_removed", backup.removed)
+        return backup
+
+    def undo(self, obj: Object, token: VertexGroupBackup) -> None:
+        # The copy is still assigned, removing groups from the object only renumbers its weights
+        groups = obj.vertex_groups
+        for group in list(groups)[token.first :]:
+            groups.remove(group)
+        for name, lock_weight in token.groups[token.first :]:
+            groups.new(name=name).lock_weight = lock_weight
+        groups.active_index = token.active_index
+
+    def _strip_uv_layers(self, obj: Object, mesh: Mesh) -> int:
+        keep = used_uv_names(obj)
+        unused = [uv.name for uv in mesh.uv_layers if uv.name not in keep]
+        for name in unused:
+            mesh.uv_layers.remove(mesh.uv_layers[name])
+        return len(unused) * len(mesh.loops) * UV_CORNER_BYTES
+
+    def _strip_material_slots(self, obj: Object, mesh: Mesh) -> None:
+        count = len(mesh.materials)
+        if count < 2 or any(slot.link == "OBJECT" for slot in obj.material_slots):
+            return
+
+        indices = np.clip(material_indices(mesh), 0, count - 1)
+        used = np.unique(indices)
+        if len(used) == count:
+            return
+
+        remap = np.zeros(count, dtype=np.int32)
+        remap[used] = np.arange(len(used), dtype=np.int32)
+        for index in reversed(range(count)):
+            if index not in used:
+                mesh.materials.pop(index=index)
+        mesh.polygons.foreach_set("material_index", remap[indices])
+        mesh.update()
+
+    def _weld(self, mesh: Mesh, distance: float) -> Tuple[int, int]:
+        """Weld duplicate vertices and delete loose edges and vertices, returning how many were removed"""
+        loop_vertices = np.empty(len(mesh.loops), dtype=np.int64)
+        mesh.loops.foreach_get("vertex_index", loop_vertices)
+        loop_edges = np.empty(len(mesh.loops), dtype=np.int64)
+        mesh.loops.foreach_get("edge_index", loop_edges)
+
+        used = np.bincount(loop_vertices, minlength=len(mesh.vertices)) > 0
+        loose_edges = np.flatnonzero(np.bincount(loop_edges, minlength=len(mesh.edges)) == 0)
+        loose_vertices = np.flatnonzero(~used)
+        targets = weld_targets(mesh, used, distance)
+        welded = np.flatnonzero(targets != np.arange(len(targets)))
+
+        if not (len(welded) or len(loose_edges) or len(loose_vertices)):
+            return 0, 0
+
+        vertex_count, edge_count = len(mesh.vertices), len(mesh.edges)
+        bm = bmesh.new()
+        try:
+            bm.from_mesh(mesh)
+            bm.verts.ensure_lookup_table()
+            bm.edges.ensure_lookup_table()
+            verts, edges = bm.verts, bm.edges
+
+            # Everything is looked up before deleting, which frees elements and outdates the lookup tables
+            targetmap = {verts[index]: verts[targets[index]] for index in welded.tolist()}
+            wire_edges = [edges[index] for index in loose_edges.tolist()]
+            wire_vertices = [verts[index] for index in loose_vertices.tolist()]
+            # Deleting loose vertices takes the wire edges between them along, the others are still valid
+            bmesh.ops.delete(bm, geom=wire_vertices, context="VERTS")
+            bmesh.ops.delete(bm, geom=[edge for edge in wire_edges if edge.is_valid], context="EDGES")
+            if targetmap:
+                bmesh.ops.weld_verts(bm, targetmap=targetmap)
+            bm.to_mesh(mesh)
+        finally:
+            bm.free()
+
+        return vertex_count - len(mesh.vertices), edge_count - len(mesh.edges)
+
+    def _strip_vertex_groups(self, obj: Object, mesh: Mesh) -> Optional[VertexGroupBackup]:
+        """
+        Remove the vertex groups no vertex of the copy has a weight in.
+
+        Blender has no bulk read of vertex weights: the vertices are walked until every group has
+        a weight, so the whole mesh is only read when there is a group to remove.
+        """
+        groups = obj.vertex_groups
+        if not groups:
+            return None
+
+        empty = {group.index for group in groups}
+        for vertex in mesh.vertices:
+            empty.difference_update(element.group for element in vertex.groups if element.weight > 0)
+            if not empty:
+                return None
+
+        # Groups are added back after the first removed one so they keep their indices
+        backup = VertexGroupBackup(
+            groups=[(group.name, group.lock_weight) for group in groups],
+            first=min(empty),
+            active_index=groups.active_index,
+            removed=len(empty),
+        )
+        for index in sorted(empty, reverse=True):
+            groups.remove(groups[index])
+        return backup
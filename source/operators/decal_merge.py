@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import bpy
+import numpy as np
+from bpy.types import Context, Object, Material, MaterialSlot, Mesh
+from mathutils import Matrix
+
+
+# foreach_get key, dtype and values per element of the attribute types merged generically
+_ATTRIBUTE_LAYOUTS: Dict[str, Tuple[str, type, int]] = {
+    "FLOAT": ("value", np.float32, 1),
+    "INT": ("value", np.int32, 1),
+    "INT8": ("value", np.int32, 1),
+    "BOOLEAN": ("value", bool, 1),
+    "FLOAT2": ("vector", np.float32, 2),
+    "FLOAT_VECTOR": ("vector", np.float32, 3),
+    "FLOAT_COLOR": ("color", np.float32, 4),
+    "BYTE_COLOR": ("color", np.float32, 4),
+    "INT32_2D": ("value", np.int32, 2),
+    "QUATERNION": ("value", np.float32, 4),
+}
+# Attributes merged explicitly: positions are transformed, material indices remapped
+_EXPLICIT_ATTRIBUTES = {"position", "material_index", "uv_seam"}
+
+
+@dataclass
+class AttributeArrays:
+    domain: str
+    data_type: str
+    # One (elements, width) array per merged mesh
+    chunks: List[np.ndarray] = field(default_factory=list)
+    length: int = 0
+
+
+@dataclass
+class MeshArrays:
+    co: List[np.ndarray] = field(default_factory=list)
+    edges: List[np.ndarray] = field(default_factory=list)
+    seams: List[np.ndarray] = field(default_factory=list)
+    loop_verts: List[np.ndarray] = field(default_factory=list)
+    loop_starts: List[np.ndarray] = field(default_factory=list)
+    material_indices: List[np.ndarray] = field(default_factory=list)
+    normals: List[np.ndarray] = field(default_factory=list)
+    attributes: Dict[str, AttributeArrays] = field(default_factory=dict)
+    # Vertex indices and weights of each vertex group, by group name
+    vertex_groups: Dict[str, Tuple[List[np.ndarray], List[np.ndarray]]] = field(default_factory=dict)
+    materials: List[Material] = field(default_factory=list)
+    active_uv: str = ""
+    active_color: str = ""
+    has_custom_normals: bool = False
+    # Elements merged so far, by attribute domain
+    counts: Dict[str, int] = field(default_factory=lambda: {"POINT": 0, "EDGE": 0, "FACE": 0, "CORNER": 0})
+
+
+def merge_decals(context: Context, obj: Object) -> None:
+    me_children: List[Object] = [child for child in obj.children if child.name.startswith("ME")]
+
+    if me_children:
+        # The DECALmachine atlas operator works on the selection, so give it one and put the user's back
+        with _preserved_selection(context):
+            for selected in context.selected_objects:
+                selected.select_set(False)
+            for child in me_children:
+                child.select_set(True)
+            context.view_layer.objects.active = me_children[0]
+            bpy.ops.machin3.use_atlas()
+
+    origin = obj.matrix_world.to_translation()
+    # Objects with several materials show up in several groups but can only be merged once.
+    # Track them by wrapper identity since merged objects are renamed or removed.
+    consumed: Set[int] = set()
+
+    for material_name, objects in group_by_material(obj).items():
+        meshes = [child for child in objects if id(child) not in consumed and child.type == "MESH"]
+        if not meshes:
+            continue
+
+        consumed.update(id(child) for child in meshes)
+        clean_name = material_name.lstrip("ME_")
+        merge_objects(meshes, origin, f"{obj.name}_{clean_name}")
+
+
+def group_by_material(obj: Object) -> Dict[str, List[Object]]:
+    groups: Dict[str, List[Object]] = {}
+    for child in obj.children:
+        slot: MaterialSlot
+        for slot in child.material_slots:
+            mat: Material = slot.material
+            if mat:
+                groups.setdefault(mat.name, []).append(child)
+    return groups
+
+
+def merge_objects(objects: List[Object], origin, name: str) -> Object:
+    """
+    Merge mesh objects into the first one by concatenating their mesh arrays.
+
+    Vertices are baked to world space and offset so the merged object's origin sits at `origin`
+    with no rotation or scale, which is what join + apply transform + origin to cursor produced.
+    Attributes, UV maps, color attributes and vertex groups missing from some meshes are zero there.
+    """
+    target = objects[0]
+    offset = Matrix.Translation(-origin)
+
+    arrays = MeshArrays()
+    for source in objects:
+        _collect_mesh(arrays, source, offset @ source.matrix_world)
+
+    old_mesh: Mesh = target.data
+    merged = _build_mesh(arrays, old_mesh.name)
+
+    target.data = merged
+    target.name = name
+    target.matrix_world = Matrix.Translation(origin)
+    _apply_vertex_groups(target, arrays)
+
+    for source in objects[1:]:
+        mesh = source.data
+        bpy.data.objects.remove(source)
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+
+    if old_mesh.users == 0:
+        bpy.data.meshes.remove(old_mesh)
+
+    return target
+
+
+def reversed_corners(loop_starts: np.ndarray, loop_totals: np.ndarray) -> np.ndarray:
+    """Corner order that reverses the winding of every polygon"""
+    faces = np.repeat(np.arange(len(loop_starts)), loop_totals)
+    position = np.arange(len(faces)) - loop_starts[faces]
+    return loop_starts[faces] + loop_totals[faces] - 1 - position
+
+
+def _collect_mesh(arrays: MeshArrays, source: Object, matrix: Matrix) -> None:
+    mesh: Mesh = source.data
+    n_verts, n_edges, n_loops, n_polys = len(mesh.vertices), len(mesh.edges), len(mesh.loops), len(mesh.polygons)
+    vert_offset, loop_offset = arrays.counts["POINT"], arrays.counts["CORNER"]
+
+    co = np.empty(n_verts * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    co = co.reshape(-1, 3)
+    transform = np.array(matrix, dtype=np.float32)
+    arrays.co.append(co @ transform[:3, :3].T + transform[:3, 3])
+
+    edges = np.empty(n_edges * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edges)
+    arrays.edges.append(edges + vert_offset)
+    seams = np.empty(n_edges, dtype=bool)
+    mesh.edges.foreach_get("use_seam", seams)
+    arrays.seams.append(seams)
+
+    loop_starts = np.empty(n_polys, dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    arrays.loop_starts.append(loop_starts + loop_offset)
+
+    # A mirrored transform turns the faces inside out, join flipped them back
+    corner_order = None
+    if matrix.determinant() < 0:
+        loop_totals = np.empty(n_polys, dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_totals)
+        corner_order = reversed_corners(loop_starts, loop_totals)
+
+    loop_verts = np.empty(n_loops, dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_verts)
+    if corner_order is not None:
+        loop_verts = loop_verts[corner_order]
+    arrays.loop_verts.append(loop_verts + vert_offset)
+
+    # Remap slot indices onto the merged material list
+    slots = source.material_slots
+    remap = np.zeros(max(len(slots), 1), dtype=np.int32)
+    for slot_index, slot in enumerate(slots):
+        if slot.material is None:
+            continue
+        if slot.material not in arrays.materials:
+            arrays.materials.append(slot.material)
+        remap[slot_index] = arrays.materials.index(slot.material)
+    material_indices = np.empty(n_polys, dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", material_indices)
+    arrays.material_indices.append(remap[np.clip(material_indices, 0, len(remap) - 1)])
+
+    # Decals rely on custom normals, rotate them with the vertices
+    normals = np.empty(n_loops * 3, dtype=np.float32)
+    mesh.corner_normals.foreach_get("vector", normals)
+    normal_matrix = np.array(matrix.to_3x3().inverted_safe().transposed(), dtype=np.float32)
+    normals = normals.reshape(-1, 3) @ normal_matrix.T
+    if corner_order is not None:
+        normals = normals[corner_order]
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    arrays.normals.append(normals / np.where(lengths > 0.0, lengths, 1.0))
+    arrays.has_custom_normals = arrays.has_custom_normals or mesh.has_custom_normals
+
+    if not arrays.active_uv and mesh.uv_layers.active:
+        arrays.active_uv = mesh.uv_layers.active.name
+    if not arrays.active_color:
+        arrays.active_color = mesh.attributes.active_color_name
+
+    sizes = {"POINT": n_verts, "EDGE": n_edges, "FACE": n_polys, "CORNER": n_loops}
+    _collect_attributes(arrays, mesh, sizes, corner_order)
+    _collect_vertex_groups(arrays, source, vert_offset)
+
+    for domain, size in sizes.items():
+        arrays.counts[domain] += size
+
+
+def _collect_attributes(
+    arrays: MeshArrays, mesh: Mesh, sizes: Dict[str, int], corner_order: Optional[np.ndarray]
+) -> None:
+    """Append every generic attribute, UV map and color attribute, by name, domain and type"""
+    for attribute in mesh.attributes:
+        # Names starting with "." are Blender's internal layers, written through the mesh API
+        if attribute.name.startswith(".") or attribute.name in _EXPLICIT_ATTRIBUTES:
+            continue
+        layout = _ATTRIBUTE_LAYOUTS.get(attribute.data_type)
+        if layout is None or attribute.domain not in sizes:
+            continue
+        merged = arrays.attributes.setdefault(attribute.name, AttributeArrays(attribute.domain, attribute.data_type))
+        # The first mesh with a name decides its domain and type
+        if merged.domain != attribute.domain or merged.data_type != attribute.data_type:
+            continue
+
+        key, dtype, width = layout
+        size = sizes[attribute.domain]
+        values = np.empty(size * width, dtype=dtype)
+        attribute.data.foreach_get(key, values)
+        values = values.reshape(size, width)
+        if attribute.domain == "CORNER" and corner_order is not None:
+            values = values[corner_order]
+
+        # Meshes merged before this attribute appeared get zeros
+        missing = arrays.counts[attribute.domain] - merged.length
+        if missing:
+            merged.chunks.append(np.zeros((missing, width), dtype=dtype))
+        merged.chunks.append(values)
+        merged.length += missing + size
+
+
+def _collect_vertex_groups(arrays: MeshArrays, source: Object, vert_offset: int) -> None:
+    if not source.vertex_groups:
+        return
+
+    # Blender has no bulk access to vertex weights, this walks the weights of every vertex once
+    names = {group.index: group.name for group in source.vertex_groups}
+    indices: Dict[str, List[int]] = {}
+    weights: Dict[str, List[float]] = {}
+    for vertex in source.data.vertices:
+        for element in vertex.groups:
+            name = names.get(element.group)
+            if name is not None:
+                indices.setdefault(name, []).append(vertex.index + vert_offset)
+                weights.setdefault(name, []).append(element.weight)
+
+    for name in names.values():
+        group_indices, group_weights = arrays.vertex_groups.setdefault(name, ([], []))
+        group_indices.append(np.array(indices.get(name, ()), dtype=np.int32))
+        group_weights.append(np.array(weights.get(name, ()), dtype=np.float32))
+
+
+def _apply_vertex_groups(obj: Object, arrays: MeshArrays) -> None:
+    obj.vertex_groups.clear()
+    for name, (indices, weights) in arrays.vertex_groups.items():
+        group = obj.vertex_groups.new(name=name)
+        group_indices, group_weights = np.concatenate(indices), np.concatenate(weights)
+        # One call per distinct weight, painted groups usually have few
+        for weight in np.unique(group_weights).tolist():
+            group.add(group_indices[group_weights == weight].tolist(), weight, "REPLACE")
+
+
+def _build_mesh(arrays: MeshArrays, name: str) -> Mesh:
+    mesh = bpy.data.meshes.new(name)
+
+    co = np.concatenate(arrays.co)
+    edges = np.concatenate(arrays.edges)
+    loop_starts = np.concatenate(arrays.loop_starts)
+
+    mesh.vertices.add(len(co))
+    mesh.vertices.foreach_set("co", co.ravel())
+    mesh.edges.add(len(edges) // 2)
+    mesh.edges.foreach_set("vertices", edges)
+    mesh.edges.foreach_set("use_seam", np.concatenate(arrays.seams))
+    mesh.loops.add(arrays.counts["CORNER"])
+    mesh.loops.foreach_set("vertex_index", np.concatenate(arrays.loop_verts))
+    mesh.polygons.add(len(loop_starts))
+    mesh.polygons.foreach_set("loop_start", loop_starts)
+    mesh.polygons.foreach_set("material_index", np.concatenate(arrays.material_indices))
+
+    for material in arrays.materials:
+        mesh.materials.append(material)
+
+    for attribute_name, merged in arrays.attributes.items():
+        key, dtype, width = _ATTRIBUTE_LAYOUTS[merged.data_type]
+        missing = arrays.counts[merged.domain] - merged.length
+        values = np.concatenate([*merged.chunks, np.zeros((missing, width), dtype=dtype)])
+        attribute = mesh.attributes.get(attribute_name) or mesh.attributes.new(
+            attribute_name, merged.data_type, merged.domain
+        )
+        attribute.data.foreach_set(key, values.ravel())
+
+    if arrays.active_uv in mesh.uv_layers:
+        mesh.uv_layers.active = mesh.uv_layers[arrays.active_uv]
+    if arrays.active_color in mesh.color_attributes:
+        mesh.attributes.active_color_name = arrays.active_color
+
+    # Sources provide their own edges, calc_edges only fills in any that are missing
+    mesh.update(calc_edges=True)
+
+    # Before validating, which can remove degenerate faces and their corners
+    if arrays.has_custom_normals:
+        mesh.normals_split_custom_set(np.concatenate(arrays.normals).tolist())
+    mesh.validate(clean_customdata=False)
+
+    return mesh
+
+
+@contextmanager
+def _preserved_selection(context: Context) -> Iterator[None]:
+    view_layer = context.view_layer
+    selected_names = {ob.name for ob in context.selected_objects}
+    active_name = view_layer.objects.active.name if view_layer.objects.active else None
+    try:
+        yield
+    finally:
+        for ob in context.selected_objects:
+            if ob.name not in selected_names:
+                ob.select_set(False)
+        for name in selected_names:
+            ob = bpy.data.objects.get(name)
+            if ob:
+                ob.select_set(True)
+        view_layer.objects.active = bpy.data.objects.get(active_name) if active_name else None
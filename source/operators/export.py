@@ -1,22 +1,34 @@
-from typing import Dict, List, Optional, Literal, TYPE_CHECKING, Tuple
+from typing import Any, Callable, Dict, List, Optional, Literal, Set, Tuple, Union
+import hashlib
+import os
+import time
 import bpy
-import bmesh
 from pathlib import Path
-from dataclasses import dataclass, field
-from bpy.types import Context, Object, Modifier, Mesh
-
-from ..core.types import ExportSettings
-from ..core.paths import get_children, get_object_location, set_object_location
-from .tools import fix_colliders
-
-if TYPE_CHECKING:
-    from mathutils import Vector
-
-
-@dataclass
-class MaterialBackup:
-    mat_faces: Dict[int, int] = field(default_factory=dict)
-    materials: List[bpy.types.Material] = field(default_factory=list)
+from bpy.types import Context, Object, Mesh
+from mathutils import Matrix
+
+from ..core.types import ExportSettings, AssetResult, BatchResult
+from ..core.telemetry import get_user_directory, log_asset
+from ..core.memory import MemoryTracker, MB
+from ..core.cache import JsonIndex
+from ..core.collection_export import CollectionExport
+from ..core.fbx_binary import FBXFormatError, rename_objects
+from ..core.fbx_store import STORE_FOLDER, FBXStore, detach
+from ..core.fingerprint import object_fingerprint
+from ..core.preferences import get_preferences, get_project_for_path
+from ..core.profiles import apply_project, collection_export_settings, group_by_profile
+from ..core.paths import get_children
+from .batch_export import has_multiple_uv_sets
+from .stages import Hierarchy, run_stages, undo_stages
+from .verify import expected_export, verify_export
+from .animation import CLIP_INDEX_NAME, clip_applied, get_animation_clips, get_clip_filename
+from . import cleanup, lightmap, textures, vertex_cache  # noqa: F401  register their export stages
+
+
+INSTANCE_MANIFEST_NAME = "instances.json"
+EXPORT_MANIFEST_NAME = ".export_me_exports.json"
+# bpy.data collections the stages create temporary data in, freed when over the memory budget
+RELEASED_DATA = ("meshes", "materials", "images", "actions", "node_groups")
 
 
 def get_engine_export_settings(engine: Literal["UNREAL", "UNITY", "GODOT"]) -> Tuple[str, str, bool]:
@@ -35,157 +47,510 @@ def get_engine_export_settings(engine: Literal["UNREAL", "UNITY", "GODOT"]) -> T
     return settings.get(engine, settings["UNREAL"])
 
 
-class FBXExporter:
-    def __init__(self, context: Context, game_engine: Literal["UNREAL", "UNITY", "GODOT"] = "UNREAL") -> None:
-        self.context = context
-        self.settings = ExportSettings.from_scene(context.scene, game_engine)
-        self.export_objects: List[Object] = list(context.selected_objects)
-        self._material_backup = MaterialBackup()
-
-    def export(self) -> Optional[Path]:
-        bpy.ops.object.mode_set(mode="OBJECT")
-
-        if self.settings.purge_data:
-            self._purge_orphans()
-
-        exported_path: Optional[Path] = None
-        for obj in self.export_objects:
-            exported_path = self._export_object(obj)
-
-        return exported_path
-
-    def _export_object(self, obj: Object) -> Path:
-        bpy.ops.object.select_all(action="DESELECT")
-        obj.select_set(state=True)
-
-        original_location: Optional["Vector"] = self._center_object(obj) if self.settings.center_transform else None
+def get_export_settings(context: Context, game_engine: Literal["UNREAL", "UNITY", "GODOT"]) -> ExportSettings:
+    """Scene export settings with the options of the project the export folder belongs to"""
+    settings = ExportSettings.from_scene(context.scene, game_engine)
+    project = get_project_for_path(context, settings.export_folder)
+    return settings if project is None else apply_project(settings, project)
 
-        for child in get_children(obj):
-            child.select_set(state=True)
 
-        materials_removed: Optional[bool] = self._remove_materials(obj) if self.settings.one_material_id else None
-
-        if self.settings.triangulate:
-            self._add_triangulate(obj)
-
-        if self.settings.black_vertex:
-            self._set_vertex_colors(obj)
-
-        if self.settings.fix_collider:
-            fix_colliders(obj)
-
-        if self.settings.no_decal_uv:
-            self._remove_decal_uvs(obj)
-
-        if self.settings.rename_dot:
-            self._rename_dots(obj)
-
-        export_path = self._write_fbx(obj)
-
-        self._restore_object(obj, original_location, materials_removed)
-
-        return export_path
+def get_instance_signature(obj: Object) -> Optional[tuple]:
+    """
+    Identify a hierarchy by the data it is built from, so linked duplicates share a signature.
 
-    def _center_object(self, obj: Object) -> "Vector":
-        loc = get_object_location(obj)
-        set_object_location(obj, (0, 0, 0))
-        return loc
+    Returns None for hierarchies that cannot be instanced: no mesh, or modifiers that could make
+    two objects sharing a mesh look different.
+    """
+    members = [obj, *get_children(obj)]
+    if not any(member.type == "MESH" for member in members) or any(member.modifiers for member in members):
+        return None
 
-    def _remove_materials(self, obj: Object) -> Optional[bool]:
-        if obj.type == "ARMATURE" or len(obj.data.materials) <= 1:
-            return None
+    def member_key(member: Object, local: bool) -> tuple:
+        matrix = tuple(round(value, 5) for row in member.matrix_local for value in row) if local else ()
+        materials = tuple(slot.material.as_pointer() if slot.material else 0 for slot in member.material_slots)
+        return (member.type, member.data.as_pointer() if member.data else 0, materials, matrix)
 
-        bpy.ops.object.mode_set(mode="EDIT")
-        bm = bmesh.from_edit_mesh(obj.data)
+    children = sorted(member_key(child, local=True) for child in members[1:])
+    return (member_key(obj, local=False), tuple(children))
 
-        self._material_backup.mat_faces = {face.index: face.material_index for face in bm.faces}
 
+class FBXExporter:
+    def __init__(
+        self,
+        context: Context,
+        game_engine: Literal["UNREAL", "UNITY", "GODOT"] = "UNREAL",
+        objects: Optional[List[Object]] = None,
+        memory_budget_mb: Optional[int] = None,
+        stop_over_budget: bool = False,
+        on_asset: Optional[Callable[[AssetResult], None]] = None,
+        collections: Optional[List[CollectionExport]] = None,
+    ) -> None:
+        self.context = context
+        self.settings = get_export_settings(context, game_engine)
+        self.export_objects: List[Object] = list(context.selected_objects if objects is None else objects)
+        # Collections written as one FBX each, after the objects
+        self.collection_exports: List[CollectionExport] = list(collections or ())
+        self.result = BatchResult()
+        self.remaining_objects: List[Union[Object, CollectionExport]] = []
+        self._instance_manifest: Optional[JsonIndex] = None
+        self._clip_index: Optional[JsonIndex] = None
+        self._export_manifest: Optional[JsonIndex] = None
+        self._stage_state: Dict[str, Any] = {}
+        self._known_data: Set[int] = set()
+
+        prefs = get_preferences(context)
+        self._fbx_store: Optional[FBXStore] = None
+        if prefs.fbx_store_size_mb > 0:
+            store_folder = get_user_directory() / STORE_FOLDER
+            if prefs.fbx_store_directory:
+                store_folder = Path(bpy.path.abspath(prefs.fbx_store_directory))
+            self._fbx_store = FBXStore(store_folder, prefs.fbx_store_size_mb * MB)
+
+        if memory_budget_mb is None:
+            memory_budget_mb = prefs.memory_budget_mb
+        self.memory = MemoryTracker(budget=memory_budget_mb * MB)
+        # Headless runs stop when over budget so the caller can continue in a fresh process
+        self.stop_over_budget = stop_over_budget
+        # Called with every asset as soon as it is exported, for callers streaming results
+        self.on_asset = on_asset
+
+    def export(self) -> BatchResult:
+        started = time.perf_counter()
         bpy.ops.object.mode_set(mode="OBJECT")
-        self._material_backup.materials.clear()
 
-        mat_count = len(obj.data.materials)
-        for idx in range(mat_count):
-            self._material_backup.materials.append(obj.data.materials[0])
-            if idx < mat_count - 1:
-                obj.data.materials.pop(index=0)
+        if self.settings.purge_data:
+            self._purge_orphans()
+        # Data of the scene that is orphaned when the run starts belongs to the user, not to the run
+        self._known_data = {
+            block.session_uid for collection in RELEASED_DATA for block in getattr(bpy.data, collection)
+        }
+
+        # Roots sharing a profile are processed together with one settings object
+        base_settings = self.settings
+        # Profile names not found in the preferences, by root or collection session_uid
+        missing_profiles: Dict[int, str] = {}
+        groups = group_by_profile(self.context, self.export_objects, base_settings, missing_profiles)
+        self.result.group_count = len(groups)
+        queue: List[Tuple[ExportSettings, Union[Object, CollectionExport]]] = [
+            (settings, obj) for settings, objects in groups for obj in objects
+        ]
+        queue += collection_export_settings(self.context, self.collection_exports, base_settings, missing_profiles)
+        self.result.missing_profiles = sorted(set(missing_profiles.values()))
+        # Destination and placed matrix of the first root exported with every instance signature
+        instance_sources: Dict[tuple, Tuple[Path, Matrix]] = {}
+
+        try:
+            for position, (settings, item) in enumerate(queue):
+                self.settings = settings
+                is_collection = isinstance(item, CollectionExport)
+
+                signature = get_instance_signature(item) if settings.export_instances and not is_collection else None
+                if signature is not None:
+                    source = instance_sources.get((settings.key(), signature))
+                    if source is not None:
+                        self._record_instance(item, *source)
+                        continue
+
+                known_meshes = set(bpy.data.meshes.keys())
+
+                asset = self._new_asset_result(item.name, item.roots if is_collection else [item])
+                if item.session_uid in missing_profiles:
+                    profile = missing_profiles[item.session_uid]
+                    asset.warnings.append(f"export profile '{profile}' not found, exported with the scene settings")
+                asset_started = time.perf_counter()
+                if is_collection:
+                    asset.destination = self._export_collection(item, asset)
+                else:
+                    asset.destination = self._export_object(item, asset)
+                asset.duration = time.perf_counter() - asset_started
+                if asset.destination.exists():
+                    asset.output_bytes = asset.destination.stat().st_size
+                self.result.assets.append(asset)
+                log_asset(self.context, asset)
+                if self.on_asset is not None:
+                    self.on_asset(asset)
+
+                if signature is not None:
+                    instance_sources[(settings.key(), signature)] = (asset.destination, self._placed_matrix(item))
+                if settings.export_instances and not is_collection:
+                    # A root written as its own FBX is no longer an instance of another one
+                    self._get_instance_manifest().pop(asset.destination.stem)
+
+                self._release_temporaries(known_meshes)
+                if not self._within_memory_budget(item.name) and self.stop_over_budget:
+                    self.remaining_objects = [remaining for _, remaining in queue[position + 1 :]]
+                    break
+        finally:
+            self.settings = base_settings
+
+        if self._instance_manifest is not None and not self.remaining_objects:
+            self._prune_instances()
+        for index in (self._instance_manifest, self._clip_index, self._export_manifest):
+            if index is not None:
+                index.save()
+
+        for state in self._stage_state.values():
+            if hasattr(state, "close"):
+                state.close()
+        if self._fbx_store is not None:
+            self._fbx_store.close()
+
+        self.result.remaining = [item.name for item in self.remaining_objects]
+        self.result.peak_memory = self.memory.peak
+        self.result.duration = time.perf_counter() - started
+        return self.result
+
+    def _new_asset_result(self, name: str, roots: List[Object]) -> AssetResult:
+        """Describe an export before it is processed, with the source mesh statistics of its roots"""
+        asset = AssetResult(
+            source_blend=bpy.data.filepath,
+            object_name=name,
+            destination=Path(),
+            engine=self.settings.game_engine,
+            settings_hash=self.settings.digest(),
+        )
 
+        materials: Set[str] = set()
+        for mesh_obj in (member for root in roots for member in (root, *get_children(root))):
+            if mesh_obj.type != "MESH" or not mesh_obj.data:
+                continue
+            mesh: Mesh = mesh_obj.data
+            asset.vertices += len(mesh.vertices)
+            asset.triangles += len(mesh.loops) - 2 * len(mesh.polygons)
+            materials.update(slot.material.name for slot in mesh_obj.material_slots if slot.material)
+            if has_multiple_uv_sets(mesh_obj):
+                asset.warnings.append(f"{mesh_obj.name} has multiple UV sets")
+
+        asset.materials = len(materials)
+        return asset
+
+    def _get_instance_manifest(self) -> JsonIndex:
+        if self._instance_manifest is None:
+            self._instance_manifest = JsonIndex(self.settings.export_folder / INSTANCE_MANIFEST_NAME)
+        return self._instance_manifest
+
+    def _placed_matrix(self, root: Object) -> Matrix:
+        """World matrix the FBX of a root places it with, after the center stage moved it"""
+        matrix = root.matrix_world.copy()
+        if self.settings.center_transform:
+            parent = root.parent
+            matrix.translation = (parent.matrix_world @ root.matrix_parent_inverse).translation if parent else (0, 0, 0)
+        return matrix
+
+    def _record_instance(self, obj: Object, source: Path, source_matrix: Matrix) -> None:
+        """
+        Place a linked duplicate in the manifest instead of writing its geometry again.
+
+        The transform is relative to the source FBX, whose root already carries the transform it was
+        written with: applied to the imported source, it gives the duplicate's world transform.
+        """
+        matrix = obj.matrix_world @ source_matrix.inverted_safe()
+        location, rotation, scale = matrix.decompose()
+        name = obj.name.replace(".", "_") if self.settings.rename_dot else obj.name
+
+        self._get_instance_manifest().set(
+            name,
+            {
+                "source": source.name,
+                "engine": self.settings.game_engine,
+                "blend": bpy.data.filepath,
+                "object": obj.name,
+                "location": list(location),
+                "rotation_quaternion": list(rotation),
+                "scale": list(scale),
+                "matrix": [list(row) for row in matrix],
+            },
+        )
+        self.result.instances.append(name)
+
+    def _prune_instances(self) -> None:
+        """
+        Drop manifest entries whose source FBX is gone, and those of this file whose object is.
+
+        Entries of other blend files exporting to the same folder are kept, their objects are not
+        loaded to check them.
+        """
+        manifest = self._get_instance_manifest()
+        folder = manifest.path.parent
+        for name in manifest:
+            entry = manifest.get(name)
+            if not isinstance(entry, dict) or not (folder / str(entry.get("source", ""))).exists():
+                manifest.pop(name)
+            elif entry.get("blend") == bpy.data.filepath and entry.get("object") not in bpy.data.objects:
+                manifest.pop(name)
+
+    def _within_memory_budget(self, asset_name: str) -> bool:
+        sample = self.memory.sample(asset_name)
+        if not self.memory.over_budget(sample):
+            return True
+        return self.memory.collect(self._release_orphans)
+
+    def _release_orphans(self) -> None:
+        """Remove the data blocks created during the run that nothing uses any more, and cached lightmaps"""
+        lightmap.clear_cache()
+        orphans = [
+            block
+            for collection in RELEASED_DATA
+            for block in getattr(bpy.data, collection)
+            if block.users == 0 and block.session_uid not in self._known_data
+        ]
+        if orphans:
+            bpy.data.batch_remove(orphans)
+
+    def _release_temporaries(self, known_meshes: Set[str]) -> None:
+        """Free the data an asset export created so it does not pile up over a batch"""
+        for mesh in [mesh for mesh in bpy.data.meshes if mesh.users == 0 and mesh.name not in known_meshes]:
+            bpy.data.meshes.remove(mesh)
+
+    def _export_object(self, obj: Object, asset: AssetResult) -> Path:
+        """
+        Write the FBX of a root, patch the names of an earlier export of the same content, or link
+        the FBX an identical export stored.
+        """
+        # Fingerprints describe the scene before the stages change it, the state the idle warmup caches
+        use_fingerprints = self.settings.patch_renames or self._fbx_store is not None
+        fingerprints = self._fingerprint_hierarchy(obj) if use_fingerprints else None
+        hierarchy = run_stages(obj, self.settings, self._stage_state)
+        try:
+            export_path = self._get_export_path(obj)
+            description = self._describe_hierarchy(hierarchy, fingerprints) if fingerprints else None
+            if description is not None and self.settings.patch_renames:
+                asset.patched = self._patch_renamed(description, export_path)
+
+            store_key = None
+            if description is not None and self._fbx_store is not None and not asset.patched:
+                store_key = self._store_key(hierarchy, description, fingerprints)
+                asset.stored = self._fbx_store.fetch(store_key, export_path)
+
+            if not asset.patched and not asset.stored:
+                self._select_for_export(hierarchy.objects, asset)
+                written = self._write_unlinked(obj, export_path, asset)
+                if store_key is not None and written:
+                    self._fbx_store.add(store_key, export_path)
+
+            if description is not None:
+                self._record_export(description, export_path)
+            if self.settings.verify_exports:
+                self._verify(hierarchy, export_path, asset)
+            asset.metrics.update(hierarchy.metrics)
+            asset.warnings.extend(hierarchy.warnings)
+            if self.settings.export_animations and self.settings.animation_mode != "ALL":
+                self._write_animation_clips(obj, hierarchy)
+            return export_path
+        finally:
+            undo_stages(hierarchy)
+
+    def _export_collection(self, export: CollectionExport, asset: AssetResult) -> Path:
+        """
+        Write the top-level objects of a collection and their children into one FBX.
+
+        Renames are not patched, the FBX store is not used and the file is not verified, as those
+        work on a single hierarchy. Animation clips are only written for objects exported on their own.
+        """
+        hierarchies: List[Hierarchy] = []
+        try:
+            for root in export.roots:
+                hierarchies.append(run_stages(root, self.settings, self._stage_state))
+
+            name = export.name.replace(".", "_") if self.settings.rename_dot else export.name
+            export_path = self.settings.export_folder / f"{name}.fbx"
+
+            self._select_for_export([member for hierarchy in hierarchies for member in hierarchy.objects], asset)
+            self._write_unlinked(export.roots[0], export_path, asset)
+
+            for hierarchy in hierarchies:
+                for metric, value in hierarchy.metrics.items():
+                    asset.metrics[metric] = asset.metrics.get(metric, 0) + value
+                asset.warnings.extend(hierarchy.warnings)
+            return export_path
+        finally:
+            for hierarchy in reversed(hierarchies):
+                undo_stages(hierarchy)
+
+    def _write_unlinked(self, obj: Object, export_path: Path, asset: AssetResult) -> bool:
+        """
+        Write the FBX without writing into a file hardlinked to the FBX store or other destinations.
+
+        Returns False when the destination is in use and kept its previous content.
+        """
+        # The exporter writes in place, which would also change every file linked to the destination
+        if detach(export_path):
+            self._write_fbx(obj, export_path)
+            return True
+
+        tmp_path = export_path.with_name(f"{export_path.stem}.tmp.fbx")
+        self._write_fbx(obj, tmp_path)
+        try:
+            os.replace(tmp_path, export_path)
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            asset.warnings.append(f"{export_path.name} is in use and was not replaced: {e}")
+            return False
         return True
 
-    def _restore_materials(self, obj: Object) -> None:
-        obj.data.materials.clear()
-        for mat in self._material_backup.materials:
-            obj.data.materials.append(mat)
-
-        obj.data.update()
-
-        bpy.ops.object.mode_set(mode="EDIT")
-        bm = bmesh.from_edit_mesh(obj.data)
-
-        for face in bm.faces:
-            face.material_index = self._material_backup.mat_faces[face.index]
-
-        bmesh.update_edit_mesh(obj.data)
-        bpy.ops.object.mode_set(mode="OBJECT")
+    def _select_for_export(self, objects: List[Object], asset: AssetResult) -> None:
+        """Select what the FBX exporter writes, reporting objects it cannot select instead of failing the batch"""
+        view_layer = self.context.view_layer
+        bpy.ops.object.select_all(action="DESELECT")
+        for member in objects:
+            if member.visible_get(view_layer=view_layer):
+                member.select_set(state=True, view_layer=view_layer)
+            else:
+                asset.warnings.append(f"{member.name} is hidden or excluded from the view layer, not exported")
+
+    def _verify(self, hierarchy: Hierarchy, export_path: Path, asset: AssetResult) -> None:
+        axis_up = get_engine_export_settings(self.settings.game_engine)[1]
+        expected = expected_export(self.context, hierarchy, self.settings, axis_up)
+        problems = verify_export(export_path, expected)
+        asset.verified = not problems
+        asset.warnings.extend(problems)
+
+    def _get_export_path(self, obj: Object) -> Path:
+        object_name = self.settings.custom_name or obj.name
+        return self.settings.export_folder / f"{object_name}.fbx"
 
-    def _add_triangulate(self, obj: Object) -> None:
-        for child in get_children(obj):
-            mod: Modifier = child.modifiers.new(name="ME_Triangulate", type="TRIANGULATE")
-            mod.min_vertices = 5
-            mod.keep_custom_normals = True
+    def _get_export_manifest(self) -> JsonIndex:
+        if self._export_manifest is None:
+            self._export_manifest = JsonIndex(self.settings.export_folder / EXPORT_MANIFEST_NAME)
+        return self._export_manifest
 
-    def _remove_triangulate(self, obj: Object) -> None:
-        for child in get_children(obj):
-            mod = child.modifiers.get("ME_Triangulate")
-            if mod:
-                child.modifiers.remove(mod)
+    def _fingerprint_hierarchy(self, obj: Object) -> Optional[Dict[int, str]]:
+        """
+        Name independent fingerprints of a hierarchy's objects, by session_uid.
 
-    def _set_vertex_colors(self, obj: Object) -> None:
-        def apply_black_vertex_color(mesh_obj: Object) -> None:
-            if mesh_obj.type != "MESH" or not mesh_obj.data:
-                return
-            mesh: Mesh = mesh_obj.data
-            if mesh.vertex_colors or mesh.color_attributes:
-                return
+        Returns None when a patch could miss other changes than names: animation, shape keys or
+        modifiers other than the ones export stages add.
+        """
+        if self.settings.export_animations:
+            return None
 
-            mesh.vertex_colors.new(name="Col")
-            color_layer = mesh.vertex_colors.active
-            if not color_layer:
-                return
+        fingerprints: Dict[int, str] = {}
+        for member in (obj, *get_children(obj)):
+            if any(not modifier.name.startswith("ME_") for modifier in member.modifiers):
+                return None
+            if member.type == "MESH" and member.data.shape_keys:
+                return None
+
+            parent = "" if member == obj else fingerprints.get(member.parent.session_uid, "")
+            fingerprints[member.session_uid] = object_fingerprint(member, parent)
+        return fingerprints
+
+    def _describe_hierarchy(
+        self, hierarchy: Hierarchy, fingerprints: Dict[int, str]
+    ) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Content key and written names of a hierarchy whose FBX can be patched when only names change.
+
+        Returns None when meshes of the hierarchy cannot be told apart by their content.
+        """
+        objects: List[Dict[str, Any]] = []
+        for member in hierarchy.objects:
+            if member.type == "MESH" and member.session_uid in fingerprints:
+                objects.append(
+                    {
+                        "fingerprint": fingerprints[member.session_uid],
+                        "name": member.name,
+                        "data": member.data.name,
+                        "materials": [slot.material.name if slot.material else "" for slot in member.material_slots],
+                    }
+                )
+
+        object_fingerprints = sorted(item["fingerprint"] for item in objects)
+        if not objects or len(set(object_fingerprints)) != len(object_fingerprints):
+            return None
 
-            for poly in mesh.polygons:
-                for loop_index in poly.loop_indices:
-                    color_layer.data[loop_index].color = (0.0, 0.0, 0.0, 0.0)
+        key = hashlib.sha1(repr((self.settings.content_digest(), object_fingerprints)).encode()).hexdigest()
+        return key, objects
+
+    def _patch_renamed(self, description: Tuple[str, List[Dict[str, Any]]], export_path: Path) -> bool:
+        """Rename objects in the FBX last exported from the same content, if it is still as written"""
+        key, objects = description
+        entry = self._get_export_manifest().get(key)
+        if not entry:
+            return False
+
+        source = self.settings.export_folder / entry["file"]
+        try:
+            stat = source.stat()
+        except OSError:
+            return False
+        if stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime"]:
+            return False
+
+        previous = {item["fingerprint"]: item for item in entry["objects"]}
+        renames: Dict[str, Dict[str, str]] = {"Model": {}, "Geometry": {}, "Material": {}}
+        for item in objects:
+            old = previous.get(item["fingerprint"])
+            if old is None or len(old["materials"]) != len(item["materials"]):
+                return False
+            pairs = [("Model", old["name"], item["name"]), ("Geometry", old["data"], item["data"])]
+            pairs += [("Material", *names) for names in zip(old["materials"], item["materials"])]
+            for fbx_class, old_name, new_name in pairs:
+                if old_name != new_name and renames[fbx_class].setdefault(old_name, new_name) != new_name:
+                    return False
+
+        # Nothing to rename, a regular export refreshes the file
+        if source == export_path and not any(renames.values()):
+            return False
+
+        try:
+            rename_objects(source, export_path, renames)
+        except (OSError, FBXFormatError):
+            return False
+        return True
 
-        apply_black_vertex_color(obj)
-        for child in get_children(obj):
-            apply_black_vertex_color(child)
+    def _store_key(
+        self, hierarchy: Hierarchy, description: Tuple[str, List[Dict[str, Any]]], fingerprints: Dict[int, str]
+    ) -> str:
+        """Key of the FBX written for a hierarchy: its content and settings, every name in it and the engine axes"""
+        key, objects = description
+        names = [(member.name, member.type) for member in hierarchy.objects]
+        axes = get_engine_export_settings(self.settings.game_engine)
+        content = (key, objects, names, sorted(fingerprints.values()), axes)
+        return hashlib.sha1(repr(content).encode()).hexdigest()
+
+    def _record_export(self, description: Tuple[str, List[Dict[str, Any]]], export_path: Path) -> None:
+        if not export_path.exists():
+            return
+        key, objects = description
+        stat = export_path.stat()
+        self._get_export_manifest().set(
+            key, {"file": export_path.name, "size": stat.st_size, "mtime": stat.st_mtime_ns, "objects": objects}
+        )
 
-    def _remove_decal_uvs(self, obj: Object) -> None:
-        uvs_to_remove = {"Decal UVs"}
+    def _write_animation_clips(self, obj: Object, hierarchy: Hierarchy) -> None:
+        """Write each action or NLA track of the hierarchy's armatures to its own FBX"""
+        if self._clip_index is None:
+            self._clip_index = JsonIndex(self.settings.export_folder / CLIP_INDEX_NAME)
 
-        for child in get_children(obj):
-            if child.type != "MESH" or not child.data:
-                continue
-            mesh: Mesh = child.data
-            for uv in list(mesh.uv_layers):
-                if uv.name in uvs_to_remove:
-                    mesh.uv_layers.remove(uv)
+        object_name = self.settings.custom_name or obj.name
+        for armature in (member for member in hierarchy.objects if member.type == "ARMATURE"):
+            for clip in get_animation_clips(armature, self.settings):
+                filepath = self.settings.export_folder / get_clip_filename(object_name, clip)
 
-    def _rename_dots(self, obj: Object) -> None:
-        if "." in obj.name:
-            obj.name = obj.name.replace(".", "_")
+                unchanged = self._clip_index.get(filepath.name) == clip.digest and filepath.exists()
+                if unchanged and self.settings.skip_unchanged_clips:
+                    self.result.skipped_clips.append(clip.name)
+                    continue
 
-        for child in get_children(obj):
-            if "." in child.name:
-                child.name = child.name.replace(".", "_")
+                with clip_applied(self.context.scene, armature, clip):
+                    self._write_fbx(obj, filepath, clip=True)
+                self._clip_index.set(filepath.name, clip.digest)
+                self.result.clips.append(filepath)
 
-    def _write_fbx(self, obj: Object) -> Path:
+    def _write_fbx(self, obj: Object, filepath: Optional[Path] = None, clip: bool = False) -> Path:
         object_types: set[Literal["MESH", "ARMATURE"]] = {"MESH"}
         if self.settings.export_animations:
             object_types.add("ARMATURE")
+        if clip:
+            object_types = {"ARMATURE"}
 
-        object_name = self.settings.custom_name or obj.name
-        filepath = self.settings.export_folder / f"{object_name}.fbx"
+        if filepath is None:
+            filepath = self._get_export_path(obj)
+
+        # With per-clip export the main file carries the rig only, clips are written separately
+        per_clip = self.settings.animation_mode != "ALL"
+        bake_anim = self.settings.export_animations and (clip or not per_clip)
 
         smoothing: Literal["OFF", "FACE", "EDGE"] = self.settings.smoothing
 
@@ -200,34 +565,23 @@ class FBXExporter:
             filter_glob="*.fbx",
             use_selection=True,
             object_types=object_types,
-            bake_anim=self.settings.export_animations,
+            bake_anim=bake_anim,
             bake_anim_use_all_bones=self.settings.export_animations,
-            bake_anim_use_all_actions=self.settings.export_animations,
+            bake_anim_use_all_actions=bake_anim and not per_clip,
+            bake_anim_use_nla_strips=not clip or self.settings.animation_mode == "NLA_TRACKS",
+            bake_anim_step=self.settings.bake_step,
+            bake_anim_simplify_factor=self.settings.bake_simplify,
             use_armature_deform_only=True,
             bake_space_transform=bake_space_transform,
             mesh_smooth_type=smoothing,
+            use_tspace=self.settings.export_tangents,
             add_leaf_bones=True,
-            path_mode="ABSOLUTE",
+            path_mode="RELATIVE" if self.settings.publish_textures else "ABSOLUTE",
             axis_up=axis_up,
             axis_forward=axis_forward,
         )
 
         return filepath
 
-    def _restore_object(
-        self,
-        obj: Object,
-        original_location: Optional["Vector"],
-        materials_removed: Optional[bool],
-    ) -> None:
-        if materials_removed:
-            self._restore_materials(obj)
-
-        if original_location is not None:
-            set_object_location(obj, original_location)
-
-        if self.settings.triangulate:
-            self._remove_triangulate(obj)
-
     def _purge_orphans(self) -> None:
         bpy.ops.outliner.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True)
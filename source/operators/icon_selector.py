@@ -1,4 +1,5 @@
 from typing import List
+from functools import cache
 import bpy
 import math
 import re
@@ -31,8 +32,9 @@ ICON_BLACKLIST_PATTERNS = [
 ]
 
 
+@cache
 def get_all_icons() -> List[str]:
-    """Get all Blender icons filtered by blacklist patterns."""
+    """Get all Blender icons filtered by blacklist patterns (computed once per session)."""
     all_icons = [
         item.identifier for item in bpy.types.UILayout.bl_rna.functions["operator"].parameters["icon"].enum_items
     ]
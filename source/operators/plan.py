@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import bpy
+from bpy.props import BoolProperty, StringProperty
+from bpy.types import Context, Event, Object, Operator, UILayout
+
+from ..core.memory import MB
+from ..core.paths import get_children
+from ..core.preferences import get_game_engine_for_path
+from ..core.profiles import group_by_profile
+from ..core.telemetry import CostModel, read_history
+from ..core.types import ExportSettings
+
+POPUP_WIDTH = 520
+# Assets listed in the popup, the JSON has all of them
+POPUP_ASSETS = 30
+
+_last_plan: Optional[ExportPlan] = None
+
+
+@dataclass
+class PlannedAsset:
+    root: str
+    children: List[str]
+    destination: str
+    settings_hash: str
+    triangles: int = 0
+    # Objects each stage would change, by stage name
+    stages: Dict[str, int] = field(default_factory=dict)
+    instance_of: str = ""
+    estimated_seconds: float = 0.0
+    estimated_bytes: int = 0
+    problems: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ExportPlan:
+    export_folder: str
+    engine: str
+    assets: List[PlannedAsset] = field(default_factory=list)
+    # Past exports the estimates are fitted to, 0 when they are defaults
+    history_samples: int = 0
+
+    @property
+    def estimated_seconds(self) -> float:
+        return sum(asset.estimated_seconds for asset in self.assets)
+
+    @property
+    def estimated_bytes(self) -> int:
+        return sum(asset.estimated_bytes for asset in self.assets)
+
+    def summary(self) -> str:
+        files = sum(not asset.instance_of for asset in self.assets)
+        basis = f"from {self.history_samples} past exports" if self.history_samples else "no export history yet"
+        return (
+            f"{files} files to {self.export_folder} for {self.engine}, about {self.estimated_seconds:.1f}s "
+            f"and {self.estimated_bytes / MB:.1f} MB ({basis})"
+        )
+
+    def to_json(self) -> str:
+        data = dict(asdict(self), estimated_seconds=self.estimated_seconds, estimated_bytes=self.estimated_bytes)
+        return json.dumps(data, indent=2)
+
+
+def _planned_stages(root: Object, members: List[Object], settings: ExportSettings) -> Dict[str, int]:
+    from .stages import get_stages
+
+    stages: Dict[str, int] = {}
+    for stage in get_stages():
+        if not stage.enabled(settings):
+            continue
+        count = sum(
+            stage.in_scope(obj == root) and stage.applies_to(obj) and not stage.is_noop(obj) for obj in members
+        )
+        if count:
+            stages[stage.name] = count
+    return stages
+
+
+def plan_export(context: Context, objects: Optional[List[Object]] = None) -> ExportPlan:
+    """
+    What exporting the selected objects would do, read from the scene without changing it.
+
+    Stages are checked against the scene as it is, so a stage depending on an earlier one's
+    changes may be listed for more objects than it will change.
+    """
+    from .export import get_export_settings, get_instance_signature
+
+    engine = get_game_engine_for_path(context, ExportSettings.from_scene(context.scene).export_folder)
+    base = get_export_settings(context, engine)
+    roots = list(context.selected_objects if objects is None else objects)
+
+    history = read_history(context)
+    models: Dict[str, CostModel] = {}
+    plan = ExportPlan(base.export_folder.as_posix(), engine)
+    destinations: Dict[str, str] = {}
+    instance_sources: Dict[Tuple[tuple, tuple], str] = {}
+
+    for settings, group in group_by_profile(context, roots, base):
+        for root in group:
+            members = [root, *get_children(root)]
+            name = root.name.replace(".", "_") if settings.rename_dot else root.name
+            destination = settings.export_folder / f"{settings.custom_name or name}.fbx"
+            asset = PlannedAsset(
+                root=root.name,
+                children=[child.name for child in members[1:]],
+                destination=destination.as_posix(),
+                settings_hash=settings.digest(),
+            )
+            plan.assets.append(asset)
+
+            signature = get_instance_signature(root) if settings.export_instances else None
+            if signature is not None:
+                source = instance_sources.setdefault((settings.key(), signature), root.name)
+                if source != root.name:
+                    asset.instance_of = source
+                    continue
+
+            for obj in members:
+                if obj.type == "MESH" and obj.data:
+                    asset.triangles += len(obj.data.loops) - 2 * len(obj.data.polygons)
+            asset.stages = _planned_stages(root, members, settings)
+
+            model = models.get(settings.game_engine)
+            if model is None:
+                model = models[settings.game_engine] = CostModel.fit(history, settings.game_engine)
+            plan.history_samples = max(plan.history_samples, model.samples)
+            asset.estimated_seconds, asset.estimated_bytes = model.estimate(asset.triangles)
+
+            previous = destinations.setdefault(asset.destination, root.name)
+            if previous != root.name:
+                asset.problems.append(f"overwrites the export of {previous} at {destination.name}")
+            if not settings.export_animations and not any(obj.type == "MESH" for obj in members):
+                asset.problems.append("has no meshes to export")
+
+    return plan
+
+
+def _draw_asset(layout: UILayout, asset: PlannedAsset) -> None:
+    box = layout.box()
+    row = box.row()
+    row.label(text=asset.root, icon="OBJECT_DATA")
+    if asset.instance_of:
+        row.label(text=f"Instance of {asset.instance_of}", icon="LINKED")
+        return
+    row.label(text=Path(asset.destination).name, icon="FILE")
+    row.label(text=f"{asset.triangles:,} tris, ~{asset.estimated_seconds:.1f}s")
+
+    if asset.stages:
+        box.label(text=", ".join(f"{name} x{count}" for name, count in asset.stages.items()), icon="MODIFIER")
+    for problem in asset.problems:
+        box.label(text=problem, icon="ERROR")
+
+
+class N_OT_PlanExport(Operator):
+    bl_idname = "object.plan_export"
+    bl_label = "Plan Export"
+    bl_description = "Show what exporting the selected objects would write and roughly how long it takes"
+    bl_options = {"REGISTER"}
+
+    filepath: StringProperty(subtype="FILE_PATH", options={"SKIP_SAVE"})
+    filter_glob: StringProperty(default="*.json", options={"HIDDEN"})
+    write_json: BoolProperty(name="Write JSON", options={"SKIP_SAVE"})
+
+    def invoke(self, context: Context, event: Event) -> set[str]:
+        global _last_plan
+
+        if self.write_json and not self.filepath:
+            self.filepath = "export_plan.json"
+            context.window_manager.fileselect_add(self)
+            return {"RUNNING_MODAL"}
+        if self.filepath:
+            return self.execute(context)
+
+        _last_plan = plan_export(context)
+        return context.window_manager.invoke_popup(self, width=POPUP_WIDTH)
+
+    def execute(self, context: Context) -> set[str]:
+        plan = plan_export(context)
+        if not self.filepath:
+            self.report({"INFO"}, plan.summary())
+            return {"FINISHED"}
+
+        path = Path(bpy.path.abspath(self.filepath))
+        try:
+            path.write_text(plan.to_json(), encoding="utf-8")
+        except OSError as e:
+            self.report({"ERROR"}, f"Could not write the plan: {e}")
+            return {"CANCELLED"}
+        self.report({"INFO"}, f"Export plan written to {path.as_posix()}")
+        return {"FINISHED"}
+
+    def draw(self, context: Context) -> None:
+        layout = self.layout
+        plan = _last_plan
+        if plan is None or not plan.assets:
+            layout.label(text="Nothing selected to export", icon="INFO")
+            return
+
+        layout.label(text=plan.summary(), icon="TIME")
+        for asset in plan.assets[:POPUP_ASSETS]:
+            _draw_asset(layout, asset)
+        if len(plan.assets) > POPUP_ASSETS:
+            layout.label(text=f"and {len(plan.assets) - POPUP_ASSETS} more, see the JSON plan")
+
+        layout.operator(self.bl_idname, text="Save as JSON", icon="EXPORT").write_json = True
@@ -2,7 +2,7 @@ from bpy.types import Operator, Context
 from bpy.props import IntProperty
 from pathlib import Path
 
-from ..core.preferences import get_custom_paths, get_preferences
+from ..core.preferences import get_custom_paths, get_project_index
 
 
 class N_OT_SetProjectPath(Operator):
@@ -33,8 +33,8 @@ class N_OT_SetCustomProjectPath(Operator):
             self.report({"ERROR"}, "Invalid path index")
             return {"CANCELLED"}
 
-        # Update selected project enum
-        context.scene.selected_project_enum = str(self.index)
+        # Select the project in the project browser
+        context.scene.project_list_index = self.index
 
         selected_path = Path(custom_paths[self.index].filepath)
         context.scene.export_folder = selected_path.as_posix()
@@ -52,28 +52,19 @@ class N_OT_SetProjectSubpath(Operator):
     subpath_index: IntProperty(name="Subpath Index", default=0)
 
     def execute(self, context: Context) -> set[str]:
-        prefs = get_preferences(context)
+        project_index = get_project_index(context)
 
-        if self.project_index >= len(prefs.custom_project_paths):
+        if self.project_index >= project_index.count:
             self.report({"ERROR"}, "Invalid project index")
             return {"CANCELLED"}
 
-        project = prefs.custom_project_paths[self.project_index]
-
-        if self.subpath_index >= len(project.subpaths):
+        full_path = project_index.subpaths.get((self.project_index, self.subpath_index))
+        if full_path is None:
             self.report({"ERROR"}, "Invalid subpath index")
             return {"CANCELLED"}
 
-        # Update selected project enum
-        context.scene.selected_project_enum = str(self.project_index)
-
-        subpath = project.subpaths[self.subpath_index]
-        project_root = Path(project.filepath)
-        
-        if subpath.relative_path:
-            full_path = project_root / subpath.relative_path
-        else:
-            full_path = project_root
+        # Select the project in the project browser
+        context.scene.project_list_index = self.project_index
 
         context.scene.export_folder = full_path.as_posix()
         context.scene.export_smoothing = "OFF"
@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Literal, Optional, Tuple, Type
+import bpy
+import numpy as np
+from bpy.types import Object, Mesh
+
+from ..core.types import ExportSettings
+from ..core.paths import get_children, get_object_location, set_object_location
+from ..core.fingerprint import material_indices, max_polygon_size
+from ..core.warmup import mesh_value
+from .tools import fix_colliders, UE_COLLIDER_PREFIXES
+
+StageScope = Literal["ROOT", "CHILDREN", "ALL"]
+
+
+class ExportStage(ABC):
+    """
+    One preprocessing step applied to an export hierarchy before the FBX is written.
+
+    Subclasses declare where they run (scope, applies_to), when they have nothing to do (is_noop)
+    and how to revert their change (undo). apply() returns a token passed back to undo(), None
+    meaning there is nothing to revert.
+    """
+
+    name: str = ""
+    after: Tuple[str, ...] = ()
+    scope: StageScope = "ALL"
+
+    def enabled(self, settings: ExportSettings) -> bool:
+        return True
+
+    def in_scope(self, is_root: bool) -> bool:
+        return self.scope == "ALL" or (self.scope == "ROOT") == is_root
+
+    def applies_to(self, obj: Object) -> bool:
+        return True
+
+    def is_noop(self, obj: Object) -> bool:
+        return False
+
+    @abstractmethod
+    def apply(self, obj: Object, hierarchy: Hierarchy) -> Any:
+        """Change obj for the export, returning the token undo() reverts it with"""
+
+    def undo(self, obj: Object, token: Any) -> None:
+        pass
+
+
+@dataclass
+class Hierarchy:
+    root: Object
+    children: List[Object]
+    settings: ExportSettings
+    # State shared by stages across every hierarchy of an export batch
+    shared: Dict[str, Any] = field(default_factory=dict)
+    applied: List[Tuple[ExportStage, Object, Any]] = field(default_factory=list)
+    skipped: Dict[str, int] = field(default_factory=dict)
+    # Original meshes of the objects exported from a temporary copy, by object session_uid
+    copies: Dict[int, Mesh] = field(default_factory=dict)
+    # Numbers stages report for the asset, summed over the hierarchy
+    metrics: Dict[str, float] = field(default_factory=dict)
+    warnings: List[str] = field(default_factory=list)
+
+    def add_metric(self, name: str, value: float) -> None:
+        self.metrics[name] = self.metrics.get(name, 0) + value
+
+    @property
+    def objects(self) -> List[Object]:
+        return [self.root, *self.children]
+
+
+_registry: Dict[str, Type[ExportStage]] = {}
+_ordered: Optional[List[ExportStage]] = None
+
+
+def register_stage(stage_cls: Type[ExportStage]) -> Type[ExportStage]:
+    """Add a stage to the export pipeline, usable as a class decorator"""
+    global _ordered
+    if not stage_cls.name:
+        raise ValueError(f"{stage_cls.__name__} has no stage name")
+    _registry[stage_cls.name] = stage_cls
+    _ordered = None
+    return stage_cls
+
+
+def unregister_stage(name: str) -> None:
+    global _ordered
+    _registry.pop(name, None)
+    _ordered = None
+
+
+def get_stages() -> List[ExportStage]:
+    """Registered stages sorted so each runs after the stages it declares, else in registration order"""
+    global _ordered
+    if _ordered is not None:
+        return _ordered
+
+    ordered: List[ExportStage] = []
+    placed: set[str] = set()
+    pending = list(_registry.values())
+
+    while pending:
+        for stage_cls in pending:
+            if all(dependency in placed or dependency not in _registry for dependency in stage_cls.after):
+                ordered.append(stage_cls())
+                placed.add(stage_cls.name)
+                pending.remove(stage_cls)
+                break
+        else:
+            names = ", ".join(stage_cls.name for stage_cls in pending)
+            raise ValueError(f"Export stages have circular dependencies: {names}")
+
+    _ordered = ordered
+    return ordered
+
+
+def run_stages(root: Object, settings: ExportSettings, shared: Optional[Dict[str, Any]] = None) -> Hierarchy:
+    """Walk the hierarchy once, applying every enabled stage that has work to do on each object"""
+    hierarchy = Hierarchy(root, get_children(root), settings, {} if shared is None else shared)
+    stages = [stage for stage in get_stages() if stage.enabled(settings)]
+
+    try:
+        for obj in hierarchy.objects:
+            is_root = obj == root
+            for stage in stages:
+                if not stage.in_scope(is_root):
+                    continue
+                if not stage.applies_to(obj) or stage.is_noop(obj):
+                    hierarchy.skipped[stage.name] = hierarchy.skipped.get(stage.name, 0) + 1
+                    continue
+                token = stage.apply(obj, hierarchy)
+                if token is not None:
+                    hierarchy.applied.append((stage, obj, token))
+    except BaseException:
+        # The caller never gets the hierarchy to undo, leave the scene as it was
+        undo_stages(hierarchy)
+        raise
+
+    return hierarchy
+
+
+def undo_stages(hierarchy: Hierarchy) -> None:
+    for stage, obj, token in reversed(hierarchy.applied):
+        stage.undo(obj, token)
+    hierarchy.applied.clear()
+
+
+def _is_mesh(obj: Object) -> bool:
+    return obj.type == "MESH" and obj.data is not None
+
+
+@register_stage
+class CenterStage(ExportStage):
+    name = "center"
+    scope = "ROOT"
+
+    def enabled(self, settings: ExportSettings) -> bool:
+        return settings.center_transform
+
+    def is_noop(self, obj: Object) -> bool:
+        return not any(obj.location)
+
+    def apply(self, obj: Object, hierarchy: Hierarchy) -> Any:
+        location = get_object_location(obj)
+        set_object_location(obj, (0, 0, 0))
+        return location
+
+    def undo(self, obj: Object, token: Any) -> None:
+        set_object_location(obj, token)
+
+
+@dataclass
+class MaterialBackup:
+    material_indices: np.ndarray
+    materials: List[bpy.types.Material] = field(default_factory=list)
+
+
+@register_stage
+class OneMaterialStage(ExportStage):
+    name = "one_material"
+    after = ("center",)
+    scope = "ROOT"
+
+    def enabled(self, settings: ExportSettings) -> bool:
+        return settings.one_material_id
+
+    def applies_to(self, obj: Object) -> bool:
+        return _is_mesh(obj)
+
+    def is_noop(self, obj: Object) -> bool:
+        return len(obj.data.materials) <= 1
+
+    def apply(self, obj: Object, hierarchy: Hierarchy) -> Any:
+        mesh: Mesh = obj.data
+        # Read from the live mesh, undo writes the backup back into the user's data
+        backup = MaterialBackup(material_indices(mesh), list(mesh.materials))
+
+        # Keep only the last material, as the exporter always has
+        while len(mesh.materials) > 1:
+            mesh.materials.pop(index=0)
+        return backup
+
+    def undo(self, obj: Object, token: Any) -> None:
+        mesh: Mesh = obj.data
+        mesh.materials.clear()
+        for material in token.materials:
+            mesh.materials.append(material)
+        mesh.polygons.foreach_set("material_index", token.material_indices)
+        mesh.update()
+
+
+@register_stage
+class TriangulateStage(ExportStage):
+    name = "triangulate"
+    scope = "CHILDREN"
+    modifier_name = "ME_Triangulate"
+    min_vertices = 5
+
+    def enabled(self, settings: ExportSettings) -> bool:
+        return settings.triangulate and not settings.export_tangents
+
+    def applies_to(self, obj: Object) -> bool:
+        return _is_mesh(obj)
+
+    def is_noop(self, obj: Object) -> bool:
+        # Bevel, Boolean, Solidify and the like can create polygons the base mesh does not have
+        if any(not modifier.name.startswith("ME_") for modifier in obj.modifiers):
+            return False
+        return mesh_value(obj.data, "max_polygon_size", max_polygon_size) < self.min_vertices
+
+    def apply(self, obj: Object, hierarchy: Hierarchy) -> Any:
+        mod = obj.modifiers.new(name=self.modifier_name, type="TRIANGULATE")
+        mod.min_vertices = self.min_vertices
+        mod.keep_custom_normals = True
+        return mod.name
+
+    def undo(self, obj: Object, token: Any) -> None:
+        mod = obj.modifiers.get(token)
+        if mod:
+            obj.modifiers.remove(mod)
+
+
+@register_stage
+class TangentTriangulateStage(TriangulateStage):
+    """
+    Triangulate quads as well when tangents are exported.
+
+    Tangents are computed for the polygons the FBX is written with, an engine triangulating quads
+    along the other diagonal would have to compute them again. Unlike plain triangulation this
+    includes the root, as the exporter cannot compute tangents for n-gons, and it inherits the
+    check for modifiers, so quads a Subdivision or Bevel modifier creates are triangulated too.
+    """
+
+    name = "tangent_triangulate"
+    scope = "ALL"
+    modifier_name = "ME_TangentTriangulate"
+    min_vertices = 4
+
+    def enabled(self, settings: ExportSettings) -> bool:
+        return settings.export_tangents
+
+
+@register_stage
+class VertexColorStage(ExportStage):
+    name = "vertex_color"
+
+    def enabled(self, settings: ExportSettings) -> bool:
+        return settings.black_vertex
+
+    def applies_to(self, obj: Object) -> bool:
+        return _is_mesh(obj)
+
+    def is_noop(self, obj: Object) -> bool:
+        return bool(obj.data.vertex_colors or obj.data.color_attributes)
+
+    def apply(self, obj: Object, hierarchy: Hierarchy) -> Any:
+        mesh: Mesh = obj.data
+        color_layer = mesh.vertex_colors.new(name="Col")
+        if not color_layer:
+            return None
+        color_layer.data.foreach_set("color", np.zeros(len(mesh.loops) * 4, dtype=np.float32))
+        return color_layer.name
+
+    def undo(self, obj: Object, token: Any) -> None:
+        layer = obj.data.vertex_colors.get(token)
+        if layer:
+            obj.data.vertex_colors.remove(layer)
+
+
+@register_stage
+class ColliderStage(ExportStage):
+    name = "colliders"
+    scope = "ROOT"
+
+    def enabled(self, settings: ExportSettings) -> bool:
+        return settings.fix_collider
+
+    def is_noop(self, obj: Object) -> bool:
+        return not any(child.name.startswith(UE_COLLIDER_PREFIXES) for child in obj.children)
+
+    def apply(self, obj: Object, hierarchy: Hierarchy) -> Any:
+        fix_colliders(obj)
+        return None
+
+
+@register_stage
+class DecalUVStage(ExportStage):
+    name = "decal_uvs"
+    scope = "CHILDREN"
+    uv_names = frozenset({"Decal UVs"})
+
+    def enabled(self, settings: ExportSettings) -> bool:
+        return settings.no_decal_uv
+
+    def applies_to(self, obj: Object) -> bool:
+        return _is_mesh(obj)
+
+    def is_noop(self, obj: Object) -> bool:
+        return not any(uv.name in self.uv_names for uv in obj.data.uv_layers)
+
+    def apply(self, obj: Object, hierarchy: Hierarchy) -> Any:
+        mesh: Mesh = obj.data
+        for uv in list(mesh.uv_layers):
+            if uv.name in self.uv_names:
+                mesh.uv_layers.remove(uv)
+        return None
+
+
+@register_stage
+class ExportCopyStage(ExportStage):
+    """
+    Swap meshes for an evaluated copy with the modifiers applied, for stages that rewrite mesh data.
+
+    The copy is what the FBX exporter writes, the original mesh is left untouched. Stages working
+    on the copy check hierarchy.copies, as deformed meshes are always exported from their original.
+    """
+
+    name = "export_copy"
+    after = ("one_material", "triangulate", "tangent_triangulate", "vertex_color", "decal_uvs", "colliders")
+
+    def enabled(self, settings: ExportSettings) -> bool:
+        return settings.optimize_vertex_cache or settings.cleanup_mesh or settings.generate_lightmap_uvs
+
+    def applies_to(self, obj: Object) -> bool:
+        if not _is_mesh(obj) or obj.data.shape_keys:
+            return False
+        return not any(modifier.type == "ARMATURE" for modifier in obj.modifiers)
+
+    def apply(self, obj: Object, hierarchy: Hierarchy) -> Any:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        original: Mesh = obj.data
+        copy = bpy.data.meshes.new_from_object(
+            obj.evaluated_get(depsgraph), preserve_all_data_layers=True, depsgraph=depsgraph
+        )
+
+        modifiers = [(modifier.name, modifier.show_viewport) for modifier in obj.modifiers]
+        for modifier in obj.modifiers:
+            modifier.show_viewport = False
+        obj.data = copy
+        hierarchy.copies[obj.session_uid] = original
+        return original, modifiers
+
+    def undo(self, obj: Object, token: Any) -> None:
+        original, modifiers = token
+        copy = obj.data
+        obj.data = original
+        for name, show_viewport in modifiers:
+            modifier = obj.modifiers.get(name)
+            if modifier:
+                modifier.show_viewport = show_viewport
+        if copy is not original and copy.users == 0:
+            bpy.data.meshes.remove(copy)
+
+
+@register_stage
+class RenameDotStage(ExportStage):
+    name = "rename"
+    # Collider names are built from the parent's name, rename them afterwards
+    after = ("colliders",)
+
+    def enabled(self, settings: ExportSettings) -> bool:
+        return settings.rename_dot
+
+    def is_noop(self, obj: Object) -> bool:
+        return "." not in obj.name
+
+    def apply(self, obj: Object, hierarchy: Hierarchy) -> Any:
+        obj.name = obj.name.replace(".", "_")
+        return None
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import bpy
+from bpy.types import Image, Material, NodeTree, Object
+
+from ..core.cache import JsonIndex, file_digest
+from ..core.types import ExportSettings
+from .stages import ExportStage, Hierarchy, register_stage
+
+TEXTURE_INDEX_NAME = ".export_me_textures.json"
+
+
+def _node_tree_images(node_tree: NodeTree, images: Dict[str, Image], visited: Set[str]) -> None:
+    if node_tree.name in visited:
+        return
+    visited.add(node_tree.name)
+
+    for node in node_tree.nodes:
+        if node.type == "TEX_IMAGE" and node.image:
+            images.setdefault(node.image.name, node.image)
+        elif node.type == "GROUP" and node.node_tree:
+            _node_tree_images(node.node_tree, images, visited)
+
+
+def collect_images(objects: Iterable[Object]) -> List[Image]:
+    """Images used by the materials of the given objects, following node groups"""
+    materials: Dict[str, Material] = {}
+    for obj in objects:
+        for slot in obj.material_slots:
+            if slot.material and slot.material.use_nodes:
+                materials.setdefault(slot.material.name, slot.material)
+
+    images: Dict[str, Image] = {}
+    visited: Set[str] = set()
+    for material in materials.values():
+        _node_tree_images(material.node_tree, images, visited)
+
+    return [image for image in images.values() if image.source in {"FILE", "SEQUENCE", "MOVIE"} or image.packed_file]
+
+
+class TexturePublisher:
+    """
+    Copies images into a texture folder with a thread pool, keeping one file per distinct content.
+
+    The content hash index is stored in the texture folder, so files published by earlier runs are reused.
+    """
+
+    def __init__(self, folder: Path, max_workers: Optional[int] = None) -> None:
+        self.folder = folder
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.index = JsonIndex(folder / TEXTURE_INDEX_NAME)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or min(8, (os.cpu_count() or 2) * 2))
+        self._lock = threading.Lock()
+        self._published: Dict[Tuple[str, int, int], Path] = {}
+        # Digests being copied, jobs with the same content wait for the copy instead of claiming a name
+        self._in_flight: Dict[str, Future] = {}
+        self.copied = 0
+        self.reused = 0
+
+    def publish(self, images: List[Image]) -> Dict[str, Path]:
+        """Publish images, returning their published path by image name"""
+        jobs = []
+        for image in images:
+            if image.packed_file:
+                # Packed data has to be read on the main thread, bpy is not thread safe
+                source: Any = bytes(image.packed_file.data)
+                name = Path(image.filepath).name or f"{image.name}.png"
+            else:
+                filepath = bpy.path.abspath(image.filepath, library=image.library)
+                if "<UDIM>" in filepath or not os.path.isfile(filepath):
+                    continue
+                source = Path(filepath)
+                name = source.name
+            jobs.append((image.name, self._pool.submit(self._publish_one, source, name)))
+
+        return {image_name: job.result() for image_name, job in jobs}
+
+    def _publish_one(self, source: Any, name: str) -> Path:
+        cache_key: Optional[Tuple[str, int, int]] = None
+        if isinstance(source, Path):
+            stat = source.stat()
+            cache_key = (str(source), stat.st_mtime_ns, stat.st_size)
+            with self._lock:
+                if cache_key in self._published:
+                    return self._published[cache_key]
+            digest = file_digest(source)
+        else:
+            digest = hashlib.sha256(source).hexdigest()
+
+        with self._lock:
+            copying = self._in_flight.get(digest)
+            if copying is None:
+                existing = self.index.get(digest)
+                if existing and (self.folder / existing).exists():
+                    return self._reuse(self.folder / existing, cache_key)
+
+                target = self._claim_name(name, digest)
+                self.index.set(digest, target.name)
+                copy = self._in_flight[digest] = Future()
+
+        if copying is not None:
+            target = copying.result()
+            with self._lock:
+                return self._reuse(target, cache_key)
+
+        # The name is reserved in the index, so the copy itself can run outside the lock
+        try:
+            if isinstance(source, Path):
+                shutil.copy2(source, target)
+            else:
+                target.write_bytes(source)
+        except BaseException as e:
+            with self._lock:
+                self.index.pop(digest)
+                del self._in_flight[digest]
+            copy.set_exception(e)
+            raise
+
+        with self._lock:
+            self.copied += 1
+            if cache_key:
+                self._published[cache_key] = target
+            del self._in_flight[digest]
+        copy.set_result(target)
+        return target
+
+    def _reuse(self, target: Path, cache_key: Optional[Tuple[str, int, int]]) -> Path:
+        """Count a published file used again, called holding the lock"""
+        self.reused += 1
+        if cache_key:
+            self._published[cache_key] = target
+        return target
+
+    def _claim_name(self, name: str, digest: str) -> Path:
+        taken = {self.index.get(key) for key in self.index}
+        target = self.folder / name
+        if target.name in taken or target.exists():
+            target = self.folder / f"{target.stem}_{digest[:8]}{target.suffix}"
+        return target
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        self.index.save()
+
+
+@register_stage
+class PublishTexturesStage(ExportStage):
+    name = "publish_textures"
+    # Only the materials left by one material ID are written
+    after = ("one_material",)
+    scope = "ROOT"
+
+    def enabled(self, settings: ExportSettings) -> bool:
+        return settings.publish_textures
+
+    def apply(self, obj: Object, hierarchy: Hierarchy) -> Any:
+        images = collect_images(hierarchy.objects)
+        if not images:
+            return None
+
+        folder = hierarchy.settings.export_folder / hierarchy.settings.texture_folder
+        publisher = hierarchy.shared.get("texture_publisher")
+        if publisher is None or publisher.folder != folder:
+            # Saves the index of the previous folder and stops its copy threads
+            if publisher is not None:
+                publisher.close()
+            publisher = hierarchy.shared["texture_publisher"] = TexturePublisher(folder)
+
+        published = publisher.publish(images)
+
+        # Point the images at their published copy while the FBX is written, filepath_raw avoids a reload
+        original: List[Tuple[Image, str]] = []
+        for image in images:
+            target = published.get(image.name)
+            if target is None:
+                continue
+            original.append((image, image.filepath_raw))
+            image.filepath_raw = target.as_posix()
+        return original
+
+    def undo(self, obj: Object, token: Any) -> None:
+        for image, filepath in token:
+            image.filepath_raw = filepath
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Set
+
+from bpy.types import Context, Mesh
+
+from ..core.fbx_binary import FBXFormatError, summarize
+from ..core.types import ExportSettings
+from .stages import Hierarchy, TangentTriangulateStage, TriangulateStage
+from .tools import UE_COLLIDER_PREFIXES
+
+# Axis index and sign FBX stores in GlobalSettings for each up axis of the exporter
+UP_AXES = {"X": (0, 1), "Y": (1, 1), "Z": (2, 1), "-X": (0, -1), "-Y": (1, -1), "-Z": (2, -1)}
+
+
+@dataclass
+class ExpectedExport:
+    root: str
+    up_axis: str
+    one_material: bool
+    models: Set[str] = field(default_factory=set)
+    # Models the triangulation stage covered, which should have no polygon above four vertices
+    triangulated: Set[str] = field(default_factory=set)
+    materials: Set[str] = field(default_factory=set)
+    triangles: int = 0
+
+
+def expected_export(context: Context, hierarchy: Hierarchy, settings: ExportSettings, up_axis: str) -> ExpectedExport:
+    """What the FBX of a hierarchy should contain, read from the scene after the export stages ran"""
+    expected = ExpectedExport(hierarchy.root.name, up_axis, settings.one_material_id)
+    depsgraph = context.evaluated_depsgraph_get()
+    triangulate = None
+    if settings.export_tangents:
+        triangulate = TangentTriangulateStage()
+    elif settings.triangulate:
+        triangulate = TriangulateStage()
+    # The exporter writes the mesh of linked duplicates without modifiers once
+    counted: Set[int] = set()
+
+    for member in hierarchy.objects:
+        if member.type != "MESH":
+            continue
+        expected.models.add(member.name)
+        expected.materials.update(slot.material.name for slot in member.material_slots if slot.material)
+        if triangulate is not None and triangulate.in_scope(member == hierarchy.root):
+            expected.triangulated.add(member.name)
+
+        geometry = member.session_uid if member.modifiers else member.data.session_uid
+        if geometry in counted:
+            continue
+        counted.add(geometry)
+        # The exporter writes the evaluated mesh, triangulation does not change the triangle count
+        mesh: Mesh = member.evaluated_get(depsgraph).data
+        expected.triangles += len(mesh.loops) - 2 * len(mesh.polygons)
+
+    return expected
+
+
+def verify_export(path: Path, expected: ExpectedExport) -> List[str]:
+    """Compare an exported FBX against what was expected, returning the problems found"""
+    try:
+        summary = summarize(path)
+    except (OSError, FBXFormatError) as e:
+        return [f"{path.name} could not be read for verification: {e}"]
+
+    problems: List[str] = []
+    models = set(summary.models)
+
+    missing = expected.models - models
+    colliders = {name for name in missing if name.startswith(UE_COLLIDER_PREFIXES)}
+    if colliders:
+        problems.append(f"colliders missing from the FBX: {', '.join(sorted(colliders))}")
+    if missing - colliders:
+        problems.append(f"objects missing from the FBX: {', '.join(sorted(missing - colliders))}")
+    if models - expected.models:
+        problems.append(f"unexpected objects in the FBX: {', '.join(sorted(models - expected.models))}")
+
+    if summary.triangles != expected.triangles:
+        problems.append(f"FBX has {summary.triangles} triangles, the scene {expected.triangles}")
+    ngons = {
+        name: size
+        for name, size in summary.model_polygon_sizes.items()
+        if name in expected.triangulated and size > 4
+    }
+    if ngons:
+        largest = max(ngons.values())
+        problems.append(f"FBX still has polygons with {largest} vertices in {', '.join(sorted(ngons))}")
+
+    missing_materials = expected.materials - set(summary.materials)
+    if missing_materials:
+        problems.append(f"materials missing from the FBX: {', '.join(sorted(missing_materials))}")
+    root_materials = summary.model_materials.get(expected.root, [])
+    if expected.one_material and len(root_materials) > 1:
+        problems.append(f"{expected.root} has {len(root_materials)} materials in the FBX, expected one")
+
+    if summary.up_axis is not None and summary.up_axis != UP_AXES.get(expected.up_axis):
+        problems.append(f"FBX up axis is {summary.up_axis}, expected {expected.up_axis}")
+
+    return problems
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, List, Sequence, Tuple
+import bmesh
+import numpy as np
+from bpy.types import Mesh, Object
+
+from ..core.cache import LRUCache
+from ..core.fingerprint import max_polygon_size, topology_fingerprint
+from ..core.types import ExportSettings
+from .stages import ExportStage, Hierarchy, register_stage
+
+# Post-transform cache size the triangle order is optimized for and ACMR is measured with
+CACHE_SIZE = 16
+
+# (triangle order, vertex order, misses before, misses after) by topology fingerprint
+_orders = LRUCache(max_entries=512)
+
+
+def _next_vertex(
+    candidates: List[int],
+    live: List[int],
+    cache_time: List[int],
+    timestamp: int,
+    dead_end: List[int],
+    cursor: List[int],
+) -> int:
+    best, best_priority = -1, -1
+    for vertex in candidates:
+        if live[vertex] > 0:
+            age = timestamp - cache_time[vertex]
+            priority = age if age + 2 * live[vertex] <= CACHE_SIZE else 0
+            if priority > best_priority:
+                best, best_priority = vertex, priority
+    if best >= 0:
+        return best
+
+    # Dead end: go back to a recently used vertex, else to the next vertex in input order
+    while dead_end:
+        vertex = dead_end.pop()
+        if live[vertex] > 0:
+            return vertex
+    while cursor[0] < len(live):
+        if live[cursor[0]] > 0:
+            return cursor[0]
+        cursor[0] += 1
+    return -1
+
+
+def tipsify(triangles: np.ndarray, vertex_count: int) -> np.ndarray:
+    """
+    Triangle order with good post-transform cache locality.
+
+    Sander, Nehab and Barczak, "Fast Triangle Reordering for Vertex Locality and Reduced Overdraw" (2007).
+    Runs in linear time, much faster than Forsyth's scoring in Python for a similar cache miss ratio.
+    """
+    flat = triangles.ravel()
+    valence = np.bincount(flat, minlength=vertex_count)
+    starts = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(valence, out=starts[1:])
+    # Triangles around each vertex, grouped by vertex
+    adjacency = (np.argsort(flat, kind="stable") // 3).tolist()
+    starts = starts.tolist()
+    live = valence.tolist()
+    corners = triangles.tolist()
+
+    cache_time = [0] * vertex_count
+    emitted = [False] * len(corners)
+    output: List[int] = []
+    dead_end: List[int] = []
+    timestamp = CACHE_SIZE + 1
+    cursor = [0]
+
+    fanning = _next_vertex([], live, cache_time, timestamp, dead_end, cursor)
+    while fanning >= 0:
+        candidates: List[int] = []
+        for triangle in adjacency[starts[fanning] : starts[fanning + 1]]:
+            if emitted[triangle]:
+                continue
+            for vertex in corners[triangle]:
+                dead_end.append(vertex)
+                candidates.append(vertex)
+                live[vertex] -= 1
+                if timestamp - cache_time[vertex] > CACHE_SIZE:
+                    cache_time[vertex] = timestamp
+                    timestamp += 1
+            emitted[triangle] = True
+            output.append(triangle)
+        fanning = _next_vertex(candidates, live, cache_time, timestamp, dead_end, cursor)
+
+    return np.array(output, dtype=np.int64)
+
+
+def fetch_order(triangles: np.ndarray, vertex_count: int) -> np.ndarray:
+    """Vertices in the order the triangles first use them, unused vertices last"""
+    flat = triangles.ravel()
+    used, first_use = np.unique(flat, return_index=True)
+    unused = np.setdiff1d(np.arange(vertex_count), used)
+    return np.concatenate([used[np.argsort(first_use)], unused])
+
+
+def cache_misses(indices: Sequence[int]) -> int:
+    """Transformed vertices of an index stream through a FIFO cache, divide by triangles for the ACMR"""
+    cache: deque = deque()
+    cached = set()
+    misses = 0
+    for vertex in indices:
+        if vertex in cached:
+            continue
+        misses += 1
+        if len(cache) == CACHE_SIZE:
+            cached.discard(cache.popleft())
+        cache.append(vertex)
+        cached.add(vertex)
+    return misses
+
+
+def _triangles(mesh: Mesh) -> np.ndarray:
+    loop_starts = np.empty(len(mesh.polygons), dtype=np.int64)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    vertex_indices = np.empty(len(mesh.loops), dtype=np.int64)
+    mesh.loops.foreach_get("vertex_index", vertex_indices)
+    return vertex_indices[loop_starts[:, None] + np.arange(3)]
+
+
+def get_orders(mesh: Mesh) -> Tuple[np.ndarray, np.ndarray, int, int]:
+    key = topology_fingerprint(mesh)
+    orders = _orders.get(key)
+    if orders is None:
+        triangles = _triangles(mesh)
+        triangle_order = tipsify(triangles, len(mesh.vertices))
+        reordered = triangles[triangle_order]
+        vertex_order = fetch_order(reordered, len(mesh.vertices))
+        misses = cache_misses(triangles.ravel().tolist()), cache_misses(reordered.ravel().tolist())
+        orders = (triangle_order, vertex_order, *misses)
+        _orders.set(key, orders)
+    return orders
+
+
+def _rank(order: np.ndarray) -> List[int]:
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return rank.tolist()
+
+
+@register_stage
+class VertexCacheStage(ExportStage):
+    name = "vertex_cache"
+    # Welding changes the connectivity the order is computed from, lightmaps are cached by the unsorted mesh
+    after = ("export_copy", "cleanup", "lightmap_uvs")
+
+    def enabled(self, settings: ExportSettings) -> bool:
+        return settings.optimize_vertex_cache
+
+    def applies_to(self, obj: Object) -> bool:
+        return obj.type == "MESH" and obj.data is not None
+
+    def is_noop(self, obj: Object) -> bool:
+        return len(obj.data.polygons) < 2
+
+    def apply(self, obj: Object, hierarchy: Hierarchy) -> Any:
+        if obj.session_uid not in hierarchy.copies:
+            return None
+
+        mesh: Mesh = obj.data
+        bm = bmesh.new()
+        try:
+            bm.from_mesh(mesh)
+            # The engine draws triangles, order them rather than the quads and n-gons they come from
+            if max_polygon_size(mesh) > 3:
+                bmesh.ops.triangulate(bm, faces=bm.faces[:], quad_method="BEAUTY", ngon_method="BEAUTY")
+                bm.to_mesh(mesh)
+
+            triangle_order, vertex_order, misses_before, misses_after = get_orders(mesh)
+            face_rank, vertex_rank = _rank(triangle_order), _rank(vertex_order)
+            bm.faces.index_update()
+            bm.verts.index_update()
+            bm.faces.sort(key=lambda face: face_rank[face.index])
+            bm.verts.sort(key=lambda vert: vertex_rank[vert.index])
+            bm.to_mesh(mesh)
+        finally:
+            bm.free()
+
+        hierarchy.add_metric("vertex_cache_triangles", len(triangle_order))
+        hierarchy.add_metric("vertex_cache_misses_before", misses_before)
+        hierarchy.add_metric("vertex_cache_misses_after", misses_after)
+        return None
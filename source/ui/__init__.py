@@ -1,3 +1,4 @@
 from .panel import N_PT_Panel
+from .project_browser import N_UL_Projects, N_UL_ProjectSubpaths
 
-__all__ = ["N_PT_Panel"]
+__all__ = ["N_PT_Panel", "N_UL_Projects", "N_UL_ProjectSubpaths"]
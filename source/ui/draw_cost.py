@@ -0,0 +1,201 @@
+"""
+Draw time of the N-panel sections, and throttling of the data they draw from.
+
+The sidebar redraws on every hover and viewport change, so data a section reads from the disk or
+the selection is computed through DrawCost.data: while computing it stays within the budget it is
+fresh on every draw. Once it takes longer, or before it was ever timed, draw gets the last value and
+the data is refreshed outside of draw at most every REFRESH_SECONDS: on a worker thread when compute
+does not touch Blender data, else from a timer. The sidebar is redrawn when the new value is ready.
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Set
+import bpy
+from bpy.app.handlers import persistent
+
+# Time a section may spend computing its data on every draw
+BUDGET_SECONDS = 0.001
+REFRESH_SECONDS = 0.5
+# Weight of the latest sample in the running averages
+SMOOTHING = 0.2
+# How often a timer checks whether a worker thread finished refreshing
+POLL_SECONDS = 0.05
+
+# Depsgraph updates seen so far, a cheap key for data read from the selection or the scene
+_depsgraph_updates = 0
+
+
+def depsgraph_updates() -> int:
+    return _depsgraph_updates
+
+
+@dataclass
+class SectionStats:
+    average: float = 0.0
+    peak: float = 0.0
+    compute_average: float = 0.0
+    draws: int = 0
+    cached_draws: int = 0
+
+    @property
+    def over_budget(self) -> bool:
+        return self.compute_average > BUDGET_SECONDS
+
+
+@dataclass
+class _CachedData:
+    key: Hashable
+    value: Any
+    computed_at: float
+
+
+def _smooth(average: float, sample: float, first: bool) -> float:
+    return sample if first else average + SMOOTHING * (sample - average)
+
+
+def _redraw_sidebars() -> None:
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
+
+
+class DrawCost:
+    def __init__(self) -> None:
+        self.stats: Dict[str, SectionStats] = {}
+        self._data: Dict[str, _CachedData] = {}
+        # Sections refreshed outside of draw right now
+        self._pending: Set[str] = set()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _stats(self, name: str) -> SectionStats:
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = SectionStats()
+        return stats
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """Time the drawing of one panel section"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            stats = self._stats(name)
+            stats.average = _smooth(stats.average, elapsed, stats.draws == 0)
+            stats.peak = max(stats.peak, elapsed)
+            stats.draws += 1
+
+    def data(
+        self,
+        name: str,
+        key: Hashable,
+        compute: Callable[[], Any],
+        threaded: bool = False,
+        default: Any = None,
+        keep_previous: bool = False,
+    ) -> Any:
+        """
+        The data a section draws, refreshed outside of draw when computing it goes over the budget.
+
+        threaded computes run on a worker thread and must not touch Blender data. Until data for
+        key is ready, draw gets default, or with keep_previous the data of the key drawn before.
+        """
+        stats = self._stats(name)
+        cached: Optional[_CachedData] = self._data.get(name)
+        if cached is not None and not stats.over_budget and name not in self._pending:
+            return self._compute(name, key, compute)
+
+        fresh = cached is not None and cached.key == key
+        if not fresh or time.monotonic() - cached.computed_at >= REFRESH_SECONDS:
+            self._refresh(name, key, compute, threaded)
+        if cached is not None and (fresh or keep_previous):
+            stats.cached_draws += 1
+            return cached.value
+        return default
+
+    def _compute(self, name: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        value = compute()
+        self._store(name, key, value, time.perf_counter() - started)
+        return value
+
+    def _store(self, name: str, key: Hashable, value: Any, elapsed: float) -> None:
+        stats = self._stats(name)
+        stats.compute_average = _smooth(stats.compute_average, elapsed, name not in self._data)
+        self._data[name] = _CachedData(key, value, time.monotonic())
+
+    def _refresh(self, name: str, key: Hashable, compute: Callable[[], Any], threaded: bool) -> None:
+        # A key drawn while a refresh runs is picked up by the draw that follows it
+        if name in self._pending:
+            return
+        self._pending.add(name)
+
+        if not threaded:
+
+            def refresh() -> None:
+                try:
+                    self._compute(name, key, compute)
+                finally:
+                    self._done(name)
+
+            bpy.app.timers.register(refresh, first_interval=0.0)
+            return
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export_me_draw")
+        started = time.perf_counter()
+        future: Future = self._pool.submit(compute)
+
+        def poll() -> Optional[float]:
+            if not future.done():
+                return POLL_SECONDS
+            if future.exception() is None:
+                self._store(name, key, future.result(), time.perf_counter() - started)
+            self._done(name)
+            return None
+
+        bpy.app.timers.register(poll, first_interval=POLL_SECONDS)
+
+    def _done(self, name: str) -> None:
+        self._pending.discard(name)
+        _redraw_sidebars()
+
+    def clear(self) -> None:
+        self.stats.clear()
+        self._data.clear()
+        self._pending.clear()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+        self.clear()
+
+
+draw_cost = DrawCost()
+
+
+@persistent
+def _on_depsgraph_update(scene, depsgraph) -> None:
+    global _depsgraph_updates
+    _depsgraph_updates += 1
+
+
+def register() -> None:
+    # Headless runs draw no panel
+    if bpy.app.background:
+        return
+    bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update)
+
+
+def unregister() -> None:
+    if _on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_on_depsgraph_update)
+    draw_cost.close()
@@ -1,9 +1,34 @@
-from typing import List
+from typing import List, Optional
+import bpy
 from bpy.types import Panel, Context, UILayout
 from pathlib import Path
 
+from ..core import startup
 from ..core.preferences import get_preferences, ExportMEPreferences
 from ..operators.batch_export import has_multiple_uv_sets, any_child_has_multiple_uvs
+from .draw_cost import BUDGET_SECONDS, depsgraph_updates, draw_cost
+from .project_browser import PANEL_LIST_ID
+
+
+def list_subfolders(directory: Path) -> Optional[List[Path]]:
+    """Subfolders offered for navigation, folders starting with "_" first, None when directory is not a folder"""
+    try:
+        if not directory.is_dir():
+            return None
+        return sorted(
+            (f for f in directory.iterdir() if f.is_dir() and not (f.name.startswith("__") and f.name.endswith("__"))),
+            key=lambda f: not f.name.startswith("_"),
+        )
+    except OSError:
+        return None
+
+
+def selection_has_multiple_uvs(context: Context) -> bool:
+    # Read from the view layer, timers get a context without a screen to resolve selected_objects
+    return any(
+        (obj.type == "MESH" and has_multiple_uv_sets(obj)) or any_child_has_multiple_uvs(obj)
+        for obj in context.view_layer.objects.selected
+    )
 
 
 class N_PT_Panel(Panel):
@@ -14,20 +39,30 @@ class N_PT_Panel(Panel):
     bl_idname = "N_PT_Panel"
 
     def draw(self, context: Context) -> None:
+        startup.mark_once("first_draw")
         layout = self.layout
         if not layout:
             return
         prefs = get_preferences(context)
 
-        self._draw_projects_section(layout, prefs, context)
-        self._draw_recent_paths_section(layout, prefs, context)
-        self._draw_export_path(layout, context)
+        with draw_cost.section("projects"):
+            self._draw_projects_section(layout, prefs, context)
+        with draw_cost.section("recent_paths"):
+            self._draw_recent_paths_section(layout, prefs, context)
+        with draw_cost.section("export_path"):
+            self._draw_export_path(layout, context)
         if not prefs.hide_folder_navigation:
-            self._draw_folder_navigation(layout, context)
-        self._draw_export_options(layout, context)
-        self._draw_advanced_options(layout, context)
-        self._draw_export_button(layout)
-        self._draw_uv_warnings(layout, context)
+            with draw_cost.section("folder_navigation"):
+                self._draw_folder_navigation(layout, context)
+        with draw_cost.section("options"):
+            self._draw_export_options(layout, context)
+            self._draw_advanced_options(layout, context)
+            self._draw_export_button(layout)
+        with draw_cost.section("uv_warnings"):
+            self._draw_uv_warnings(layout, context)
+
+        if prefs.show_draw_cost:
+            self._draw_cost_readout(layout)
 
     def _draw_projects_section(self, layout: UILayout, prefs: ExportMEPreferences, context: Context) -> None:
         if not prefs.custom_project_paths:
@@ -36,41 +71,38 @@ class N_PT_Panel(Panel):
             layout.separator()
             return
 
-        layout.label(text="Projects:")
+        header, body = layout.panel("export_me_projects")
+        header.label(text="Projects")
+        if body is None:
+            return
 
-        col = layout.column()
-        row = col.row()
-        row.prop(context.scene, "selected_project_enum", text="")
-
-        # Get selected project index from enum string
-        try:
-            selected_index = int(context.scene.selected_project_enum)
-        except (ValueError, AttributeError):
-            selected_index = 0
-
-        # Display subpath buttons for selected project
-        if selected_index < len(prefs.custom_project_paths):
-            selected_project = prefs.custom_project_paths[selected_index]
-
-            if selected_project.show_root_button:
-                op = col.operator(
-                    "os.set_custom_project_path",
-                    text="Project Root",
-                    icon="HOME",
-                )
-                op.index = selected_index
-
-            if selected_project.subpaths:
-                box = layout.box()
-                box.label(text="Subpaths:")
-                for subpath_index, subpath in enumerate(selected_project.subpaths):
-                    op = box.operator(
-                        "os.set_project_subpath",
-                        text=subpath.name or f"Subpath {subpath_index + 1}",
-                        icon=subpath.icon,
-                    )
-                    op.project_index = selected_index
-                    op.subpath_index = subpath_index
+        body.template_list(
+            "N_UL_Projects", PANEL_LIST_ID, prefs, "custom_project_paths", context.scene, "project_list_index", rows=4
+        )
+
+        selected_index = context.scene.project_list_index
+        if not 0 <= selected_index < len(prefs.custom_project_paths):
+            return
+        selected_project = prefs.custom_project_paths[selected_index]
+
+        if selected_project.show_root_button:
+            op = body.operator(
+                "os.set_custom_project_path",
+                text="Project Root",
+                icon="HOME",
+            )
+            op.index = selected_index
+
+        if selected_project.subpaths:
+            body.template_list(
+                "N_UL_ProjectSubpaths",
+                PANEL_LIST_ID,
+                selected_project,
+                "subpaths",
+                selected_project,
+                "active_subpath_index",
+                rows=4,
+            )
 
         layout.separator()
 
@@ -119,17 +151,14 @@ class N_PT_Panel(Panel):
         row.prop(context.scene, "new_folder_name", text="")
 
     def _draw_subfolder_list(self, layout: UILayout, directory: Path) -> None:
-        if not directory.is_dir():
+        # Listing a network drive can take longer than a frame, it only reads the file system
+        folders = draw_cost.data("folder_navigation", directory, lambda: list_subfolders(directory), threaded=True)
+        if folders is None:
             return
 
         box = layout.box()
         col = box.column(align=True)
 
-        folders: List[Path] = sorted(
-            (f for f in directory.iterdir() if f.is_dir() and not (f.name.startswith("__") and f.name.endswith("__"))),
-            key=lambda f: not f.name.startswith("_"),
-        )
-
         if not folders:
             col.label(text="No Subfolder")
             return
@@ -165,24 +194,77 @@ class N_PT_Panel(Panel):
 
         box.row().prop(context.scene, "one_material_id")
         box.row().prop(context.scene, "purge_data")
+        box.row().prop(context.scene, "export_instances")
+        row = box.row(align=True)
+        row.prop(context.scene, "publish_textures")
+        sub = row.row(align=True)
+        sub.enabled = context.scene.publish_textures
+        sub.prop(context.scene, "texture_folder", text="")
+        box.row().prop(context.scene, "patch_renames")
+        box.row().prop(context.scene, "optimize_vertex_cache")
+        box.row().prop(context.scene, "generate_lightmap_uvs")
+        box.row().prop(context.scene, "verify_exports")
 
         row = layout.row()
         row.label(text="Smoothing:")
         row.prop(context.scene, "export_smoothing", text="")
 
         layout.row().prop(context.scene, "export_animations")
+        if context.scene.export_animations:
+            self._draw_animation_options(layout, context)
+
+        self._draw_profiles(layout, context)
 
         layout.label(text="Custom Name:")
         layout.row().prop(context.scene, "custom_name", text="")
 
+    def _draw_animation_options(self, layout: UILayout, context: Context) -> None:
+        box = layout.box()
+        box.row().prop(context.scene, "animation_export_mode", text="")
+
+        if context.scene.animation_export_mode != "ALL":
+            box.row().prop(context.scene, "action_filter", text="Filter")
+            box.row().prop(context.scene, "skip_unchanged_clips")
+
+        row = box.row(align=True)
+        row.prop(context.scene, "anim_bake_step")
+        row.prop(context.scene, "anim_simplify")
+
+    def _draw_profiles(self, layout: UILayout, context: Context) -> None:
+        layout.label(text="Export Profile:")
+        box = layout.box()
+
+        if context.object:
+            box.row().prop(context.object, "export_me_root")
+            box.row().prop(context.object, "export_me_profile", text="Object", icon="OBJECT_DATA")
+        if context.collection:
+            box.row().prop(context.collection, "export_me_profile", text="Collection", icon="OUTLINER_COLLECTION")
+            box.row().prop(context.collection, "export_me_collection", text="Export")
+
     def _draw_export_button(self, layout: UILayout) -> None:
         col = layout.column()
         col.scale_y = 2.0
         col.operator("object.bat_export", text="Export")
+        layout.operator("object.bat_export", text="Export Collections", icon="OUTLINER_COLLECTION").collections = True
+        layout.operator("object.plan_export", text="Plan Export", icon="INFO")
 
     def _draw_uv_warnings(self, layout: UILayout, context: Context) -> None:
-        for obj in context.selected_objects:
-            if (obj.type == "MESH" and has_multiple_uv_sets(obj)) or any_child_has_multiple_uvs(obj):
-                row = layout.row()
-                row.label(icon="ERROR", text="Objects have multiple UV sets")
-                break
+        # Selection and UV layer changes both come with a depsgraph update
+        has_multiple_uvs = draw_cost.data(
+            "uv_warnings", depsgraph_updates(), lambda: selection_has_multiple_uvs(bpy.context), keep_previous=True
+        )
+        if has_multiple_uvs:
+            row = layout.row()
+            row.label(icon="ERROR", text="Objects have multiple UV sets")
+
+    def _draw_cost_readout(self, layout: UILayout) -> None:
+        box = layout.box()
+        total = sum(stats.average for stats in draw_cost.stats.values())
+        box.label(text=f"Draw time: {total * 1000:.2f} ms (budget {BUDGET_SECONDS * 1000:.1f} ms per section)")
+        col = box.column(align=True)
+        for name, stats in draw_cost.stats.items():
+            cached = f", {stats.cached_draws} cached" if stats.cached_draws else ""
+            col.label(
+                text=f"{name}: {stats.average * 1000:.2f} ms, peak {stats.peak * 1000:.2f} ms{cached}",
+                icon="ERROR" if stats.over_budget else "BLANK1",
+            )
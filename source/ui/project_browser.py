@@ -0,0 +1,111 @@
+"""
+Project and subpath lists of the N panel and the preferences.
+
+Blender only draws the rows of a UIList that are scrolled into view, the rows are filtered and
+ordered here from the project index, so a long list never reads every name from the preferences.
+Favorites come first, then the projects and subpaths exported to most recently.
+"""
+
+from typing import Dict, List, Optional, Sequence
+from bpy.types import Context, UIList, UILayout
+
+from ..core.preferences import get_preferences, get_project_index
+from ..core.types import ProjectIndex, RecentRanks
+
+# Lists drawn in the N panel, where rows pick an export folder instead of editing the preferences
+PANEL_LIST_ID = "panel"
+
+
+def browse_order(favorites: Sequence[bool], recent: Dict[int, int], names: Optional[List[str]] = None) -> List[int]:
+    """New position of every item: favorites, then recently used ones, then by name or as listed"""
+    count = len(favorites)
+    ranked = sorted(
+        range(count),
+        key=lambda item: (not favorites[item], recent.get(item, count), names[item] if names else "", item),
+    )
+    order = [0] * count
+    for position, item in enumerate(ranked):
+        order[item] = position
+    return order
+
+
+def _filter_flags(ui_list: UIList, search_text: Sequence[str]) -> List[int]:
+    terms = ui_list.filter_name.lower().split()
+    shown = ui_list.bitflag_filter_item
+    if not terms:
+        return [shown] * len(search_text)
+    return [shown if all(term in text for term in terms) else 0 for text in search_text]
+
+
+def _recent_ranks(context: Context, index: ProjectIndex) -> RecentRanks:
+    prefs = get_preferences(context)
+    if prefs.disable_file_history:
+        return {}, {}
+    return index.recent_ranks(tuple(recent.filepath for recent in prefs.recent_export_paths))
+
+
+def _project_position(project) -> Optional[int]:
+    # Subpath lists only get the project, its position is the last index of its data path
+    try:
+        return int(project.path_from_id().rpartition("[")[2].rstrip("]"))
+    except ValueError:
+        return None
+
+
+def _draw_favorite(layout: UILayout, item) -> None:
+    layout.prop(item, "favorite", text="", icon="SOLO_ON" if item.favorite else "SOLO_OFF", emboss=False)
+
+
+class N_UL_Projects(UIList):
+    bl_idname = "N_UL_Projects"
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index=0, flt_flag=0):
+        row = layout.row(align=True)
+        if self.list_id == PANEL_LIST_ID:
+            row.label(text=item.project_name or f"Project {index + 1}", icon="FILE_FOLDER")
+        else:
+            row.prop(item, "project_name", text="", icon="FILE_FOLDER", emboss=False)
+        _draw_favorite(row, item)
+
+    def filter_items(self, context, data, propname):
+        projects = getattr(data, propname)
+        index = get_project_index(context)
+        if len(index.search_text) != len(projects):
+            return [], []
+
+        recent, _ = _recent_ranks(context, index)
+        names = [text.partition("\n")[0] for text in index.search_text] if self.use_filter_sort_alpha else None
+        order = browse_order([project.favorite for project in projects], recent, names)
+        return _filter_flags(self, index.search_text), order
+
+
+class N_UL_ProjectSubpaths(UIList):
+    bl_idname = "N_UL_ProjectSubpaths"
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index=0, flt_flag=0):
+        row = layout.row(align=True)
+        if self.list_id == PANEL_LIST_ID:
+            project_index = _project_position(data)
+            if project_index is not None:
+                op = row.operator("os.set_project_subpath", text=item.name or f"Subpath {index + 1}", icon=item.icon)
+                op.project_index = project_index
+                op.subpath_index = index
+        else:
+            row.prop(item, "name", text="", icon=item.icon, emboss=False)
+        _draw_favorite(row, item)
+
+    def filter_items(self, context, data, propname):
+        subpaths = getattr(data, propname)
+        project_index = _project_position(data)
+        if project_index is None:
+            return [], []
+
+        index = get_project_index(context)
+        keys = [(project_index, subpath_index) for subpath_index in range(len(subpaths))]
+        search_text = [index.subpath_search_text.get(key, "") for key in keys]
+
+        _, recent_subpaths = _recent_ranks(context, index)
+        recent = {key[1]: rank for key, rank in recent_subpaths.items() if key[0] == project_index}
+        names = [text.partition("\n")[0] for text in search_text] if self.use_filter_sort_alpha else None
+        order = browse_order([subpath.favorite for subpath in subpaths], recent, names)
+        return _filter_flags(self, search_text), order